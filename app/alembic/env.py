@@ -57,6 +57,10 @@ def run_migrations_online() -> None:
 
         with context.begin_transaction():
             context.run_migrations()
+            # Revision "00N" is PRAGMA user_version N for init_db.upgrade_db(),
+            # so app startup sees what Alembic applied
+            revision = context.get_context().get_current_revision()
+            connection.exec_driver_sql(f"PRAGMA user_version = {int(revision or 0)}")
 
 
 if context.is_offline_mode():
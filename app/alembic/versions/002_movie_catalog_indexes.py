@@ -0,0 +1,30 @@
+"""Catalog indexes for filtered, sorted and keyset-paginated movie listing
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_movies_genre_id', 'movies', ['genre', 'id'])
+    op.create_index('idx_movies_title', 'movies', ['title', 'id'])
+    op.create_index('idx_movies_genre_title', 'movies', ['genre', 'title', 'id'])
+    op.create_index('idx_movies_year', 'movies', ['year', 'id'])
+    op.create_index('idx_movies_genre_year', 'movies', ['genre', 'year', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_movies_genre_year', table_name='movies')
+    op.drop_index('idx_movies_year', table_name='movies')
+    op.drop_index('idx_movies_genre_title', table_name='movies')
+    op.drop_index('idx_movies_title', table_name='movies')
+    op.drop_index('idx_movies_genre_id', table_name='movies')
@@ -0,0 +1,93 @@
+"""Per-movie review/rating aggregates maintained by triggers
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.add_column(sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('approved_review_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column(
+            'rating_avg', sa.Float(),
+            sa.Computed('CASE WHEN rating_count > 0 THEN rating_sum * 1.0 / rating_count ELSE 0 END', persisted=False),
+        ))
+
+    op.execute("""
+    CREATE TRIGGER trg_reviews_stats_insert AFTER INSERT ON reviews
+    BEGIN
+        UPDATE movies SET
+            review_count = review_count + 1,
+            approved_review_count = approved_review_count + (NEW.approved != 0),
+            rating_count = rating_count + (NEW.rating IS NOT NULL),
+            rating_sum = rating_sum + COALESCE(NEW.rating, 0)
+        WHERE id = NEW.movie_id;
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_reviews_stats_delete AFTER DELETE ON reviews
+    BEGIN
+        UPDATE movies SET
+            review_count = review_count - 1,
+            approved_review_count = approved_review_count - (OLD.approved != 0),
+            rating_count = rating_count - (OLD.rating IS NOT NULL),
+            rating_sum = rating_sum - COALESCE(OLD.rating, 0)
+        WHERE id = OLD.movie_id;
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_reviews_stats_update AFTER UPDATE OF movie_id, approved, rating ON reviews
+    BEGIN
+        UPDATE movies SET
+            review_count = review_count - 1,
+            approved_review_count = approved_review_count - (OLD.approved != 0),
+            rating_count = rating_count - (OLD.rating IS NOT NULL),
+            rating_sum = rating_sum - COALESCE(OLD.rating, 0)
+        WHERE id = OLD.movie_id;
+        UPDATE movies SET
+            review_count = review_count + 1,
+            approved_review_count = approved_review_count + (NEW.approved != 0),
+            rating_count = rating_count + (NEW.rating IS NOT NULL),
+            rating_sum = rating_sum + COALESCE(NEW.rating, 0)
+        WHERE id = NEW.movie_id;
+    END
+    """)
+
+    # Backfill from existing reviews
+    op.execute("""
+    UPDATE movies SET
+        review_count = (SELECT COUNT(*) FROM reviews r WHERE r.movie_id = movies.id),
+        approved_review_count = (SELECT COUNT(*) FROM reviews r WHERE r.movie_id = movies.id AND r.approved != 0),
+        rating_count = (SELECT COUNT(r.rating) FROM reviews r WHERE r.movie_id = movies.id),
+        rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.movie_id = movies.id)
+    """)
+
+    op.create_index('idx_movies_rating', 'movies', ['rating_avg', 'id'])
+    op.create_index('idx_movies_genre_rating', 'movies', ['genre', 'rating_avg', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_movies_genre_rating', table_name='movies')
+    op.drop_index('idx_movies_rating', table_name='movies')
+    op.execute("DROP TRIGGER IF EXISTS trg_reviews_stats_update")
+    op.execute("DROP TRIGGER IF EXISTS trg_reviews_stats_delete")
+    op.execute("DROP TRIGGER IF EXISTS trg_reviews_stats_insert")
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.drop_column('rating_avg')
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('approved_review_count')
+        batch_op.drop_column('review_count')
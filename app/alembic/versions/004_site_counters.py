@@ -0,0 +1,78 @@
+"""Single-row site counters maintained by triggers
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+COUNTER_TRIGGERS = [
+    ("movies", "INSERT", "movies = movies + 1"),
+    ("movies", "DELETE", "movies = movies - 1"),
+    ("reviews", "INSERT", "reviews = reviews + 1, approved_reviews = approved_reviews + (NEW.approved != 0)"),
+    ("reviews", "DELETE", "reviews = reviews - 1, approved_reviews = approved_reviews - (OLD.approved != 0)"),
+    ("ratings", "INSERT", "ratings = ratings + 1"),
+    ("ratings", "DELETE", "ratings = ratings - 1"),
+    ("users", "INSERT", "users = users + 1"),
+    ("users", "DELETE", "users = users - 1"),
+    ("favorites", "INSERT", "favorites = favorites + 1"),
+    ("favorites", "DELETE", "favorites = favorites - 1"),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'site_counters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('movies', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('reviews', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('approved_reviews', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('ratings', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('users', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('favorites', sa.Integer(), server_default='0', nullable=False),
+        sa.CheckConstraint('id = 1'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    for table, event, assignments in COUNTER_TRIGGERS:
+        op.execute(f"""
+        CREATE TRIGGER trg_{table}_counters_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            UPDATE site_counters SET {assignments} WHERE id = 1;
+        END
+        """)
+    op.execute("""
+    CREATE TRIGGER trg_reviews_counters_update AFTER UPDATE OF approved ON reviews
+    BEGIN
+        UPDATE site_counters SET approved_reviews = approved_reviews - (OLD.approved != 0) + (NEW.approved != 0) WHERE id = 1;
+    END
+    """)
+
+    # Backfill from existing rows
+    op.execute("""
+    INSERT INTO site_counters (id, movies, reviews, approved_reviews, ratings, users, favorites) VALUES (
+        1,
+        (SELECT COUNT(*) FROM movies),
+        (SELECT COUNT(*) FROM reviews),
+        (SELECT COUNT(*) FROM reviews WHERE approved != 0),
+        (SELECT COUNT(*) FROM ratings),
+        (SELECT COUNT(*) FROM users),
+        (SELECT COUNT(*) FROM favorites)
+    )
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_reviews_counters_update")
+    for table, event, _ in COUNTER_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_counters_{event.lower()}")
+    op.drop_table('site_counters')
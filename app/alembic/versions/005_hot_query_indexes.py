@@ -0,0 +1,36 @@
+"""Indexes for the hot lookups in app/db.py; one rating/favorite per (movie, user)
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_reviews_movie_created', 'reviews', ['movie_id', 'created_at'])
+    op.create_index('idx_reviews_movie_approved_created', 'reviews', ['movie_id', 'approved', 'created_at'])
+    op.create_index('idx_users_username', 'users', ['username'])
+    op.create_index('idx_favorites_user_movie', 'favorites', ['user_id', 'movie_id'])
+
+    # Drop duplicates before enforcing uniqueness (keep the latest rating, the first favorite)
+    op.execute("DELETE FROM ratings WHERE id NOT IN (SELECT MAX(id) FROM ratings GROUP BY movie_id, user_id)")
+    op.execute("DELETE FROM favorites WHERE id NOT IN (SELECT MIN(id) FROM favorites GROUP BY movie_id, user_id)")
+    op.create_index('uq_ratings_movie_user', 'ratings', ['movie_id', 'user_id'], unique=True)
+    op.create_index('uq_favorites_movie_user', 'favorites', ['movie_id', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_favorites_movie_user', table_name='favorites')
+    op.drop_index('uq_ratings_movie_user', table_name='ratings')
+    op.drop_index('idx_favorites_user_movie', table_name='favorites')
+    op.drop_index('idx_users_username', table_name='users')
+    op.drop_index('idx_reviews_movie_approved_created', table_name='reviews')
+    op.drop_index('idx_reviews_movie_created', table_name='reviews')
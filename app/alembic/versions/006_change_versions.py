@@ -0,0 +1,54 @@
+"""Change counters for ETag / Last-Modified on catalog and movie endpoints
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+BUMP_CATALOG_VERSION = "catalog_version = catalog_version + 1, catalog_updated_at = CURRENT_TIMESTAMP"
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    with op.batch_alter_table('site_counters') as batch_op:
+        batch_op.add_column(sa.Column('catalog_version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('catalog_updated_at', sa.DateTime(), nullable=True))
+
+    op.execute(f"""
+    CREATE TRIGGER trg_movies_version_update AFTER UPDATE ON movies
+    WHEN NEW.version = OLD.version
+    BEGIN
+        UPDATE movies SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        UPDATE site_counters SET {BUMP_CATALOG_VERSION} WHERE id = 1;
+    END
+    """)
+    for event in ("INSERT", "DELETE"):
+        op.execute(f"""
+        CREATE TRIGGER trg_movies_version_{event.lower()} AFTER {event} ON movies
+        BEGIN
+            UPDATE site_counters SET {BUMP_CATALOG_VERSION} WHERE id = 1;
+        END
+        """)
+
+    op.execute(f"UPDATE site_counters SET {BUMP_CATALOG_VERSION} WHERE id = 1")
+
+
+def downgrade() -> None:
+    for event in ("update", "insert", "delete"):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_movies_version_{event}")
+    with op.batch_alter_table('site_counters') as batch_op:
+        batch_op.drop_column('catalog_updated_at')
+        batch_op.drop_column('catalog_version')
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.drop_column('version')
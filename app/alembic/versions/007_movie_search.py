@@ -0,0 +1,110 @@
+"""FTS5 full-text search over movies and approved reviews
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def fold_yo(expr: str) -> str:
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def movies_row(ref: str) -> str:
+    return f"{ref}.id, {fold_yo(f'{ref}.title')}, {fold_yo(f'{ref}.description')}"
+
+
+def reviews_row(ref: str) -> str:
+    return f"{ref}.id, {fold_yo(f'{ref}.text')}, {ref}.movie_id"
+
+
+def upgrade() -> None:
+    # Content views fold ё to е; only approved reviews are searchable
+    op.execute(f"""
+    CREATE VIEW movies_search AS
+    SELECT id, {fold_yo('title')} AS title, {fold_yo('description')} AS description FROM movies
+    """)
+    op.execute(f"""
+    CREATE VIEW reviews_search AS
+    SELECT id, {fold_yo('text')} AS text, movie_id FROM reviews WHERE approved != 0
+    """)
+    op.execute(f"""
+    CREATE VIRTUAL TABLE movies_fts USING fts5(
+        title, description,
+        content = 'movies_search', content_rowid = 'id', tokenize = '{TOKENIZER}'
+    )
+    """)
+    op.execute(f"""
+    CREATE VIRTUAL TABLE reviews_fts USING fts5(
+        text, movie_id UNINDEXED,
+        content = 'reviews_search', content_rowid = 'id', tokenize = '{TOKENIZER}'
+    )
+    """)
+
+    op.execute(f"""
+    CREATE TRIGGER trg_movies_fts_insert AFTER INSERT ON movies
+    BEGIN
+        INSERT INTO movies_fts (rowid, title, description) VALUES ({movies_row('NEW')});
+    END
+    """)
+    op.execute(f"""
+    CREATE TRIGGER trg_movies_fts_delete AFTER DELETE ON movies
+    BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description) VALUES ('delete', {movies_row('OLD')});
+    END
+    """)
+    op.execute(f"""
+    CREATE TRIGGER trg_movies_fts_update AFTER UPDATE OF title, description ON movies
+    BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description) VALUES ('delete', {movies_row('OLD')});
+        INSERT INTO movies_fts (rowid, title, description) VALUES ({movies_row('NEW')});
+    END
+    """)
+    op.execute(f"""
+    CREATE TRIGGER trg_reviews_fts_insert AFTER INSERT ON reviews
+    WHEN NEW.approved != 0
+    BEGIN
+        INSERT INTO reviews_fts (rowid, text, movie_id) VALUES ({reviews_row('NEW')});
+    END
+    """)
+    op.execute(f"""
+    CREATE TRIGGER trg_reviews_fts_delete AFTER DELETE ON reviews
+    WHEN OLD.approved != 0
+    BEGIN
+        INSERT INTO reviews_fts (reviews_fts, rowid, text, movie_id) VALUES ('delete', {reviews_row('OLD')});
+    END
+    """)
+    op.execute(f"""
+    CREATE TRIGGER trg_reviews_fts_update AFTER UPDATE OF text, approved, movie_id ON reviews
+    BEGIN
+        INSERT INTO reviews_fts (reviews_fts, rowid, text, movie_id)
+            SELECT 'delete', {reviews_row('OLD')} WHERE OLD.approved != 0;
+        INSERT INTO reviews_fts (rowid, text, movie_id)
+            SELECT {reviews_row('NEW')} WHERE NEW.approved != 0;
+    END
+    """)
+
+    # Index existing rows
+    op.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO reviews_fts (reviews_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    for table in ("movies", "reviews"):
+        for event in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_{event}")
+    op.execute("DROP TABLE IF EXISTS reviews_fts")
+    op.execute("DROP TABLE IF EXISTS movies_fts")
+    op.execute("DROP VIEW IF EXISTS reviews_search")
+    op.execute("DROP VIEW IF EXISTS movies_search")
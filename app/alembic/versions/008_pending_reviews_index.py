@@ -0,0 +1,24 @@
+"""Partial index for the global moderation queue (unapproved reviews, oldest first)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_reviews_pending', 'reviews', ['created_at', 'id'],
+                    sqlite_where=sa.text('approved = 0'))
+
+
+def downgrade() -> None:
+    op.drop_index('idx_reviews_pending', table_name='reviews')
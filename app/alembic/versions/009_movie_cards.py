@@ -0,0 +1,60 @@
+"""Pre-encoded JSON catalog cards per movie, rebuilt by triggers when the movie's version changes
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+CARD_FIELDS = (
+    "id", "title", "description", "genre", "year", "poster_url", "created_at", "updated_at",
+    "review_count", "approved_review_count", "rating_count", "rating_sum", "rating_avg", "version",
+)
+
+
+def card(ref: str) -> str:
+    return "json_object(" + ", ".join(f"'{field}', {ref}.{field}" for field in CARD_FIELDS) + ")"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'movie_cards',
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('card', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('movie_id')
+    )
+    op.execute(f"""
+    CREATE TRIGGER trg_movies_card_insert AFTER INSERT ON movies
+    BEGIN
+        INSERT OR REPLACE INTO movie_cards (movie_id, card) VALUES (NEW.id, {card('NEW')});
+    END
+    """)
+    # Every change to a movie row bumps its version (revision 006)
+    op.execute(f"""
+    CREATE TRIGGER trg_movies_card_update AFTER UPDATE ON movies
+    WHEN NEW.version != OLD.version
+    BEGIN
+        UPDATE movie_cards SET card = {card('NEW')} WHERE movie_id = NEW.id;
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER trg_movies_card_delete AFTER DELETE ON movies
+    BEGIN
+        DELETE FROM movie_cards WHERE movie_id = OLD.id;
+    END
+    """)
+    op.execute(f"INSERT INTO movie_cards (movie_id, card) SELECT id, {card('movies')} FROM movies")
+
+
+def downgrade() -> None:
+    for event in ("insert", "update", "delete"):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_movies_card_{event}")
+    op.drop_table('movie_cards')
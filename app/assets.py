@@ -0,0 +1,132 @@
+"""Precompressed, fingerprinted static assets.
+
+At startup every file under app/static is read once, fingerprinted with a
+content hash and compressed (gzip, plus brotli when the `brotli` package is
+installed). Fingerprinted URLs such as /static/script.1a2b3c4d5e6f.js are
+immutable and cached for a year; index.html is rewritten to point at them
+and, like the plain URLs, is revalidated with its ETag on every use.
+Assets are keyed by their path relative to app/static ("css/main.css"), so
+files with the same name in different directories do not collide.
+"""
+import gzip
+import hashlib
+import mimetypes
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from app.conditional import make_etag, not_modified
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+INDEX = "index.html"
+# Smaller files are not worth a Content-Encoding round trip
+MIN_COMPRESS_SIZE = 256
+
+
+@dataclass
+class Asset:
+    content_type: str
+    etag: str
+    # encoding ("identity", "br", "gzip") -> body
+    bodies: Dict[str, bytes] = field(default_factory=dict)
+
+
+def _fingerprinted_name(name: str, digest: str) -> str:
+    directory, slash, name = name.rpartition("/")
+    stem, dot, suffix = name.rpartition(".")
+    return directory + slash + (f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}")
+
+
+def _route_path(scope: Scope) -> str:
+    """Request path below the mount point (Mount keeps the full path and extends root_path)"""
+    path, root_path = scope["path"], scope.get("root_path", "")
+    return path[len(root_path):] if root_path and path.startswith(root_path + "/") else path
+
+
+def _build_asset(name: str, body: bytes) -> Asset:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+        content_type += "; charset=utf-8"
+    asset = Asset(content_type, make_etag(hashlib.sha256(body).hexdigest()[:16]), {"identity": body})
+    if len(body) >= MIN_COMPRESS_SIZE:
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            asset.bodies["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                asset.bodies["br"] = compressed
+    return asset
+
+
+class StaticAssets:
+    """ASGI app serving app/static from memory, mounted at /static"""
+
+    def __init__(self, directory: Path, prefix: str = "/static"):
+        self.plain: Dict[str, Asset] = {}
+        self.fingerprinted: Dict[str, Asset] = {}
+        self.urls: Dict[str, str] = {}
+
+        root = Path(directory)
+        files = {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()}
+        for name, body in files.items():
+            if name == INDEX:
+                continue
+            digest = hashlib.sha256(body).hexdigest()[:12]
+            asset = _build_asset(name, body)
+            fingerprinted = _fingerprinted_name(name, digest)
+            self.plain[name] = self.fingerprinted[fingerprinted] = asset
+            self.urls[name] = f"{prefix}/{fingerprinted}"
+
+        if INDEX in files:
+            html = files[INDEX].decode("utf-8")
+            for name, url in self.urls.items():
+                html = html.replace(f'"{prefix}/{name}"', f'"{url}"')
+            self.plain[INDEX] = _build_asset(INDEX, html.encode("utf-8"))
+
+    def url_for(self, name: str) -> Optional[str]:
+        """Fingerprinted URL of an asset, by its path relative to the static directory"""
+        return self.urls.get(name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope)
+        name = _route_path(scope).lstrip("/")
+        if request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        elif name in self.fingerprinted:
+            response = self._respond(request, self.fingerprinted[name], IMMUTABLE)
+        elif name in self.plain:
+            response = self._respond(request, self.plain[name], REVALIDATE)
+        else:
+            response = PlainTextResponse("Not Found", status_code=404)
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _respond(request: Request, asset: Asset, cache_control: str) -> Response:
+        unchanged = not_modified(request, asset.etag)
+        headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if unchanged:
+            unchanged.headers.update(headers)
+            return unchanged
+        accepted = {part.split(";")[0].strip() for part in request.headers.get("accept-encoding", "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in asset.bodies and encoding in accepted:
+                headers["Content-Encoding"] = encoding
+                break
+        else:
+            encoding = "identity"
+        body = asset.bodies[encoding] if request.method == "GET" else b""
+        response = Response(body, headers=headers, media_type=asset.content_type)
+        if request.method == "HEAD":
+            response.headers["Content-Length"] = str(len(asset.bodies[encoding]))
+        return response
@@ -0,0 +1,119 @@
+"""Stateless session tokens and the FastAPI dependencies that check them.
+
+A token is "<payload>.<signature>": base64url JSON {"sub", "roles", "exp"}
+signed with HMAC-SHA256 over SESSION_SECRET. Checking one is pure CPU, so
+authenticated routes no longer look the user up on every request. Roles are
+fixed when the token is issued and last until it expires; routes that need
+the current user record use db.get_user_by_id, which is cached with a TTL.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+
+from app.config import SESSION_SECRET, SESSION_TTL_SECONDS
+
+# Without a configured secret tokens stop working on restart and differ
+# between worker processes; set SESSION_SECRET in production
+_secret = (SESSION_SECRET or secrets.token_urlsafe(32)).encode()
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    roles: Tuple[str, ...]
+    expires: int
+
+    @property
+    def is_moderator(self) -> bool:
+        return "moderator" in self.roles or "admin" in self.roles
+
+    @property
+    def is_admin(self) -> bool:
+        return "admin" in self.roles
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def roles_of(user: Dict) -> Tuple[str, ...]:
+    return tuple(role for role, flag in (("user", "is_user"), ("moderator", "is_moderator"), ("admin", "is_admin"))
+                 if user.get(flag))
+
+
+def issue_token(user: Dict, ttl: int = SESSION_TTL_SECONDS) -> str:
+    """Signed token for a user row"""
+    claims = {"sub": user["id"], "roles": list(roles_of(user)), "exp": int(time.time()) + ttl}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: str) -> Optional[Principal]:
+    """The principal of a valid, unexpired token; None otherwise"""
+    # Tokens are base64url; anything else cannot be one (and would not encode for signing)
+    if not token.isascii():
+        return None
+    payload, _, signature = token.partition(".")
+    if not hmac.compare_digest(_sign(payload), signature):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+        principal = Principal(int(claims["sub"]), tuple(claims["roles"]), int(claims["exp"]))
+    except (ValueError, KeyError, TypeError):
+        return None
+    if principal.expires < time.time():
+        return None
+    return principal
+
+
+def optional_principal(request: Request) -> Optional[Principal]:
+    """Principal from "Authorization: Bearer <token>"; None without the header, 401 if it is invalid"""
+    header = request.headers.get("authorization")
+    if not header:
+        return None
+    scheme, _, token = header.partition(" ")
+    principal = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return principal
+
+
+def current_principal(principal: Optional[Principal] = Depends(optional_principal)) -> Principal:
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return principal
+
+
+def require_moderator(principal: Principal = Depends(current_principal)) -> Principal:
+    if not principal.is_moderator:
+        raise HTTPException(status_code=403, detail="Moderator only")
+    return principal
+
+
+def require_admin(principal: Principal = Depends(current_principal)) -> Principal:
+    if not principal.is_admin:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return principal
+
+
+def acting_user(principal: Principal, user_id: Optional[int]) -> int:
+    """The principal's user id; 403 if the request names a different user"""
+    if user_id is not None and user_id != principal.user_id:
+        raise HTTPException(status_code=403, detail="Token does not match user_id")
+    return principal.user_id
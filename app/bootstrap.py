@@ -0,0 +1,70 @@
+"""Database bootstrap for app startup, serialized across worker processes.
+
+Every worker runs the app lifespan, so bootstrap_db() takes an exclusive
+lock on "<db>.lock" first: the first worker creates and seeds (or upgrades)
+the database while the others wait, then find nothing left to do. Whether
+there is anything to do comes from the schema version stored in the file
+(see init_db.upgrade_db()), not from whether the file exists, and nothing
+is ever deleted.
+"""
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app import db
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Exclusive advisory lock on `path`, held across processes until the block exits"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            # LK_LOCK gives up after ~10 s; keep trying like flock would
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def bootstrap_db() -> float:
+    """Bring the database schema up to date, seeding a newly created database.
+
+    Returns the seconds spent, lock wait included.
+    """
+    import init_db
+
+    started = time.perf_counter()
+    init_db.DB_PATH = db.DB_PATH
+    with file_lock(db.DB_PATH.with_name(db.DB_PATH.name + ".lock")):
+        found = init_db.upgrade_db()
+        if found != init_db.SCHEMA_VERSION:
+            print(f"\n📁 Database schema v{found} -> v{init_db.SCHEMA_VERSION} (pid {os.getpid()})")
+        # Decided by the seed marker, not the version: a seed interrupted after
+        # the schema was committed is retried on the next start
+        if init_db.needs_seed():
+            print("\n🍋 Loading seed data...")
+            from seed_db import seed_movies_and_reviews
+            seed_movies_and_reviews()
+            print("\n✅ All ready!\n")
+    return time.perf_counter() - started
@@ -0,0 +1,165 @@
+"""Bounded in-process LRU + TTL cache for hot read helpers in app/db.py.
+
+Entries carry tags (e.g. "movie:42", "reviews:42", "catalog"); write helpers
+invalidate by tag after their transaction commits. The cache is per process,
+so with several workers the TTL bounds how stale another worker can be.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.config import CACHE_ENABLED, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+
+def approx_size(value: Any) -> int:
+    """Rough deep size in bytes of rows returned by the db helpers"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += sys.getsizeof(k) + approx_size(v)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += approx_size(item)
+    return size
+
+
+class LRUCache:
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # A single value may not take more than this share of the budget
+        self.max_entry_bytes = max_bytes // 8
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Tuple[str, ...], Any]]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    _MISSING = object()
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value, or LRUCache._MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return self._MISSING
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return self._MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None) -> None:
+        """Store `value`; `ttl` overrides the cache-wide TTL for this entry"""
+        size = approx_size(value)
+        if size > self.max_entry_bytes:
+            return
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, tags, value)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, tags, _ = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": CACHE_ENABLED,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = LRUCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable form of call arguments (lists such as keyset cursors become tuples)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def cached(tags: Callable[..., Iterable[str]], bypass: Optional[Callable[[], bool]] = None,
+           ttl: Optional[float] = None):
+    """Cache a helper's result under its name and arguments.
+
+    `tags` maps the call arguments to invalidation tags; `bypass` returning
+    True skips the cache (e.g. inside a write transaction); `ttl` overrides
+    the cache-wide TTL. Cached values are shared between callers and must
+    not be mutated.
+
+    Callers that derive HTTP validators from a change counter pass it as
+    `cache_version=`: it becomes part of the key instead of an argument, so a
+    value cached before the counter moved (possibly by another worker, which
+    this cache never hears about) is not served under the new validators.
+    """
+    def decorator(fn):
+        if not CACHE_ENABLED:
+            @wraps(fn)
+            def uncached(*args, cache_version: Hashable = None, **kwargs):
+                return fn(*args, **kwargs)
+
+            return uncached
+
+        @wraps(fn)
+        def wrapper(*args, cache_version: Hashable = None, **kwargs):
+            if bypass is not None and bypass():
+                return fn(*args, **kwargs)
+            key = (fn.__name__, cache_version, _freeze(args), _freeze(kwargs))
+            value = cache.get(key)
+            if value is LRUCache._MISSING:
+                value = fn(*args, **kwargs)
+                cache.set(key, value, tags(*args, **kwargs), ttl)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,68 @@
+"""Conditional GET support: ETag / Last-Modified validators and 304 responses"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+# Clients may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from a resource's kind and change counter(s)"""
+    return 'W/"' + "-".join(str(p) for p in parts) + '"'
+
+
+def http_date(timestamp: Optional[str]) -> Optional[str]:
+    """SQLite CURRENT_TIMESTAMP text (UTC) to an HTTP date"""
+    if not timestamp:
+        return None
+    try:
+        moment = datetime.strptime(str(timestamp)[:19], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def _validator_headers(etag: str, last_modified: Optional[str]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[str] = None) -> Optional[Response]:
+    """A 304 response if the client's copy is current, else None.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    when the client sent no ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # Weak comparison: W/"x" and "x" match
+        bare = etag[2:] if etag.startswith("W/") else etag
+        fresh = "*" in tags or any((t[2:] if t.startswith("W/") else t) == bare for t in tags)
+    elif last_modified and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            fresh = parsedate_to_datetime(last_modified) <= since
+        except (TypeError, ValueError):
+            fresh = False
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return Response(status_code=304, headers=_validator_headers(etag, last_modified))
+
+
+def validated_json(content: Any, etag: str, last_modified: Optional[str] = None) -> JSONResponse:
+    """200 JSON response carrying the validators"""
+    return JSONResponse(content, headers=_validator_headers(etag, last_modified))
+
+
+def validated_body(body: bytes, etag: str, last_modified: Optional[str] = None) -> Response:
+    """200 response with an already encoded JSON body, carrying the validators"""
+    return Response(body, media_type="application/json", headers=_validator_headers(etag, last_modified))
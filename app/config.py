@@ -13,3 +13,67 @@ DATABASE_ECHO = os.getenv("DATABASE_ECHO", "False").lower() == "true"
 
 def get_db_url():
     return DATABASE_URL
+
+# sqlite3 connection pool settings (app/db.py)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+# Threads (and therefore pooled connections) that run blocking DB helpers for async routes
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+
+# In-process read cache for hot db helpers (app/cache.py)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Response compression (app/main.py, app/assets.py)
+# JSON responses smaller than GZIP_MIN_SIZE bytes are sent uncompressed
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+# Password hashing (app/passwords.py); raising the work factor rehashes users on next login
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "16384"))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# Used only where hashlib.scrypt is unavailable
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+# Hashing threads, and jobs allowed to wait for one before logins get 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+
+# Signed session tokens (app/auth.py); all workers must share SESSION_SECRET
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+# How long a cached user record may lag behind the database (/api/users/me)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+# Prometheus metrics at /metrics (app/metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+# SQLite progress-handler granularity: VM steps are counted in units of this many instructions
+METRICS_VM_STEPS = int(os.getenv("METRICS_VM_STEPS", "10000"))
+
+# Per-request SQL profiler (app/profiler.py)
+SQL_PROFILE_ENABLED = os.getenv("SQL_PROFILE_ENABLED", "True").lower() == "true"
+# Let admins ask for a profile with "X-SQL-Profile: 1" or ?sql_profile=1 (and their token)
+SQL_PROFILE_OPT_IN = os.getenv("SQL_PROFILE_OPT_IN", "False").lower() == "true"
+# Share of all requests profiled regardless of the flag
+SQL_PROFILE_SAMPLE_RATE = float(os.getenv("SQL_PROFILE_SAMPLE_RATE", "0.0"))
+# Warn when one normalized statement runs more than this many times in a request
+SQL_PROFILE_REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "10"))
+SQL_PROFILE_SLOW_MS = float(os.getenv("SQL_PROFILE_SLOW_MS", "100"))
+# Profiled statement executions kept for the top-N report
+SQL_PROFILE_WINDOW = int(os.getenv("SQL_PROFILE_WINDOW", "10000"))
+
+# Server (run.py / app/server.py)
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# Worker processes; 0 means one per CPU. More than one needs a shared SESSION_SECRET
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+# "auto" picks uvloop/httptools when installed; "asyncio"/"h11" force the pure-Python ones
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "5"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "False").lower() == "true"
@@ -1,35 +1,221 @@
 """Database helper functions using sqlite3"""
+import asyncio
+import functools
 import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 import json
-from datetime import datetime
+
+from app.cache import cache, cached
+from app import metrics
+from app.config import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_POOL_SIZE,
+    SQLITE_STATEMENT_CACHE,
+    USER_CACHE_TTL_SECONDS,
+)
 
 DB_PATH = Path(__file__).parent.parent / "kinovzor.db"
 
-def get_db() -> sqlite3.Connection:
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
+# Connection pool: one long-lived, pre-configured connection per thread.
+# Every helper on the same thread reuses it instead of connect()/close().
+_local = threading.local()
+_connections: "weakref.WeakSet[sqlite3.Connection]" = weakref.WeakSet()
+_connections_lock = threading.Lock()
+_generation = 0
+
+def _statement_starts() -> None:
+    """Tell the request's QueryStats (if any) that a new statement is starting"""
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats.on_execute()
+
+class _PooledCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        _statement_starts()
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        _statement_starts()
+        return super().executemany(*args)
+
+class _PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection that can be tracked weakly, so a connection is
+    closed together with the thread that owned it, and whose statements
+    mark where they start for the request metrics"""
+
+    def cursor(self, factory=_PooledCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        _statement_starts()
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        _statement_starts()
+        return super().executemany(*args)
+
+def _connect() -> sqlite3.Connection:
+    """Open a new connection with the pool PRAGMAs applied"""
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=SQLITE_STATEMENT_CACHE,
+        check_same_thread=False,
+        factory=_PooledConnection,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(SQLITE_CACHE_SIZE_KB)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
+def get_db() -> sqlite3.Connection:
+    """Get the pooled database connection for the current thread"""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = _connect()
+        _local.conn = conn
+        _local.generation = _generation
+        _local.depth = 0
+        with _connections_lock:
+            _connections.add(conn)
+    return conn
+
+def close_all() -> None:
+    """Close every pooled connection (shutdown, or after the DB file is replaced)"""
+    global _generation
+    with _connections_lock:
+        conns = list(_connections)
+        _connections.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    cache.clear()
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Run a block of helpers on one connection inside one transaction.
+
+    Write helpers called inside the block join it instead of committing on
+    their own; the outermost block commits on success and rolls back on error.
+    """
+    conn = get_db()
+    if _local.depth == 0:
+        _local.pending_tags = set()
+    if _local.depth == 0 and not conn.in_transaction:
+        # IMMEDIATE takes the write lock up front (waiting up to busy_timeout);
+        # a deferred read-then-write would fail with SQLITE_BUSY under contention
+        conn.execute("BEGIN IMMEDIATE")
+    _local.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.rollback()
+            _local.pending_tags = set()
+        raise
+    _local.depth -= 1
+    if _local.depth == 0:
+        conn.commit()
+        if _local.pending_tags:
+            cache.invalidate(*_local.pending_tags)
+            _local.pending_tags = set()
+
+def _invalidate(*tags: str) -> None:
+    """Drop cached reads with these tags once the current transaction commits"""
+    _local.pending_tags.update(tags)
+
+def _in_transaction() -> bool:
+    """Reads inside a transaction skip the cache so they see its own writes"""
+    return getattr(_local, "depth", 0) > 0
+
+# Async bridge: async routes hand blocking helpers to a dedicated, bounded
+# thread pool. Each of its threads owns one pooled connection, so requests
+# queue here instead of exhausting Starlette's shared threadpool.
+_executor = ThreadPoolExecutor(max_workers=SQLITE_POOL_SIZE, thread_name_prefix="kinovzor-db")
+
+T = TypeVar("T")
+
+async def run(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a blocking helper (or a block of them) on the DB thread pool"""
+    loop = asyncio.get_running_loop()
+    job = functools.partial(fn, *args, **kwargs)
+    stats = metrics.current()
+    if stats is not None:
+        job = functools.partial(_run_measured, stats, job)
+    return await loop.run_in_executor(_executor, job)
+
+def _run_measured(stats: metrics.QueryStats, job: Callable[[], T]) -> T:
+    """Run a job with the request's statement/VM-step hooks on this thread's connection"""
+    conn = get_db()
+    conn.set_trace_callback(stats.on_statement)
+    conn.set_progress_handler(stats.on_progress, metrics.VM_STEPS)
+    _local.stats = stats
+    started = time.perf_counter()
+    try:
+        return job()
+    finally:
+        stats.db_seconds += time.perf_counter() - started
+        stats.on_job_end()
+        _local.stats = None
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(None, 0)
+
+def _count_rows(n: int) -> None:
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats.rows += n
+
 def dict_from_row(row: sqlite3.Row) -> Dict[str, Any]:
     """Convert sqlite3.Row to dict"""
     if row is None:
         return None
+    _count_rows(1)
     return dict(row)
 
 def dicts_from_rows(rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
     """Convert list of sqlite3.Row to list of dicts"""
+    _count_rows(len(rows))
     return [dict(row) for row in rows]
 
+# Site counters
+def get_site_counters() -> Dict:
+    """Site-wide row counts, maintained by triggers (single-row lookup)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT movies, reviews, approved_reviews, ratings, users, favorites FROM site_counters WHERE id = 1")
+    counters = cursor.fetchone()
+    return dict_from_row(counters)
+
+def get_catalog_version() -> Dict:
+    """Catalog change counter and time of the last change (single-row lookup)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT catalog_version AS version, catalog_updated_at AS updated_at FROM site_counters WHERE id = 1")
+    version = cursor.fetchone()
+    return dict_from_row(version)
+
 # Users
 def get_user_by_email(email: str) -> Optional[Dict]:
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
-    conn.close()
     return dict_from_row(user)
 
 def get_user_by_username(username: str) -> Optional[Dict]:
@@ -38,162 +224,392 @@ def get_user_by_username(username: str) -> Optional[Dict]:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
     user = cursor.fetchone()
-    conn.close()
     return dict_from_row(user)
 
+# Tagged "user:<id>"; short TTL since roles and profile can change outside this process
+@cached(lambda user_id: (f"user:{user_id}",), bypass=_in_transaction, ttl=USER_CACHE_TTL_SECONDS)
 def get_user_by_id(user_id: int) -> Optional[Dict]:
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
     user = cursor.fetchone()
-    conn.close()
     return dict_from_row(user)
 
-def create_user(email: str, password: str, username: str, is_moderator: bool = False) -> Dict:
-    """Create user with optional moderator flag"""
+def create_user(email: str, password: str, username: str, is_moderator: bool = False) -> Optional[Dict]:
+    """Create user with optional moderator flag; None if the email is taken"""
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO users (email, password, username, is_moderator) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (email) DO NOTHING RETURNING *",
+            (email, password, username, is_moderator)
+        )
+        user = cursor.fetchone()
+        if user:
+            _invalidate(f"user:{user['id']}")
+    return dict_from_row(user)
+
+def update_user_password(user_id: int, password: str) -> None:
+    """Store a new password hash (rehash on login)"""
+    with transaction() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE id = ?", (password, user_id))
+        _invalidate(f"user:{user_id}")
+
+# Movies
+# Cached reads are tagged "movie:<id>", "reviews:<id>" and "stats:<id>" per
+# movie, "catalog" for listings and "favorites:<user id>" per user; write
+# helpers invalidate those tags.
+
+# Catalog sort orders: ORDER BY clause, keyset predicate continuing after a
+# given row, and the columns that make up that row's sort key
+MOVIE_SORTS = {
+    "popular": ("id DESC", "id < ?", ("id",)),
+    "title": ("title ASC, id ASC", "(title, id) > (?, ?)", ("title", "id")),
+    "year": ("year DESC, id DESC", "(year, id) < (?, ?)", ("year", "id")),
+    "rating": ("rating_avg DESC, id DESC", "(rating_avg, id) < (?, ?)", ("rating_avg", "id")),
+}
+
+def _movies_page(select: str, genre: Optional[str], sort: str, limit: int, offset: int,
+                 after: Optional[List[Any]]) -> List[sqlite3.Row]:
+    order_by, seek, _ = MOVIE_SORTS.get(sort, MOVIE_SORTS["popular"])
+    where, params = [], []
+    if genre:
+        where.append("genre = ?")
+        params.append(genre)
+    if after is not None:
+        where.append(seek)
+        params.extend(after)
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+    params.extend((limit, offset))
+
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users (email, password, username, is_moderator) VALUES (?, ?, ?, ?)",
-        (email, password, username, is_moderator)
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+@cached(lambda *args, **kwargs: ("catalog",), bypass=_in_transaction)
+def get_movies_page(genre: Optional[str] = None, sort: str = "popular", limit: int = 50,
+                    offset: int = 0, after: Optional[List[Any]] = None) -> List[Dict]:
+    """One page of the catalog, filtered and ordered in SQL.
+
+    `after` is the sort key of the last row of the previous page (keyset
+    pagination); `offset` is only meant for shallow pages.
+    """
+    movies = _movies_page("SELECT * FROM movies", genre, sort, limit, offset, after)
+    return dicts_from_rows(movies)
+
+@cached(lambda *args, **kwargs: ("catalog",), bypass=_in_transaction)
+def get_movie_cards_page(genre: Optional[str] = None, sort: str = "popular", limit: int = 50,
+                         offset: int = 0, after: Optional[List[Any]] = None) -> List[Tuple[str, List[Any]]]:
+    """get_movies_page() as (pre-encoded JSON card, sort key) pairs from movie_cards"""
+    key_columns = MOVIE_SORTS.get(sort, MOVIE_SORTS["popular"])[2]
+    rows = _movies_page(
+        f"SELECT movie_cards.card, {', '.join(key_columns)} FROM movies "
+        "JOIN movie_cards ON movie_cards.movie_id = movies.id",
+        genre, sort, limit, offset, after,
     )
-    conn.commit()
-    user_id = cursor.lastrowid
-    conn.close()
-    return get_user_by_id(user_id)
+    _count_rows(len(rows))
+    return [(row[0], list(row)[1:]) for row in rows]
 
-# Movies
-def get_all_movies() -> List[Dict]:
+@cached(lambda: ("catalog",), bypass=_in_transaction)
+def get_genres() -> List[str]:
+    """Distinct catalog genres, read off the (genre, id) index"""
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM movies ORDER BY id DESC")
-    movies = cursor.fetchall()
-    conn.close()
-    return dicts_from_rows(movies)
+    cursor.execute("SELECT DISTINCT genre FROM movies ORDER BY genre")
+    genres = cursor.fetchall()
+    _count_rows(len(genres))
+    return [row[0] for row in genres]
 
+@cached(lambda movie_id: (f"movie:{movie_id}",), bypass=_in_transaction)
 def get_movie_by_id(movie_id: int) -> Optional[Dict]:
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM movies WHERE id = ?", (movie_id,))
     movie = cursor.fetchone()
-    conn.close()
     return dict_from_row(movie)
 
+def get_movie_version(movie_id: int) -> Optional[Dict]:
+    """Change counter and last update time of one movie; None if it does not exist"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT version, updated_at FROM movies WHERE id = ?", (movie_id,))
+    version = cursor.fetchone()
+    return dict_from_row(version)
+
 def create_movie(title: str, description: str, genre: str, year: int, poster_url: str = None) -> Dict:
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO movies (title, description, genre, year, poster_url) VALUES (?, ?, ?, ?, ?) RETURNING *",
+            (title, description, genre, year, poster_url)
+        )
+        movie = cursor.fetchone()
+        _invalidate("catalog", f"movie:{movie['id']}")
+    return dict_from_row(movie)
+
+def create_movies_bulk(rows: List[tuple]) -> int:
+    """Insert (title, description, genre, year, poster_url) rows in one transaction"""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO movies (title, description, genre, year, poster_url) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        _invalidate("catalog")
+    return len(rows)
+
+# Search: title matches outrank description matches, which outrank reviews
+SEARCH_WEIGHTS = (10.0, 2.0)
+SEARCH_REVIEW_WEIGHT = 0.5
+# For very common terms only the newest matching reviews are ranked
+SEARCH_REVIEW_CANDIDATES = 2000
+
+def search_movies(match: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """Movies matching an FTS5 expression, best bm25 first.
+
+    Each movie is ranked by its best hit, either in its own title and
+    description ("matched": "movie") or in one of its approved reviews
+    ("matched": "review", with that review's text as "review_text").
+    """
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
-        "INSERT INTO movies (title, description, genre, year, poster_url) VALUES (?, ?, ?, ?, ?)",
-        (title, description, genre, year, poster_url)
+        """
+        WITH hits AS (
+            SELECT rowid AS movie_id, bm25(movies_fts, ?, ?) AS score, NULL AS review_id
+            FROM movies_fts WHERE movies_fts MATCH ?
+            UNION ALL
+            SELECT movie_id, score * ?, review_id FROM (
+                SELECT movie_id, bm25(reviews_fts) AS score, rowid AS review_id
+                FROM reviews_fts WHERE reviews_fts MATCH ?
+                ORDER BY rowid DESC LIMIT ?
+            )
+        ),
+        best AS (
+            SELECT movie_id, score, review_id,
+                   ROW_NUMBER() OVER (PARTITION BY movie_id ORDER BY score, review_id DESC) AS n
+            FROM hits
+        ),
+        page AS (
+            SELECT movie_id, score, review_id FROM best WHERE n = 1
+            ORDER BY score, movie_id LIMIT ? OFFSET ?
+        )
+        SELECT m.*, page.score, r.text AS review_text
+        FROM page
+        JOIN movies m ON m.id = page.movie_id
+        LEFT JOIN reviews r ON r.id = page.review_id
+        ORDER BY page.score, page.movie_id
+        """,
+        (*SEARCH_WEIGHTS, match, SEARCH_REVIEW_WEIGHT, match, SEARCH_REVIEW_CANDIDATES, limit, offset)
     )
-    conn.commit()
-    movie_id = cursor.lastrowid
-    conn.close()
-    return get_movie_by_id(movie_id)
+    movies = dicts_from_rows(cursor.fetchall())
+    for movie in movies:
+        movie["score"] = round(-movie["score"], 4)
+        movie["matched"] = "movie" if movie["review_text"] is None else "review"
+    return movies
 
-# Reviews
-def create_review(movie_id: int, user_id: int, text: str, rating: int = None) -> Dict:
+def existing_ids(table: str, ids: List[int]) -> set:
+    """Subset of ids present in `table`, in one indexed query"""
+    if table not in ("movies", "users"):
+        raise ValueError(f"Unsupported table: {table}")
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute(
-        "INSERT INTO reviews (movie_id, user_id, text, rating, approved) VALUES (?, ?, ?, ?, ?)",
-        (movie_id, user_id, text, rating, False)
+        f"SELECT t.id FROM {table} t JOIN json_each(?) j ON t.id = j.value",
+        (json.dumps(sorted(set(ids))),)
     )
-    conn.commit()
-    review_id = cursor.lastrowid
-    conn.close()
-    return get_review_by_id(review_id)
+    return {row[0] for row in cursor.fetchall()}
+
+# Reviews
+def _invalidate_movie_reviews(movie_id: int) -> None:
+    """Review writes change the listing and, through the triggers, the movie's aggregates"""
+    _invalidate("catalog", f"movie:{movie_id}", f"reviews:{movie_id}", f"stats:{movie_id}")
+
+def create_review(movie_id: int, user_id: int, text: str, rating: int = None) -> Dict:
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO reviews (movie_id, user_id, text, rating, approved) VALUES (?, ?, ?, ?, ?) "
+            "RETURNING *, (SELECT username FROM users u WHERE u.id = reviews.user_id) AS username",
+            (movie_id, user_id, text, rating, False)
+        )
+        review = cursor.fetchone()
+        _invalidate_movie_reviews(movie_id)
+    return dict_from_row(review)
+
+def create_reviews_bulk(rows: List[tuple]) -> int:
+    """Insert (movie_id, user_id, text, rating, approved) rows in one transaction"""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO reviews (movie_id, user_id, text, rating, approved) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        for movie_id in {row[0] for row in rows}:
+            _invalidate_movie_reviews(movie_id)
+    return len(rows)
 
 def get_review_by_id(review_id: int) -> Optional[Dict]:
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT r.*, u.username FROM reviews r LEFT JOIN users u ON r.user_id = u.id WHERE r.id = ?", (review_id,))
     review = cursor.fetchone()
-    conn.close()
     return dict_from_row(review)
 
-def get_movie_reviews(movie_id: int, approved_only: bool = True) -> List[Dict]:
+@cached(lambda movie_id, *args, **kwargs: (f"reviews:{movie_id}",), bypass=_in_transaction)
+def get_movie_reviews(movie_id: int, approved_only: bool = True, limit: int = -1,
+                      after: Optional[List[Any]] = None) -> List[Dict]:
+    """Newest reviews first; `limit` < 0 means all of them.
+
+    `after` is the (created_at, id) of the last review of the previous page;
+    idx_reviews_movie_created / idx_reviews_movie_approved_created end in
+    (created_at, rowid), so every page is an index range scan.
+    """
+    where, params = ["r.movie_id = ?"], [movie_id]
+    if approved_only:
+        where.append("r.approved = 1")
+    if after is not None:
+        where.append("(r.created_at, r.id) < (?, ?)")
+        params.extend(after)
+    params.append(limit)
+
     conn = get_db()
     cursor = conn.cursor()
-    if approved_only:
-        cursor.execute(
-            "SELECT r.*, u.username FROM reviews r LEFT JOIN users u ON r.user_id = u.id WHERE r.movie_id = ? AND r.approved = 1 ORDER BY r.created_at DESC", 
-            (movie_id,)
-        )
-    else:
-        cursor.execute(
-            "SELECT r.*, u.username FROM reviews r LEFT JOIN users u ON r.user_id = u.id WHERE r.movie_id = ? ORDER BY r.created_at DESC", 
-            (movie_id,)
-        )
+    cursor.execute(
+        "SELECT r.*, u.username FROM reviews r LEFT JOIN users u ON r.user_id = u.id "
+        f"WHERE {' AND '.join(where)} ORDER BY r.created_at DESC, r.id DESC LIMIT ?",
+        params
+    )
     reviews = cursor.fetchall()
-    conn.close()
     return dicts_from_rows(reviews)
 
 def approve_review(review_id: int) -> bool:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE reviews SET approved = 1 WHERE id = ?", (review_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        row = conn.execute("UPDATE reviews SET approved = 1 WHERE id = ? RETURNING movie_id", (review_id,)).fetchone()
+        if row:
+            _invalidate_movie_reviews(row[0])
     return True
 
 def delete_review(review_id: int) -> bool:
+    with transaction() as conn:
+        row = conn.execute("DELETE FROM reviews WHERE id = ? RETURNING movie_id", (review_id,)).fetchone()
+        if row:
+            _invalidate_movie_reviews(row[0])
+    return True
+
+def get_pending_reviews(limit: int = 50, after: Optional[List[Any]] = None) -> List[Dict]:
+    """Unapproved reviews across all movies, oldest first.
+
+    Served by the partial index idx_reviews_pending; `after` is the
+    (created_at, id) of the last review of the previous page.
+    """
+    sql = (
+        "SELECT r.*, u.username, m.title AS movie_title FROM reviews r "
+        "LEFT JOIN users u ON r.user_id = u.id JOIN movies m ON r.movie_id = m.id "
+        "WHERE r.approved = 0"
+    )
+    params: List[Any] = []
+    if after is not None:
+        sql += " AND (r.created_at, r.id) > (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY r.created_at, r.id LIMIT ?"
+    params.append(limit)
+
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
-    conn.commit()
-    conn.close()
-    return True
+    cursor.execute(sql, params)
+    reviews = cursor.fetchall()
+    return dicts_from_rows(reviews)
+
+def moderate_reviews(approve_ids: List[int], delete_ids: List[int]) -> Dict[str, List[int]]:
+    """Approve and delete many reviews in one transaction.
+
+    Ids that do not exist (or are already approved) are left out of the
+    result. The triggers keep aggregates and counters current per row; the
+    cache is invalidated once per affected movie after the commit.
+    """
+    with transaction() as conn:
+        approved = conn.execute(
+            "UPDATE reviews SET approved = 1 "
+            "WHERE id IN (SELECT value FROM json_each(?)) AND approved = 0 RETURNING id, movie_id",
+            (json.dumps(approve_ids),)
+        ).fetchall()
+        deleted = conn.execute(
+            "DELETE FROM reviews WHERE id IN (SELECT value FROM json_each(?)) RETURNING id, movie_id",
+            (json.dumps(delete_ids),)
+        ).fetchall()
+        for movie_id in {row[1] for row in approved + deleted}:
+            _invalidate_movie_reviews(movie_id)
+    return {
+        "approved": sorted(row[0] for row in approved),
+        "deleted": sorted(row[0] for row in deleted),
+    }
 
 # Ratings - Calculate from reviews
+@cached(lambda movie_id: (f"stats:{movie_id}",), bypass=_in_transaction)
 def get_rating_stats(movie_id: int) -> Dict:
     """Получаем статистику рейтинга из оценок рецензий"""
     conn = get_db()
     cursor = conn.cursor()
-    # считаем средние и количество оценок из рецензий
+    # агрегаты по оценкам рецензий поддерживаются триггерами на reviews
     cursor.execute(
-        "SELECT COUNT(*) as count, AVG(rating) as average FROM reviews WHERE movie_id = ? AND rating IS NOT NULL",
+        "SELECT rating_count, rating_sum FROM movies WHERE id = ?",
         (movie_id,)
     )
     result = cursor.fetchone()
-    conn.close()
-    
-    if result and result['count'] > 0:
+    return rating_stats_from_row(result)
+
+def rating_stats_from_row(movie: Optional[Dict]) -> Dict:
+    """Rating statistics from a movie row's maintained aggregates"""
+    if movie and movie['rating_count'] > 0:
         return {
-            "count": result['count'],
-            "average": round(float(result['average']), 1)
+            "count": movie['rating_count'],
+            "average": round(movie['rating_sum'] / movie['rating_count'], 1)
         }
     return {"count": 0, "average": None}
 
 def create_or_update_rating(movie_id: int, user_id: int, value: float) -> Dict:
     """Legacy function - kept for compatibility"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Check if rating exists
-    cursor.execute("SELECT * FROM ratings WHERE movie_id = ? AND user_id = ?", (movie_id, user_id))
-    existing = cursor.fetchone()
-    
-    if existing:
-        cursor.execute("UPDATE ratings SET value = ? WHERE movie_id = ? AND user_id = ?", (value, movie_id, user_id))
-        rating_id = existing['id']
-    else:
+    with transaction() as conn:
+        cursor = conn.cursor()
+        # Atomic upsert on the (movie_id, user_id) unique index
         cursor.execute(
-            "INSERT INTO ratings (movie_id, user_id, value) VALUES (?, ?, ?)",
+            "INSERT INTO ratings (movie_id, user_id, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (movie_id, user_id) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP "
+            # RETURNING hands back the value before REAL affinity is applied
+            "RETURNING id, movie_id, user_id, CAST(value AS REAL) AS value, created_at, updated_at",
             (movie_id, user_id, value)
         )
-        rating_id = cursor.lastrowid
-    
-    conn.commit()
-    conn.close()
-    return get_rating_by_id(rating_id)
+        rating = cursor.fetchone()
+        # Nothing cached reads the ratings table: rating stats and the movie
+        # aggregates come from review ratings, so there is nothing to invalidate
+    return dict_from_row(rating)
+
+def upsert_ratings_bulk(rows: List[tuple]) -> int:
+    """Create or update (movie_id, user_id, value) rows in one transaction"""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT INTO ratings (movie_id, user_id, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (movie_id, user_id) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP",
+            rows
+        )
+    return len(rows)
+
+def get_user_rating(movie_id: int, user_id: int) -> Optional[float]:
+    """The user's rating value for a movie, if any"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM ratings WHERE movie_id = ? AND user_id = ?", (movie_id, user_id))
+    rating = cursor.fetchone()
+    return rating[0] if rating else None
 
 def get_rating_by_id(rating_id: int) -> Optional[Dict]:
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM ratings WHERE id = ?", (rating_id,))
     rating = cursor.fetchone()
-    conn.close()
     return dict_from_row(rating)
 
 def get_movie_ratings(movie_id: int) -> List[Dict]:
@@ -201,34 +617,30 @@ def get_movie_ratings(movie_id: int) -> List[Dict]:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM ratings WHERE movie_id = ?", (movie_id,))
     ratings = cursor.fetchall()
-    conn.close()
     return dicts_from_rows(ratings)
 
 # Favorites
 def add_favorite(movie_id: int, user_id: int) -> Dict:
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Check if already exists
-    cursor.execute("SELECT * FROM favorites WHERE movie_id = ? AND user_id = ?", (movie_id, user_id))
-    if cursor.fetchone():
-        conn.close()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        # The (movie_id, user_id) unique index decides; no row back means it already existed
+        cursor.execute(
+            "INSERT INTO favorites (movie_id, user_id) VALUES (?, ?) "
+            "ON CONFLICT (movie_id, user_id) DO NOTHING RETURNING id",
+            (movie_id, user_id)
+        )
+        added = cursor.fetchone()
+        if added:
+            _invalidate(f"favorites:{user_id}")
+    if not added:
         return {"error": "Already in favorites"}
-    
-    cursor.execute(
-        "INSERT INTO favorites (movie_id, user_id) VALUES (?, ?)",
-        (movie_id, user_id)
-    )
-    conn.commit()
-    conn.close()
     return {"status": "added"}
 
 def remove_favorite(movie_id: int, user_id: int) -> Dict:
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM favorites WHERE movie_id = ? AND user_id = ?", (movie_id, user_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        removed = conn.execute("DELETE FROM favorites WHERE movie_id = ? AND user_id = ?", (movie_id, user_id))
+        if removed.rowcount:
+            _invalidate(f"favorites:{user_id}")
     return {"status": "removed"}
 
 def get_user_favorites(user_id: int) -> List[Dict]:
@@ -239,13 +651,19 @@ def get_user_favorites(user_id: int) -> List[Dict]:
         (user_id,)
     )
     movies = cursor.fetchall()
-    conn.close()
     return dicts_from_rows(movies)
 
+@cached(lambda user_id: (f"favorites:{user_id}",), bypass=_in_transaction)
+def get_user_favorite_ids(user_id: int) -> List[int]:
+    """Ids of all movies the user has favorited, ascending (covered by idx_favorites_user_movie)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT movie_id FROM favorites WHERE user_id = ? ORDER BY movie_id", (user_id,))
+    return [row[0] for row in cursor.fetchall()]
+
 def is_favorite(movie_id: int, user_id: int) -> bool:
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT 1 FROM favorites WHERE movie_id = ? AND user_id = ?", (movie_id, user_id))
     result = cursor.fetchone()
-    conn.close()
     return result is not None
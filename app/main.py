@@ -1,32 +1,39 @@
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from fastapi import FastAPI, status
-from fastapi.responses import RedirectResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import Depends, FastAPI, Query, status
+from fastapi.responses import RedirectResponse, FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.users.router import router as router_users
 from app.movies.router import router as router_movies
 from app import db
+from app import profiler
+from app.assets import StaticAssets
+from app.auth import require_admin
+from app.bootstrap import bootstrap_db
+from app.cache import cache
+from app.config import GZIP_LEVEL, GZIP_MIN_SIZE, METRICS_ENABLED, SQL_PROFILE_ENABLED
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry
 import os
 
-# Initialize database if not exists
-if not Path(__file__).parent.parent.joinpath('kinovzor.db').exists():
-    print("\n📁 Database not found. Creating...")
-    from init_db import init_db
-    init_db()
-    print("\n🍋 Loading seed data...")
-    from seed_db import seed_movies_and_reviews
-    seed_movies_and_reviews()
-    print("\n✅ All ready!\n")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create/upgrade the database once per start, not at import time; the
+    # file lock keeps several workers from bootstrapping it concurrently
+    bootstrap_db()
+    yield
+    db.close_all()
 
 app = FastAPI(
     title="KinoVzor API",
     description="Movie review and rating platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Enable CORS
@@ -38,6 +45,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large API responses; static assets are served precompressed
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+# Per-route request/DB metrics and the opt-in SQL profiler; added last so
+# it times the whole stack
+if SQL_PROFILE_ENABLED:
+    app.add_middleware(profiler.ProfilingMiddleware)
+elif METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers FIRST (before static files)
 app.include_router(router_users)
 app.include_router(router_movies)
@@ -45,9 +62,9 @@ app.include_router(router_movies)
 # Get the correct path for static files
 STATIC_DIR = Path(__file__).parent / "static"
 
-# Mount static files
+# Mount static files (fingerprinted and precompressed at startup)
 if STATIC_DIR.exists():
-    app.mount('/static', StaticFiles(directory=str(STATIC_DIR)), 'static')
+    app.mount('/static', StaticAssets(STATIC_DIR), 'static')
 else:
     print(f"\n⚠️ Warning: Static directory not found at {STATIC_DIR}")
 
@@ -56,17 +73,23 @@ else:
 async def root():
     return RedirectResponse(url="/static/index.html", status_code=status.HTTP_303_SEE_OTHER)
 
+# Read cache hit/miss/eviction counters (internal keys and sizes: admin only)
+@app.get('/api/cache/stats', dependencies=[Depends(require_admin)])
+async def cache_stats():
+    return cache.stats()
+
+# Slowest SQL statements among recently profiled requests
+@app.get('/api/admin/sql/top', dependencies=[Depends(require_admin)])
+async def sql_top(limit: int = Query(20, ge=1, le=200)):
+    return profiler.report(limit)
+
+# Prometheus scrape endpoint; only exists with METRICS_ENABLED
+if METRICS_ENABLED:
+    @app.get('/metrics', include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
-    import uvicorn
-    
-    print("\n" + "="*50)
-    print("🌟 KinoVzor - Movie Review Platform")
-    print("="*50)
-    print("\n🚀 Starting server...\n")
-    
-    uvicorn.run(
-        "app.main:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=True
-    )
+    # Development server; use run.py for production
+    from app.server import serve
+    serve(reload=True)
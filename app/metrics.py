@@ -0,0 +1,222 @@
+"""Per-route request and database metrics in Prometheus text format.
+
+MetricsMiddleware times every HTTP request and labels it with the matched
+route template ("/api/movies/{movie_id}"), so label cardinality stays fixed.
+While a request runs, db.run() attaches its QueryStats to the pooled
+connection that does the work: sqlite3's trace callback counts statements,
+the progress handler counts VM steps in units of METRICS_VM_STEPS, and
+db.run() adds the job's wall time. Hooks are only installed for jobs that
+belong to a request, so scripts and the generator pay nothing.
+
+Values are per process; with several workers, scrape each one or sum them.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from app.cache import cache
+from app.config import METRICS_VM_STEPS
+
+# Prometheus default buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+VM_STEPS = METRICS_VM_STEPS
+
+
+class QueryStats:
+    """SQLite work done on behalf of one request"""
+
+    __slots__ = ("queries", "rows", "db_seconds", "vm_steps", "_last")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.vm_steps = 0
+        self._last = None
+
+    def on_execute(self) -> None:
+        """Called by app/db.py before each execute()/executemany()"""
+        self._last = None
+
+    def on_statement(self, sql: str) -> bool:
+        """Count a trace event; False if it was part of the statement before.
+
+        sqlite3 reports each trigger sub-program (and each statement in it)
+        with the text of the statement that fired it, and statements nested
+        in a running one as "-- <sql>"; count the outer statement once.
+        on_execute() clears _last, so running the same statement again, as
+        an N+1 loop does, still counts every time.
+        """
+        if sql == self._last or sql.startswith("-- "):
+            return False
+        self._last = sql
+        self.queries += 1
+        return True
+
+    def on_progress(self) -> int:
+        self.vm_steps += VM_STEPS
+        return 0
+
+    def on_job_end(self) -> None:
+        """Called by db.run() after each job, on the job's thread"""
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current() -> Optional[QueryStats]:
+    """QueryStats of the request being handled, if any"""
+    return _current.get()
+
+
+class _RouteMetrics:
+    __slots__ = ("statuses", "buckets", "seconds", "count", "queries", "rows", "db_seconds", "vm_steps")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.seconds = 0.0
+        self.count = 0
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.vm_steps = 0
+
+
+class Registry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self._lock = threading.Lock()
+        self.in_progress = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: QueryStats) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = _RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            metrics.seconds += seconds
+            metrics.count += 1
+            metrics.queries += stats.queries
+            metrics.rows += stats.rows
+            metrics.db_seconds += stats.db_seconds
+            metrics.vm_steps += stats.vm_steps
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines: List[str] = []
+
+            def family(name: str, kind: str, help_text: str) -> None:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            family("kinovzor_http_requests_total", "counter", "HTTP requests by route and status.")
+            for (method, route), m in routes:
+                for status, n in sorted(m.statuses.items()):
+                    lines.append(f'kinovzor_http_requests_total{{{_labels(method, route)},status="{status}"}} {n}')
+
+            family("kinovzor_http_request_duration_seconds", "histogram", "HTTP request latency by route.")
+            for (method, route), m in routes:
+                labels = _labels(method, route)
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), m.buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'kinovzor_http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"kinovzor_http_request_duration_seconds_sum{{{labels}}} {m.seconds!r}")
+                lines.append(f"kinovzor_http_request_duration_seconds_count{{{labels}}} {m.count}")
+
+            for name, attr, help_text in (
+                ("kinovzor_db_queries_total", "queries", "SQL statements run for requests to the route."),
+                ("kinovzor_db_rows_total", "rows", "Rows returned to the route by db helpers."),
+                ("kinovzor_db_seconds_total", "db_seconds", "Time spent in db helpers for the route."),
+                ("kinovzor_db_vm_steps_total", "vm_steps", "Approximate SQLite VM instructions for the route."),
+            ):
+                family(name, "counter", help_text)
+                for (method, route), m in routes:
+                    lines.append(f"{name}{{{_labels(method, route)}}} {getattr(m, attr)!r}")
+
+            family("kinovzor_http_requests_in_progress", "gauge", "HTTP requests being handled.")
+            lines.append(f"kinovzor_http_requests_in_progress {self.in_progress}")
+
+        stats = cache.stats()
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            if key in stats:
+                family(f"kinovzor_cache_{key}_total", "counter", f"Read cache {key}.")
+                lines.append(f"kinovzor_cache_{key}_total {stats[key]}")
+        for key in ("entries", "bytes"):
+            if key in stats:
+                family(f"kinovzor_cache_{key}", "gauge", f"Read cache {key}.")
+                lines.append(f"kinovzor_cache_{key} {stats[key]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+
+registry = Registry()
+
+
+def route_of(scope: Dict) -> str:
+    """Route template of a handled request; mounts by prefix, anything else as "unmatched" """
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    if scope.get("root_path"):
+        return scope["root_path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding `registry`; add it last so it wraps everything"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def start(self, scope) -> QueryStats:
+        """Stats object that db.run() fills for this request"""
+        return QueryStats()
+
+    def response_headers(self, stats: QueryStats) -> List[Tuple[bytes, bytes]]:
+        """Extra headers for the response"""
+        return []
+
+    def finish(self, method: str, route: str, status: int, seconds: float, stats: QueryStats) -> None:
+        registry.observe(method, route, status, seconds, stats)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = self.start(scope)
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                extra = self.response_headers(stats)
+                if extra:
+                    message["headers"] = list(message.get("headers", [])) + extra
+            await send(message)
+
+        registry.in_progress += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_progress -= 1
+            _current.reset(token)
+            self.finish(scope["method"], route_of(scope), status, time.perf_counter() - started, stats)
@@ -1,13 +1,325 @@
-from app.movies.models import Movie, Review, Rating, Favorite
+import json
+from typing import Dict, List, Optional, Tuple
+from app import db
+from app.pagination import decode_cursor, encode_cursor, valid_key
+from app.search import match_expression, query_terms, snippet
+
 
 class MovieDAO:
-    pass
+    @classmethod
+    async def find_page(cls, genre: Optional[str] = None, sort: str = "popular", limit: int = 50,
+                        offset: int = 0, cursor: Optional[str] = None) -> Dict:
+        """Catalog page plus the cursor for the next one; raises ValueError on a bad cursor"""
+        sort, offset, after = _catalog_position(sort, offset, cursor)
+        # One extra row tells us whether there is a next page
+        movies = await db.run(db.get_movies_page, genre=genre, sort=sort, limit=limit + 1,
+                              offset=offset, after=after)
+        next_cursor = None
+        if len(movies) > limit:
+            movies = movies[:limit]
+            last = movies[-1]
+            next_cursor = encode_cursor({"sort": sort, "key": [last[c] for c in db.MOVIE_SORTS[sort][2]]})
+        return {"items": movies, "next_cursor": next_cursor}
+
+    @classmethod
+    async def find_page_json(cls, genre: Optional[str] = None, sort: str = "popular", limit: int = 50,
+                             offset: int = 0, cursor: Optional[str] = None, version: Optional[int] = None) -> bytes:
+        """find_page() as a ready JSON body, joined from the pre-encoded movie cards.
+
+        `version` is the catalog version the caller's validators came from;
+        the page is never older than it.
+        """
+        sort, offset, after = _catalog_position(sort, offset, cursor)
+        cards = await db.run(db.get_movie_cards_page, genre=genre, sort=sort, limit=limit + 1,
+                             offset=offset, after=after, cache_version=version)
+        next_cursor = None
+        if len(cards) > limit:
+            cards = cards[:limit]
+            next_cursor = encode_cursor({"sort": sort, "key": cards[-1][1]})
+        items = ",".join(card for card, _ in cards)
+        return f'{{"items":[{items}],"next_cursor":{json.dumps(next_cursor)}}}'.encode()
+
+    @classmethod
+    async def search(cls, q: str, limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """Ranked full-text search page; raises ValueError on a bad cursor"""
+        terms = query_terms(q)
+        if not terms:
+            return {"items": [], "next_cursor": None}
+        offset = 0
+        if cursor:
+            token = decode_cursor(cursor)
+            offset = token.get("offset")
+            if token.get("q") != q or not valid_key([offset], int) or offset < 0:
+                raise ValueError("Invalid cursor")
+
+        movies = await db.run(db.search_movies, match_expression(terms), limit=limit + 1, offset=offset)
+        next_cursor = None
+        if len(movies) > limit:
+            movies = movies[:limit]
+            next_cursor = encode_cursor({"q": q, "offset": offset + limit})
+        for movie in movies:
+            review_text = movie.pop("review_text")
+            if review_text is None:
+                movie["snippet"] = snippet(movie["description"], terms) or snippet(movie["title"], terms)
+            else:
+                movie["snippet"] = snippet(review_text, terms)
+        return {"items": movies, "next_cursor": next_cursor}
+
+    @classmethod
+    async def find_one_or_none_by_id(cls, movie_id: int, version: Optional[int] = None) -> Optional[Dict]:
+        """The movie row; with `version` (just read), never older than that version"""
+        return await db.run(db.get_movie_by_id, movie_id, cache_version=version)
+
+    @classmethod
+    async def version(cls, movie_id: int) -> Optional[Dict]:
+        """{"version", "updated_at"} of one movie; None if it does not exist"""
+        return await db.run(db.get_movie_version, movie_id)
+
+    @classmethod
+    async def catalog_version(cls) -> Dict:
+        return await db.run(db.get_catalog_version)
+
+    @classmethod
+    async def find_full(cls, movie_id: int, user_id: Optional[int] = None, approved_only: bool = True,
+                        reviews_limit: int = 20) -> Optional[Dict]:
+        """Movie, first page of reviews, rating stats and the user's state; None if the movie does not exist.
+
+        Runs as one job on one pooled connection instead of three requests.
+        """
+        def _find_full():
+            movie = db.get_movie_by_id(movie_id)
+            if not movie:
+                return None
+            state = None
+            if user_id is not None:
+                state = {
+                    "is_favorite": db.is_favorite(movie_id, user_id),
+                    "rating": db.get_user_rating(movie_id, user_id),
+                }
+            reviews = _reviews_page(movie_id, approved_only, reviews_limit)
+            return {
+                "movie": movie,
+                "reviews": reviews["items"],
+                "reviews_next_cursor": reviews["next_cursor"],
+                "reviews_total": movie["approved_review_count"] if approved_only else movie["review_count"],
+                "rating_stats": db.rating_stats_from_row(movie),
+                "user": state,
+            }
+
+        return await db.run(_find_full)
+
+    @classmethod
+    async def add(cls, **values) -> Dict:
+        return await db.run(db.create_movie, **values)
+
+    @classmethod
+    async def add_many(cls, rows: List[Dict]) -> int:
+        """Insert validated movies with one executemany in one transaction"""
+        values = [(r["title"], r["description"], r["genre"], r["year"], r["poster_url"]) for r in rows]
+        return await db.run(db.create_movies_bulk, values)
+
+    @classmethod
+    async def genres(cls) -> List[str]:
+        return await db.run(db.get_genres)
+
+    @classmethod
+    async def site_stats(cls) -> Dict:
+        counters = await db.run(db.get_site_counters)
+        return {f"{name}_count": value for name, value in counters.items()}
+
+
+# Types of the sort key columns of db.MOVIE_SORTS; rating_avg is 0 (an int) without ratings
+_SORT_KEY_TYPES = {
+    "popular": (int,),
+    "title": (str, int),
+    "year": (int, int),
+    "rating": ((int, float), int),
+}
+
+
+def _catalog_position(sort: str, offset: int, cursor: Optional[str]) -> Tuple[str, int, Optional[List]]:
+    """(sort, offset, keyset position) of a catalog page request; raises ValueError on a bad cursor"""
+    if sort not in db.MOVIE_SORTS:
+        sort = "popular"
+    after = None
+    if cursor:
+        token = decode_cursor(cursor)
+        after = token.get("key")
+        if token.get("sort") != sort or not valid_key(after, *_SORT_KEY_TYPES[sort]):
+            raise ValueError("Invalid cursor")
+        offset = 0
+    return sort, offset, after
+
+
+def _reviews_page(movie_id: int, approved_only: bool, limit: int, after: Optional[List] = None,
+                  version: Optional[int] = None) -> Dict:
+    """One page of a movie's reviews plus the cursor for the next one"""
+    # One extra row tells us whether there is a next page
+    reviews = db.get_movie_reviews(movie_id, approved_only=approved_only, limit=limit + 1, after=after,
+                                   cache_version=version)
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        last = reviews[-1]
+        next_cursor = encode_cursor({"movie": movie_id, "approved_only": approved_only,
+                                     "key": [last["created_at"], last["id"]]})
+    return {"items": reviews, "next_cursor": next_cursor}
+
+
+def _split_unknown_refs(rows: List[Tuple[int, Dict]]) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """Drop rows pointing at missing movies/users; one lookup per table for the whole batch"""
+    movie_ids = db.existing_ids("movies", [r["movie_id"] for _, r in rows])
+    user_ids = db.existing_ids("users", [r["user_id"] for _, r in rows if r["user_id"] is not None])
+    valid, errors = [], []
+    for index, row in rows:
+        if row["movie_id"] not in movie_ids:
+            errors.append({"index": index, "errors": [{"loc": ["movie_id"], "msg": "Movie not found"}]})
+        elif row["user_id"] is not None and row["user_id"] not in user_ids:
+            errors.append({"index": index, "errors": [{"loc": ["user_id"], "msg": "User not found"}]})
+        else:
+            valid.append((index, row))
+    return valid, errors
+
 
 class ReviewDAO:
-    pass
+    @classmethod
+    async def add(cls, movie_id: int, user_id: int, text: str, rating: Optional[int] = None) -> Optional[Dict]:
+        """Create a review; None if the movie does not exist"""
+        def _add():
+            with db.transaction():
+                if not db.get_movie_by_id(movie_id):
+                    return None
+                return db.create_review(movie_id=movie_id, user_id=user_id, text=text, rating=rating)
+
+        return await db.run(_add)
+
+    @classmethod
+    async def add_many(cls, rows: List[Tuple[int, Dict]]) -> Dict:
+        """Import validated (index, review) rows in one transaction; reports rows with unknown refs"""
+        def _add_many():
+            with db.transaction():
+                valid, errors = _split_unknown_refs(rows)
+                inserted = db.create_reviews_bulk([
+                    (r["movie_id"], r["user_id"], r["text"], r["rating"], r["approved"]) for _, r in valid
+                ])
+            return {"inserted": inserted, "errors": errors}
+
+        return await db.run(_add_many)
+
+    @classmethod
+    async def find_page(cls, movie_id: int, approved_only: bool = True, limit: int = 20,
+                        cursor: Optional[str] = None, include_total: bool = False,
+                        version: Optional[int] = None) -> Dict:
+        """A page of a movie's reviews, newest first; raises ValueError on a bad cursor.
+
+        `total` comes from the movie's maintained review counters, not COUNT(*).
+        `version` is the movie version the caller's validators came from; the
+        page is never older than it.
+        """
+        after = None
+        if cursor:
+            token = decode_cursor(cursor)
+            after = token.get("key")
+            if (token.get("movie") != movie_id or token.get("approved_only") != approved_only
+                    or not valid_key(after, str, int)):
+                raise ValueError("Invalid cursor")
+
+        def _find_page():
+            page = _reviews_page(movie_id, approved_only, limit, after, version)
+            if include_total:
+                movie = db.get_movie_by_id(movie_id, cache_version=version) or {}
+                page["total"] = movie.get("approved_review_count" if approved_only else "review_count", 0)
+            return page
+
+        return await db.run(_find_page)
+
+    @classmethod
+    async def find_pending(cls, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        """A page of the moderation queue, oldest first; raises ValueError on a bad cursor"""
+        after = None
+        if cursor:
+            token = decode_cursor(cursor)
+            after = token.get("key")
+            if token.get("pending") is not True or not valid_key(after, str, int):
+                raise ValueError("Invalid cursor")
+
+        # One extra row tells us whether there is a next page
+        reviews = await db.run(db.get_pending_reviews, limit=limit + 1, after=after)
+        next_cursor = None
+        if len(reviews) > limit:
+            reviews = reviews[:limit]
+            last = reviews[-1]
+            next_cursor = encode_cursor({"pending": True, "key": [last["created_at"], last["id"]]})
+        return {"items": reviews, "next_cursor": next_cursor}
+
+    @classmethod
+    async def moderate(cls, approve_ids: List[int], delete_ids: List[int]) -> Dict:
+        """Apply approve/delete decisions in one transaction; ids that matched nothing are reported as skipped"""
+        result = await db.run(db.moderate_reviews, approve_ids, delete_ids)
+        done = set(result["approved"]) | set(result["deleted"])
+        result["skipped"] = sorted((set(approve_ids) | set(delete_ids)) - done)
+        return result
+
+    @classmethod
+    async def approve(cls, review_id: int) -> bool:
+        return await db.run(db.approve_review, review_id)
+
+    @classmethod
+    async def delete(cls, review_id: int) -> bool:
+        return await db.run(db.delete_review, review_id)
+
 
 class RatingDAO:
-    pass
+    @classmethod
+    async def upsert(cls, movie_id: int, user_id: int, value: float) -> Optional[Dict]:
+        """Create or update a rating; None if the movie does not exist"""
+        def _upsert():
+            with db.transaction():
+                if not db.get_movie_by_id(movie_id):
+                    return None
+                return db.create_or_update_rating(movie_id=movie_id, user_id=user_id, value=value)
+
+        return await db.run(_upsert)
+
+    @classmethod
+    async def upsert_many(cls, rows: List[Tuple[int, Dict]]) -> Dict:
+        """Import validated (index, rating) rows in one transaction; reports rows with unknown refs"""
+        def _upsert_many():
+            with db.transaction():
+                valid, errors = _split_unknown_refs(rows)
+                inserted = db.upsert_ratings_bulk([
+                    (r["movie_id"], r["user_id"], r["value"]) for _, r in valid
+                ])
+            return {"inserted": inserted, "errors": errors}
+
+        return await db.run(_upsert_many)
+
+    @classmethod
+    async def stats(cls, movie_id: int, version: Optional[int] = None) -> Dict:
+        """Rating statistics; with `version` (just read), never older than that version"""
+        return await db.run(db.get_rating_stats, movie_id, cache_version=version)
+
 
 class FavoriteDAO:
-    pass
+    @classmethod
+    async def add(cls, movie_id: int, user_id: int) -> Optional[Dict]:
+        """Add a favorite; None if the movie does not exist"""
+        def _add():
+            with db.transaction():
+                if not db.get_movie_by_id(movie_id):
+                    return None
+                return db.add_favorite(movie_id, user_id)
+
+        return await db.run(_add)
+
+    @classmethod
+    async def remove(cls, movie_id: int, user_id: int) -> Dict:
+        return await db.run(db.remove_favorite, movie_id, user_id)
+
+    @classmethod
+    async def find_by_user(cls, user_id: int) -> List[Dict]:
+        return await db.run(db.get_user_favorites, user_id)
+
+    @classmethod
+    async def ids_by_user(cls, user_id: int) -> List[int]:
+        return await db.run(db.get_user_favorite_ids, user_id)
@@ -1,4 +1,4 @@
-from sqlalchemy import text, String, Integer, Float, Text
+from sqlalchemy import text, String, Integer, Float, Text, Computed
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base, int_pk
 from typing import List
@@ -12,6 +12,19 @@ class Movie(Base):
     year: Mapped[int] = mapped_column(Integer, nullable=False)
     poster_url: Mapped[str] = mapped_column(String(500), nullable=True)
 
+    # Change counter for ETags, bumped by a trigger on every update (see init_db.py)
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+
+    # Aggregates over reviews, maintained by triggers (see init_db.py)
+    review_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    approved_review_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    rating_avg: Mapped[float] = mapped_column(
+        Float,
+        Computed("CASE WHEN rating_count > 0 THEN rating_sum * 1.0 / rating_count ELSE 0 END", persisted=False),
+    )
+
     # Relationships
     reviews: Mapped[List["Review"]] = relationship("Review", back_populates="movie", cascade="all, delete-orphan")
     ratings: Mapped[List["Rating"]] = relationship("Rating", back_populates="movie", cascade="all, delete-orphan")
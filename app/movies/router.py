@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import Optional, List
-from app import db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Optional, List
+from app.auth import Principal, acting_user, current_principal, optional_principal, require_admin, require_moderator
+from app.conditional import http_date, make_etag, not_modified, validated_body, validated_json
+from app.movies.dao import MovieDAO, ReviewDAO, RatingDAO, FavoriteDAO
 
 router = APIRouter(prefix="/api/movies", tags=["movies"])
 
@@ -19,68 +21,160 @@ class ReviewCreate(BaseModel):
 class RatingCreate(BaseModel):
     value: float
 
+class ReviewImport(BaseModel):
+    movie_id: int
+    user_id: Optional[int] = None
+    text: str
+    rating: Optional[int] = None
+    approved: bool = False
+
+class ModerationBatch(BaseModel):
+    approve: List[int] = []
+    delete: List[int] = []
+
+class RatingImport(BaseModel):
+    movie_id: int
+    user_id: int
+    value: float
+
+MAX_BULK_ROWS = 100_000
+
+# Deeper catalog pages go through `cursor` (keyset) instead of OFFSET
+MAX_CATALOG_OFFSET = 10_000
+
+def validate_rows(model, rows: List[Dict[str, Any]]):
+    """Validate every row in one pass; returns (index, row dict) pairs and per-row errors"""
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per request")
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, model.model_validate(row).model_dump()))
+        except ValidationError as e:
+            errors.append({
+                "index": index,
+                "errors": [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()],
+            })
+    return valid, errors
+
 # ========== MOVIES ==========
 
 @router.get("/")
-def get_movies(genre: Optional[str] = Query(None), sort: str = Query("popular")):
-    """Get all movies with optional filtering and sorting"""
-    movies = db.get_all_movies()
-    
-    if genre and genre != "all":
-        movies = [m for m in movies if m['genre'] == genre]
-    
-    if sort == "title":
-        movies = sorted(movies, key=lambda x: x['title'])
-    elif sort == "year":
-        movies = sorted(movies, key=lambda x: x['year'], reverse=True)
-    elif sort == "rating":
-        # Sort by rating (would need to fetch ratings for each)
-        pass
-    # Default is popular (by id desc, already done)
-    
-    return movies
+async def get_movies(
+    request: Request,
+    genre: Optional[str] = Query(None),
+    sort: str = Query("popular"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0, le=MAX_CATALOG_OFFSET),
+    cursor: Optional[str] = Query(None),
+):
+    """Get a page of movies with optional filtering and sorting.
+
+    Pass `next_cursor` from the previous response as `cursor` to continue;
+    `offset` is ignored when a cursor is given. Answers If-None-Match /
+    If-Modified-Since with 304 while the catalog is unchanged.
+    """
+    if genre == "all":
+        genre = None
+    # Validators come from the catalog change counter, read before the page;
+    # the page is cached per version, so it is never older than they say
+    version = await MovieDAO.catalog_version()
+    etag = make_etag("catalog", version["version"])
+    last_modified = http_date(version["updated_at"])
+    unchanged = not_modified(request, etag, last_modified)
+    if unchanged:
+        return unchanged
+    try:
+        # Items are the movies' pre-encoded cards, not re-serialized per request
+        body = await MovieDAO.find_page_json(genre=genre, sort=sort, limit=limit, offset=offset, cursor=cursor,
+                                             version=version["version"])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return validated_body(body, etag, last_modified)
 
 @router.get("/stats")
-def get_stats():
+async def get_stats():
     """Get overall site statistics"""
-    movies = db.get_all_movies()
-    movies_count = len(movies)
-    
-    # Count all reviews
-    reviews_count = 0
-    for movie in movies:
-        reviews = db.get_movie_reviews(movie['id'], approved_only=False)
-        reviews_count += len(reviews)
-    
-    return {
-        "movies_count": movies_count,
-        "reviews_count": reviews_count
-    }
+    return await MovieDAO.site_stats()
 
 # IMPORTANT: Special routes BEFORE {movie_id} routes
 
+@router.get("/genres")
+async def get_genres():
+    """Genres present in the catalog, for the genre filter"""
+    return await MovieDAO.genres()
+
+@router.get("/search")
+async def search_movies(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+):
+    """Full-text search over titles, descriptions and approved reviews.
+
+    Results are ranked by bm25; `snippet` is HTML-escaped with the matched
+    terms in <mark>. Pass `next_cursor` as `cursor` for the next page.
+    """
+    try:
+        return await MovieDAO.search(q, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/user/{user_id}/favorites")
-def get_user_favorites(user_id: int):
-    """Get user's favorite movies"""
-    favorites = db.get_user_favorites(user_id)
+async def get_user_favorites(user_id: int, principal: Principal = Depends(current_principal)):
+    """Get user's favorite movies (own only)"""
+    favorites = await FavoriteDAO.find_by_user(acting_user(principal, user_id))
     return favorites
 
+@router.get("/user/{user_id}/favorite-ids")
+async def get_user_favorite_ids(user_id: int, principal: Principal = Depends(current_principal)):
+    """Ids of the user's favorite movies, for marking a whole catalog page at once (own only)"""
+    return {"movie_ids": await FavoriteDAO.ids_by_user(acting_user(principal, user_id))}
+
 # NOW: {movie_id} routes
 
 @router.get("/{movie_id}")
-def get_movie(movie_id: int):
-    """Get a single movie by ID"""
-    movie = db.get_movie_by_id(movie_id)
+async def get_movie(movie_id: int, request: Request):
+    """Get a single movie by ID; 304 if the client's copy is current"""
+    version = await MovieDAO.version(movie_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    unchanged = not_modified(request, make_etag("movie", movie_id, version["version"]), http_date(version["updated_at"]))
+    if unchanged:
+        return unchanged
+    
+    movie = await MovieDAO.find_one_or_none_by_id(movie_id, version=version["version"])
     
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    return movie
+    # Validators from the row itself, so they always describe the body sent
+    return validated_json(movie, make_etag("movie", movie_id, movie["version"]), http_date(movie["updated_at"]))
+
+@router.get("/{movie_id}/full")
+async def get_movie_full(
+    movie_id: int,
+    user_id: Optional[int] = Query(None),
+    approved_only: bool = Query(True),
+    reviews_limit: int = Query(20, ge=1, le=200),
+    principal: Optional[Principal] = Depends(optional_principal),
+):
+    """Everything the movie modal needs in one request: the movie, its newest
+    reviews, rating stats and, with a token, the user's favorite/rating state"""
+    if principal is not None:
+        user_id = acting_user(principal, user_id)
+    elif user_id is not None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    full = await MovieDAO.find_full(movie_id, user_id=user_id, approved_only=approved_only,
+                                    reviews_limit=reviews_limit)
+    if full is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return full
 
-@router.post("/")
-def create_movie(data: MovieCreate):
+@router.post("/", dependencies=[Depends(require_admin)])
+async def create_movie(data: MovieCreate):
     """Create a new movie (admin only)"""
-    movie = db.create_movie(
+    movie = await MovieDAO.add(
         title=data.title,
         description=data.description,
         genre=data.genre,
@@ -89,84 +183,158 @@ def create_movie(data: MovieCreate):
     )
     return movie
 
+@router.post("/bulk", dependencies=[Depends(require_admin)])
+async def create_movies_bulk(rows: List[Dict[str, Any]] = Body(...)):
+    """Import many movies in one transaction (admin only); invalid rows are reported, not inserted"""
+    valid, errors = validate_rows(MovieCreate, rows)
+    inserted = await MovieDAO.add_many([row for _, row in valid])
+    return {"inserted": inserted, "errors": errors}
+
 # ========== REVIEWS ==========
 
 @router.post("/{movie_id}/reviews")
-def create_review(movie_id: int, data: ReviewCreate, user_id: int):
+async def create_review(movie_id: int, data: ReviewCreate, user_id: Optional[int] = Query(None),
+                        principal: Principal = Depends(current_principal)):
     """Create a review for a movie"""
-    # Check if movie exists
-    movie = db.get_movie_by_id(movie_id)
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
-    
-    review = db.create_review(
+    # Movie check and insert run on one connection
+    review = await ReviewDAO.add(
         movie_id=movie_id,
-        user_id=user_id,
+        user_id=acting_user(principal, user_id),
         text=data.text,
         rating=data.rating
     )
+    if review is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
     return review
 
+@router.post("/reviews/bulk", dependencies=[Depends(require_admin)])
+async def create_reviews_bulk(rows: List[Dict[str, Any]] = Body(...)):
+    """Import many reviews in one transaction (admin only); invalid rows are reported, not inserted"""
+    valid, errors = validate_rows(ReviewImport, rows)
+    result = await ReviewDAO.add_many(valid)
+    result["errors"] = sorted(errors + result["errors"], key=lambda e: e["index"])
+    return result
+
 @router.get("/{movie_id}/reviews")
-def get_reviews(movie_id: int, approved_only: bool = Query(True)):
-    """Get reviews for a movie"""
-    reviews = db.get_movie_reviews(movie_id, approved_only=approved_only)
+async def get_reviews(
+    movie_id: int,
+    request: Request,
+    approved_only: bool = Query(True),
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
+):
+    """Get a page of a movie's reviews, newest first; 304 if the client's copy is current.
+
+    Pass `next_cursor` from the previous response as `cursor` to continue.
+    """
+    # Review writes update the movie's aggregates, which bumps its version;
+    # the page is cached per version, so it is never older than the validators
+    version = await MovieDAO.version(movie_id)
+    if version:
+        etag = make_etag("reviews", movie_id, version["version"])
+        last_modified = http_date(version["updated_at"])
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
+    try:
+        reviews = await ReviewDAO.find_page(movie_id, approved_only=approved_only, limit=limit,
+                                            cursor=cursor, include_total=include_total,
+                                            version=version["version"] if version else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if version:
+        return validated_json(reviews, etag, last_modified)
     return reviews
 
-@router.put("/reviews/{review_id}/approve")
-def approve_review(review_id: int):
+@router.get("/reviews/pending", dependencies=[Depends(require_moderator)])
+async def get_pending_reviews(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+):
+    """Moderation queue: unapproved reviews across all movies, oldest first (moderator only)"""
+    try:
+        return await ReviewDAO.find_pending(limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.post("/reviews/moderate", dependencies=[Depends(require_moderator)])
+async def moderate_reviews(data: ModerationBatch):
+    """Approve and delete many reviews in one transaction (moderator only)"""
+    if len(data.approve) + len(data.delete) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per request")
+    if set(data.approve) & set(data.delete):
+        raise HTTPException(status_code=400, detail="A review cannot be both approved and deleted")
+    return await ReviewDAO.moderate(data.approve, data.delete)
+
+@router.put("/reviews/{review_id}/approve", dependencies=[Depends(require_moderator)])
+async def approve_review(review_id: int):
     """Approve a review (moderator only)"""
-    db.approve_review(review_id)
+    await ReviewDAO.approve(review_id)
     return {"status": "approved"}
 
-@router.delete("/reviews/{review_id}")
-def delete_review(review_id: int):
-    """Delete a review"""
-    db.delete_review(review_id)
+@router.delete("/reviews/{review_id}", dependencies=[Depends(require_moderator)])
+async def delete_review(review_id: int):
+    """Delete a review (moderator only)"""
+    await ReviewDAO.delete(review_id)
     return {"status": "deleted"}
 
 # ========== RATINGS ==========
 
 @router.post("/{movie_id}/ratings")
-def create_rating(movie_id: int, data: RatingCreate, user_id: int):
+async def create_rating(movie_id: int, data: RatingCreate, user_id: Optional[int] = Query(None),
+                        principal: Principal = Depends(current_principal)):
     """Create or update a rating for a movie"""
-    # Check if movie exists
-    movie = db.get_movie_by_id(movie_id)
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
-    
-    rating = db.create_or_update_rating(
+    rating = await RatingDAO.upsert(
         movie_id=movie_id,
-        user_id=user_id,
+        user_id=acting_user(principal, user_id),
         value=data.value
     )
+    if rating is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
     return rating
 
+@router.post("/ratings/bulk", dependencies=[Depends(require_admin)])
+async def create_ratings_bulk(rows: List[Dict[str, Any]] = Body(...)):
+    """Import or update many ratings in one transaction (admin only); invalid rows are reported, not inserted"""
+    valid, errors = validate_rows(RatingImport, rows)
+    result = await RatingDAO.upsert_many(valid)
+    result["errors"] = sorted(errors + result["errors"], key=lambda e: e["index"])
+    return result
+
 @router.get("/{movie_id}/rating-stats")
-def get_rating_stats(movie_id: int):
-    """Get rating statistics for a movie"""
-    stats = db.get_rating_stats(movie_id)
+async def get_rating_stats(movie_id: int, request: Request):
+    """Get rating statistics for a movie; 304 if the client's copy is current"""
+    version = await MovieDAO.version(movie_id)
+    if version:
+        etag = make_etag("rating-stats", movie_id, version["version"])
+        last_modified = http_date(version["updated_at"])
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
+    stats = await RatingDAO.stats(movie_id, version=version["version"] if version else None)
+    if version:
+        return validated_json(stats, etag, last_modified)
     return stats
 
 # ========== FAVORITES ==========
 
 @router.post("/{movie_id}/favorites")
-def add_to_favorites(movie_id: int, user_id: int):
+async def add_to_favorites(movie_id: int, user_id: Optional[int] = Query(None),
+                           principal: Principal = Depends(current_principal)):
     """Add a movie to favorites"""
-    # Check if movie exists
-    movie = db.get_movie_by_id(movie_id)
-    if not movie:
+    result = await FavoriteDAO.add(movie_id, acting_user(principal, user_id))
+    if result is None:
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    result = db.add_favorite(movie_id, user_id)
-    
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
     return result
 
 @router.delete("/{movie_id}/favorites")
-def remove_from_favorites(movie_id: int, user_id: int):
+async def remove_from_favorites(movie_id: int, user_id: Optional[int] = Query(None),
+                                principal: Principal = Depends(current_principal)):
     """Remove a movie from favorites"""
-    result = db.remove_favorite(movie_id, user_id)
+    result = await FavoriteDAO.remove(movie_id, acting_user(principal, user_id))
     return result
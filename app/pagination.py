@@ -0,0 +1,41 @@
+"""Opaque cursor tokens for keyset pagination"""
+import base64
+import json
+from typing import Any, Dict
+
+# SQLite integers are signed 64-bit; larger Python ints fail to bind
+INT64_MAX = (1 << 63) - 1
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Pack the sort key of the last returned row into a URL-safe token"""
+    raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Unpack a token from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def valid_key(key: Any, *types: Any) -> bool:
+    """True if `key` is a list with one value per entry of `types`, each an instance of it.
+
+    Ints must fit SQLite's 64-bit range and bools are refused, so a valid key
+    always binds as query parameters.
+    """
+    if not isinstance(key, list) or len(key) != len(types):
+        return False
+    for value, expected in zip(key, types):
+        if isinstance(value, bool) or not isinstance(value, expected):
+            return False
+        if isinstance(value, int) and not -INT64_MAX - 1 <= value <= INT64_MAX:
+            return False
+    return True
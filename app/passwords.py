@@ -0,0 +1,135 @@
+"""Password hashing (scrypt, pbkdf2 fallback) on a bounded thread pool.
+
+Stored format is "<scheme>$<params>$<salt>$<hash>" with base64 salt and hash,
+so the work factor can be raised later: hashes made with older parameters,
+and legacy unsalted SHA-256 hex digests or plaintext passwords, are reported
+by verify_and_update() together with a fresh hash to store.
+
+Both KDFs release the GIL, so a thread pool runs them in parallel without
+blocking the event loop. The pool takes at most PASSWORD_HASH_WORKERS +
+PASSWORD_HASH_QUEUE jobs at a time; run() raises Overloaded past that so
+routes can shed load with 503 instead of queueing logins without bound.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from app.config import (
+    PASSWORD_HASH_QUEUE, PASSWORD_HASH_WORKERS, PASSWORD_PBKDF2_ITERATIONS,
+    PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_P, PASSWORD_SCRYPT_R,
+)
+
+T = TypeVar("T")
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# hashlib.scrypt is missing when Python is built against an OpenSSL without it
+SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+
+_LEGACY_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+class Overloaded(Exception):
+    """The hashing pool is full; the caller should retry later"""
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=HASH_BYTES)
+
+
+def hash_password(password: str) -> str:
+    """Salted hash of `password` with the configured scheme and work factor (CPU-heavy)"""
+    salt = os.urandom(SALT_BYTES)
+    if SCHEME == "scrypt":
+        n, r, p = PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+        return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+    digest = _pbkdf2(password, salt, PASSWORD_PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PASSWORD_PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def needs_rehash(stored: str) -> bool:
+    """True if `stored` was not made with the current scheme and work factor"""
+    if SCHEME == "scrypt":
+        current = f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$"
+    else:
+        current = f"pbkdf2_sha256${PASSWORD_PBKDF2_ITERATIONS}$"
+    return not stored.startswith(current)
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check `password` against any hash format we have ever stored (CPU-heavy)"""
+    scheme, _, rest = stored.partition("$")
+    try:
+        if scheme == "scrypt":
+            n, r, p, salt, digest = rest.split("$")
+            computed = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+            return hmac.compare_digest(computed, base64.b64decode(digest))
+        if scheme == "pbkdf2_sha256":
+            iterations, salt, digest = rest.split("$")
+            computed = _pbkdf2(password, base64.b64decode(salt), int(iterations))
+            return hmac.compare_digest(computed, base64.b64decode(digest))
+    except ValueError:
+        return False
+    # Legacy rows: unsalted SHA-256 from seed_db.py, plaintext from the old register route
+    if _LEGACY_SHA256.fullmatch(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    return hmac.compare_digest(password.encode(), stored.encode())
+
+
+def verify_and_update(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash to store or None); one pool job for verify plus rehash"""
+    if not verify_password(password, stored):
+        return False, None
+    return True, hash_password(password) if needs_rehash(stored) else None
+
+
+def _dummy_hash() -> str:
+    """A hash in the current format that no password matches (random salt and digest)"""
+    salt, digest = _b64(os.urandom(SALT_BYTES)), _b64(os.urandom(HASH_BYTES))
+    if SCHEME == "scrypt":
+        return f"scrypt${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}${salt}${digest}"
+    return f"pbkdf2_sha256${PASSWORD_PBKDF2_ITERATIONS}${salt}${digest}"
+
+
+_DUMMY_HASH = _dummy_hash()
+
+
+def verify_unknown(password: str) -> bool:
+    """Spend the same KDF time as verify_password() for a user that does not exist; always False"""
+    verify_password(password, _DUMMY_HASH)
+    return False
+
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="kinovzor-hash")
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+async def run(fn: Callable[..., T], *args: Any) -> T:
+    """Run a hashing function on the password pool; raises Overloaded when it is full"""
+    if not _slots.acquire(blocking=False):
+        raise Overloaded()
+    try:
+        job = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # Runs when the job finishes, or is cancelled before it started; a job
+    # already running keeps its slot even if the request goes away
+    job.add_done_callback(lambda _: _slots.release())
+    return await asyncio.wrap_future(job)
@@ -0,0 +1,187 @@
+"""Opt-in per-request SQL profiler.
+
+A request is profiled when SQL_PROFILE_OPT_IN is on and an admin sends
+"X-SQL-Profile: 1" (or ?sql_profile=1) with their bearer token, or when it
+falls into the SQL_PROFILE_SAMPLE_RATE sample. Every statement it runs through app/db.py is captured by the same
+trace callback that feeds /metrics, normalized (literals become "?") and
+grouped. The response gets X-Query-Count and X-DB-Time (ms) headers, and a
+JSON warning goes to the "kinovzor.sql" logger when one normalized statement
+runs more than SQL_PROFILE_REPEAT_THRESHOLD times (an N+1 loop) or a single
+statement takes longer than SQL_PROFILE_SLOW_MS.
+
+sqlite3 only reports when a statement starts, so a statement's time runs
+until the next statement starts or its db.run() job ends; that includes
+fetching its rows, which is where SQLite does most of the work anyway.
+
+Profiled statements also go into a rolling window of the last
+SQL_PROFILE_WINDOW executions; report() aggregates it for the admin endpoint.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs
+
+from app import metrics
+from app.auth import verify_token
+from app.config import (
+    METRICS_ENABLED, SQL_PROFILE_OPT_IN, SQL_PROFILE_REPEAT_THRESHOLD, SQL_PROFILE_SAMPLE_RATE,
+    SQL_PROFILE_SLOW_MS, SQL_PROFILE_WINDOW,
+)
+
+logger = logging.getLogger("kinovzor.sql")
+
+# FTS5 names its shadow tables as 'schema'.'table'; those are kept
+_STRING = re.compile(r"'(?:[^']|'')*'((?:\.'(?:[^']|'')*')*)")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql: str) -> str:
+    """Statement text with literals replaced by "?", so executions group by shape"""
+    sql = _STRING.sub(lambda m: m.group(0) if m.group(1) else "?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?, ...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class Profile(metrics.QueryStats):
+    """QueryStats that also keeps each statement and its time"""
+
+    __slots__ = ("statements", "_open", "_started")
+
+    def __init__(self):
+        super().__init__()
+        # [sql, seconds]; normalized only when the request is analyzed
+        self.statements: List[List] = []
+        self._open = None
+        self._started = 0.0
+
+    def _close(self, now: float) -> None:
+        if self._open is not None:
+            self._open[1] = now - self._started
+            self._open = None
+
+    def on_statement(self, sql: str) -> bool:
+        if not super().on_statement(sql):
+            return False
+        now = time.perf_counter()
+        self._close(now)
+        self._open = [sql, 0.0]
+        self._started = now
+        self.statements.append(self._open)
+        return True
+
+    def on_job_end(self) -> None:
+        self._close(time.perf_counter())
+
+
+_window: "deque[Tuple[str, float, str]]" = deque(maxlen=SQL_PROFILE_WINDOW)
+_window_lock = threading.Lock()
+
+
+def _opted_in(scope: Dict) -> bool:
+    """The request asks for a profile and carries an admin token"""
+    headers = dict(scope.get("headers", ()))
+    flag = headers.get(b"x-sql-profile")
+    if flag is not None:
+        asked = flag not in (b"", b"0")
+    else:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        asked = "1" in query.get("sql_profile", ())
+    if not asked:
+        return False
+    # Profiles expose timings and statements and fill the admin report: admins only
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    principal = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    return principal is not None and principal.is_admin
+
+
+def wanted(scope: Dict) -> bool:
+    """Should this request be profiled"""
+    if SQL_PROFILE_OPT_IN and _opted_in(scope):
+        return True
+    return SQL_PROFILE_SAMPLE_RATE > 0 and random.random() < SQL_PROFILE_SAMPLE_RATE
+
+
+def analyze(profile: Profile, method: str, route: str) -> None:
+    """Group a finished request's statements, log N+1/slow warnings, feed the rolling window"""
+    groups: Dict[str, List[float]] = {}
+    for sql, seconds in profile.statements:
+        groups.setdefault(normalize(sql), []).append(seconds)
+
+    for statement, times in groups.items():
+        if len(times) > SQL_PROFILE_REPEAT_THRESHOLD:
+            logger.warning(json.dumps({
+                "event": "sql_repeated",
+                "method": method,
+                "route": route,
+                "statement": statement,
+                "count": len(times),
+                "total_ms": round(sum(times) * 1000, 3),
+                "request_queries": profile.queries,
+            }, ensure_ascii=False))
+        slowest = max(times)
+        if slowest * 1000 > SQL_PROFILE_SLOW_MS:
+            logger.warning(json.dumps({
+                "event": "sql_slow",
+                "method": method,
+                "route": route,
+                "statement": statement,
+                "ms": round(slowest * 1000, 3),
+                "threshold_ms": SQL_PROFILE_SLOW_MS,
+            }, ensure_ascii=False))
+
+    with _window_lock:
+        for statement, times in groups.items():
+            for seconds in times:
+                _window.append((statement, seconds, f"{method} {route}"))
+
+
+def report(limit: int = 20) -> Dict:
+    """Slowest normalized statements in the rolling window, by total time"""
+    with _window_lock:
+        samples = list(_window)
+    groups: Dict[str, Dict] = {}
+    for statement, seconds, route in samples:
+        group = groups.get(statement)
+        if group is None:
+            group = groups[statement] = {"statement": statement, "count": 0, "total_ms": 0.0,
+                                         "max_ms": 0.0, "routes": set()}
+        group["count"] += 1
+        group["total_ms"] += seconds * 1000
+        group["max_ms"] = max(group["max_ms"], seconds * 1000)
+        group["routes"].add(route)
+    top = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:limit]
+    for group in top:
+        group["mean_ms"] = round(group["total_ms"] / group["count"], 3)
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["max_ms"] = round(group["max_ms"], 3)
+        group["routes"] = sorted(group["routes"])
+    return {"window": len(samples), "window_size": SQL_PROFILE_WINDOW, "statements": top}
+
+
+class ProfilingMiddleware(metrics.MetricsMiddleware):
+    """MetricsMiddleware that profiles the requests picked by wanted()"""
+
+    def start(self, scope) -> metrics.QueryStats:
+        return Profile() if wanted(scope) else metrics.QueryStats()
+
+    def response_headers(self, stats: metrics.QueryStats) -> List[Tuple[bytes, bytes]]:
+        if not isinstance(stats, Profile):
+            return []
+        return [
+            (b"x-query-count", str(stats.queries).encode()),
+            (b"x-db-time", f"{stats.db_seconds * 1000:.3f}".encode()),
+        ]
+
+    def finish(self, method: str, route: str, status: int, seconds: float, stats: metrics.QueryStats) -> None:
+        if METRICS_ENABLED:
+            super().finish(method, route, status, seconds, stats)
+        if isinstance(stats, Profile):
+            analyze(stats, method, route)
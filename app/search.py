@@ -0,0 +1,76 @@
+"""Query side of the full-text movie search (see SEARCH_* in init_db.py)"""
+import html
+import re
+from typing import List, Optional
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC = re.compile(r"[а-яё]")
+
+# Common Russian inflectional endings, longest first. FTS5 has no Russian
+# stemmer, so a query word is cut to its stem and matched as a prefix:
+# "матрица" -> "матриц"* also finds "матрицы", "матрицей", ...
+_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ом", "ем",
+    "ам", "ям", "ах", "ях", "ов", "ев", "ию", "ия", "ью", "ую", "юю",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+MIN_STEM = 3
+MAX_TERMS = 8
+
+
+def _stem(word: str) -> str:
+    if not _CYRILLIC.search(word):
+        return word
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def _fold(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def query_terms(q: str) -> List[str]:
+    """Stemmed, ё-folded words of free user input"""
+    return [_stem(w) for w in _WORD.findall(_fold(q))[:MAX_TERMS]]
+
+
+def match_expression(terms: List[str]) -> str:
+    """FTS5 MATCH expression requiring every term as a prefix (implicit AND).
+
+    Terms are quoted, so FTS5 operators in the input are treated as plain text.
+    """
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def snippet(text: Optional[str], terms: List[str], size: int = 16) -> Optional[str]:
+    """HTML-escaped excerpt of `text` around the first match, terms wrapped in <mark>.
+
+    Built here rather than with FTS5 snippet(): that would run the MATCH a
+    second time per result, and this way ё in the original text survives.
+    """
+    if not text:
+        return None
+    tokens = list(_WORD.finditer(text))
+    hits = [i for i, t in enumerate(tokens) if _fold(t.group()).startswith(tuple(terms))]
+    if not hits:
+        return None
+    start = max(0, min(hits[0] - size // 4, len(tokens) - size))
+    end = min(len(tokens), start + size)
+    hits = set(hits)
+
+    parts = ["…" if start > 0 else ""]
+    pos = tokens[start].start() if start > 0 else 0
+    for i in range(start, end):
+        token = tokens[i]
+        parts.append(html.escape(text[pos:token.start()]))
+        word = html.escape(token.group())
+        parts.append(f"<mark>{word}</mark>" if i in hits else word)
+        pos = token.end()
+    if end < len(tokens):
+        parts.append(html.escape(text[pos:tokens[end].start()]).rstrip() + "…")
+    else:
+        parts.append(html.escape(text[pos:]))
+    return "".join(parts)
@@ -0,0 +1,60 @@
+"""uvicorn launcher shared by run.py (production) and app/main.py (development)"""
+import importlib.util
+import os
+from typing import Dict, Optional
+
+import uvicorn
+
+from app.config import (
+    SERVER_ACCESS_LOG, SERVER_BACKLOG, SERVER_HOST, SERVER_HTTP, SERVER_KEEPALIVE, SERVER_LOOP,
+    SERVER_PORT, SERVER_WORKERS, SESSION_SECRET,
+)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None,
+                   reload: bool = False) -> Dict:
+    """uvicorn.run() keyword arguments from app/config.py, with CLI overrides"""
+    workers = workers if workers is not None else SERVER_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    # The reloader runs a single worker
+    workers = 1 if reload else workers
+    # Each worker would make up its own random token secret, so a token
+    # issued by one would get 401 from the others
+    if workers > 1 and not SESSION_SECRET:
+        raise SystemExit(f"SESSION_SECRET must be set to run {workers} workers (see .env.example), "
+                         "or run a single worker with --workers 1")
+    loop, http = SERVER_LOOP, SERVER_HTTP
+    # Resolve "auto" here so the startup banner says what actually runs
+    if loop == "auto":
+        loop = "uvloop" if _installed("uvloop") else "asyncio"
+    if http == "auto":
+        http = "httptools" if _installed("httptools") else "h11"
+    return {
+        "host": host or SERVER_HOST,
+        "port": port or SERVER_PORT,
+        "workers": workers,
+        "reload": reload,
+        "loop": loop,
+        "http": http,
+        "timeout_keep_alive": SERVER_KEEPALIVE,
+        "backlog": SERVER_BACKLOG,
+        "access_log": SERVER_ACCESS_LOG or reload,
+        "lifespan": "on",
+    }
+
+
+def serve(**overrides) -> None:
+    options = server_options(**overrides)
+    print("\n" + "="*50)
+    print("🌟 KinoVzor - Movie Review Platform")
+    print("="*50)
+    print(f"\n🚀 Starting server on http://{options['host']}:{options['port']} "
+          f"({options['workers']} worker(s), loop={options['loop']}, http={options['http']}"
+          f"{', reload' if options['reload'] else ''})...\n")
+    # Workers and the reloader import the app by name in their own processes
+    uvicorn.run("app.main:app", **options)
@@ -10,7 +10,9 @@ const LS_KEYS = {
 let currentUser = null;
 let currentGenre = 'all';
 let currentSort = 'popular';
-let allMovies = [];
+let allMovies = []; // Loaded catalog pages for the current genre and sort
+let genres = [];
+let favoriteIds = new Set(); // Ids of the current user's favorite movies
 let currentMovieRating = null; // Track current rating in modal
 let currentMovieId = null; // Track current movie in modal
 
@@ -37,9 +39,20 @@ async function apiCall(method, endpoint, data = null) {
     method,
     headers: { 'Content-Type': 'application/json' },
   };
+  // Токен сессии выдаётся при входе/регистрации
+  if (currentUser && currentUser.token) {
+    opts.headers['Authorization'] = `Bearer ${currentUser.token}`;
+  }
   if (data) opts.body = JSON.stringify(data);
 
   const res = await fetch(url, opts);
+  if (res.status === 401 && currentUser && currentUser.token) {
+    // Токен истёк или подпись сменилась — выходим, чтобы пользователь вошёл заново
+    currentUser = null;
+    localStorage.removeItem(LS_KEYS.CURRENT_USER);
+    renderUserArea();
+    renderProfile();
+  }
   if (!res.ok) {
     const err = await res.json().catch(() => ({detail: 'Error'}));
     throw new Error(err.detail || `HTTP ${res.status}`);
@@ -59,6 +72,7 @@ async function login() {
     saveLS(LS_KEYS.CURRENT_USER, currentUser);
     renderUserArea();
     renderProfile();
+    loadFavoriteIds();
     alert('Успешный вход!');
     $('#loginUsername').value = '';
     $('#loginPassword').value = '';
@@ -83,6 +97,7 @@ async function register() {
     saveLS(LS_KEYS.CURRENT_USER, currentUser);
     renderUserArea();
     renderProfile();
+    loadFavoriteIds();
     alert('Регистрация успешна!');
     $('#registerEmail').value = '';
     $('#registerPassword').value = '';
@@ -102,6 +117,7 @@ function loginGuest() {
   saveLS(LS_KEYS.CURRENT_USER, currentUser);
   renderUserArea();
   renderProfile();
+  loadFavoriteIds();
   alert('Вы вошли как гость');
 }
 
@@ -110,121 +126,182 @@ function logout() {
   localStorage.removeItem(LS_KEYS.CURRENT_USER);
   renderUserArea();
   renderProfile();
+  loadFavoriteIds();
   alert('Вы вышли');
 }
 
 // ===== Movies =====
+const CATALOG_PAGE_SIZE = 48;
+let catalogCursor = null; // next_cursor of the last loaded catalog page
+let catalogRequest = 0; // Bumped on every reload so late pages of an old query are dropped
+let catalogLoading = false;
+let catalogObserver = null;
+
+function catalogQuery(cursor) {
+  // Жанр и сортировка применяются на сервере
+  const params = new URLSearchParams({ sort: currentSort, limit: CATALOG_PAGE_SIZE });
+  if (currentGenre !== 'all') params.set('genre', currentGenre);
+  if (cursor) params.set('cursor', cursor);
+  return `/movies/?${params}`;
+}
+
 async function loadMovies() {
+  // Первая страница для текущих жанра и сортировки; остальные — по прокрутке
+  const request = ++catalogRequest;
+  catalogLoading = true;
   try {
-    const data = await apiCall('GET', '/movies/');
-    if (Array.isArray(data)) {
-      allMovies = data;
-    } else if (data && Array.isArray(data.items)) {
-      allMovies = data.items;
-    } else if (data && typeof data === 'object') {
-      allMovies = [data];
-    } else {
-      allMovies = [];
-    }
-    renderFilms();
-    renderGenres();
-    updateCounters();
+    const data = await apiCall('GET', catalogQuery(null));
+    if (request !== catalogRequest) return;
+    allMovies = data.items;
+    catalogCursor = data.next_cursor || null;
   } catch (e) {
+    if (request !== catalogRequest) return;
     alert('Ошибка загружки: ' + e.message);
     allMovies = [];
-    renderFilms();
-    renderGenres();
-    updateCounters();
+    catalogCursor = null;
+  } finally {
+    if (request === catalogRequest) catalogLoading = false;
   }
+  const cont = $('#filmList');
+  if (cont) cont.scrollTop = 0;
+  renderFilms();
 }
 
-function getGenres() {
-  if (!Array.isArray(allMovies) || allMovies.length === 0) return ['all'];
-  const set = new Set();
-  allMovies.forEach(m => {
-    if (m && m.genre) set.add(m.genre);
-  });
-  return ['all', ...Array.from(set).sort()];
+async function loadMoreMovies() {
+  if (catalogLoading || !catalogCursor) return;
+  const request = catalogRequest;
+  catalogLoading = true;
+  try {
+    const data = await apiCall('GET', catalogQuery(catalogCursor));
+    if (request !== catalogRequest) return;
+    allMovies = allMovies.concat(data.items);
+    catalogCursor = data.next_cursor || null;
+    const cont = $('#filmList');
+    if (cont) appendFilms(cont, data.items);
+  } catch (e) {
+    if (request === catalogRequest) alert('Ошибка загружки: ' + e.message);
+  } finally {
+    if (request === catalogRequest) catalogLoading = false;
+  }
+}
+
+async function loadGenres() {
+  try {
+    genres = await apiCall('GET', '/movies/genres');
+  } catch (e) {
+    console.error('Genres load error:', e);
+    genres = [];
+  }
+  renderGenres();
 }
 
 function renderGenres() {
   const cont = $('#genreFilters');
   if (!cont) return;
   cont.innerHTML = '';
-  getGenres().forEach(g => {
+  ['all', ...genres].forEach(g => {
     const btn = document.createElement('button');
     btn.className = 'kv-genre-btn' + (g === currentGenre ? ' kv-genre-btn-active' : '');
     btn.textContent = g === 'all' ? 'Все жанры' : g;
     btn.onclick = () => {
       currentGenre = g;
       renderGenres();
-      renderFilms();
+      loadMovies();
     };
     cont.appendChild(btn);
   });
 }
 
-function getFiltered() {
-  if (!Array.isArray(allMovies)) return [];
-  let list = [...allMovies];
-  if (currentGenre !== 'all') {
-    list = list.filter(m => m && m.genre === currentGenre);
-  }
-  if (currentSort === 'title') {
-    list.sort((a, b) => (a.title || '').localeCompare(b.title || '', 'ru'));
-  } else if (currentSort === 'year') {
-    list.sort((a, b) => (b.year || 0) - (a.year || 0));
-  } else {
-    list.sort((a, b) => (b.id || 0) - (a.id || 0));
+function filmCard(m) {
+  const card = document.createElement('article');
+  card.className = 'kv-film-card';
+  
+  const posterUrl = m.poster_url || '';
+  const title = m.title || 'Без названия';
+  const genre = m.genre || '';
+  const year = m.year || '';
+  
+  const isFavorite = favoriteIds.has(m.id);
+  
+  card.innerHTML = `
+    <div class="kv-film-poster-wrap">
+      <img src="${posterUrl}" alt="${title}" class="kv-film-poster">
+      <button class="kv-fav-btn${isFavorite ? ' kv-fav-btn-active' : ''}" onclick="toggleFavorite(event, ${m.id})">${isFavorite ? '★' : '☆'}</button>
+    </div>
+    <div class="kv-film-body">
+      <h3 class="kv-film-title">${title}</h3>
+      <div class="kv-film-meta">
+        <span>${year}</span>
+        <span>•</span>
+        <span>${genre}</span>
+      </div>
+    </div>
+  `;
+  
+  card.onclick = e => {
+    if (e.target.closest('.kv-fav-btn')) return;
+    openMovie(m.id);
+  };
+  return card;
+}
+
+function appendFilms(cont, films) {
+  // Следующая страница — кнопкой или когда кнопка прокручена в видимую область
+  if (catalogObserver) catalogObserver.disconnect();
+  const oldBtn = cont.querySelector('.kv-film-more');
+  if (oldBtn) oldBtn.remove();
+  films.forEach(m => {
+    if (m) cont.appendChild(filmCard(m));
+  });
+  if (!catalogCursor) return;
+  const moreBtn = document.createElement('button');
+  moreBtn.className = 'kv-btn kv-film-more';
+  moreBtn.style.gridColumn = '1 / -1';
+  moreBtn.textContent = 'Показать ещё';
+  moreBtn.onclick = loadMoreMovies;
+  cont.appendChild(moreBtn);
+  if ('IntersectionObserver' in window) {
+    catalogObserver = new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting)) loadMoreMovies();
+    });
+    catalogObserver.observe(moreBtn);
   }
-  return list;
 }
 
 function renderFilms() {
   const cont = $('#filmList');
   if (!cont) return;
-  
-  const films = getFiltered();
+  if (catalogObserver) catalogObserver.disconnect();
+
+  const films = Array.isArray(allMovies) ? allMovies : [];
   if (!films.length) {
     cont.innerHTML = '<div class="kv-empty">Нет фильмов</div>';
     return;
   }
 
+  const scrollTop = cont.scrollTop;
   cont.innerHTML = '';
-  films.forEach(m => {
-    if (!m) return;
-    const card = document.createElement('article');
-    card.className = 'kv-film-card';
-    
-    const posterUrl = m.poster_url || '';
-    const title = m.title || 'Без названия';
-    const genre = m.genre || '';
-    const year = m.year || '';
-    
-    card.innerHTML = `
-      <div class="kv-film-poster-wrap">
-        <img src="${posterUrl}" alt="${title}" class="kv-film-poster">
-        <button class="kv-fav-btn" onclick="toggleFavorite(event, ${m.id})">☆</button>
-      </div>
-      <div class="kv-film-body">
-        <h3 class="kv-film-title">${title}</h3>
-        <div class="kv-film-meta">
-          <span>${year}</span>
-          <span>•</span>
-          <span>${genre}</span>
-        </div>
-      </div>
-    `;
-    
-    card.onclick = e => {
-      if (e.target.closest('.kv-fav-btn')) return;
-      openMovie(m.id);
-    };
-    cont.appendChild(card);
-  });
+  appendFilms(cont, films);
+  cont.scrollTop = scrollTop;
 }
 
 // ===== Favorites =====
+async function loadFavoriteIds() {
+  // Один запрос на все звёздочки каталога
+  if (!currentUser || currentUser.is_guest) {
+    favoriteIds = new Set();
+  } else {
+    try {
+      const data = await apiCall('GET', `/movies/user/${currentUser.id}/favorite-ids`);
+      favoriteIds = new Set(data.movie_ids);
+    } catch (e) {
+      console.error('Favorite ids error:', e);
+      favoriteIds = new Set();
+    }
+  }
+  renderFilms();
+}
+
 async function toggleFavorite(event, movieId) {
   event.stopPropagation();
   
@@ -238,10 +315,12 @@ async function toggleFavorite(event, movieId) {
     
     if (isFavorite) {
       await apiCall('DELETE', `/movies/${movieId}/favorites?user_id=${currentUser.id}`);
+      favoriteIds.delete(movieId);
       button.classList.remove('kv-fav-btn-active');
       button.textContent = '☆';
     } else {
       await apiCall('POST', `/movies/${movieId}/favorites?user_id=${currentUser.id}`);
+      favoriteIds.add(movieId);
       button.classList.add('kv-fav-btn-active');
       button.textContent = '★';
     }
@@ -278,17 +357,12 @@ async function openMovie(mid) {
   currentMovieId = mid; // Store current movie id
   
   try {
-    const movie = await apiCall('GET', `/movies/${mid}`);
-    const reviews = await apiCall('GET', `/movies/${mid}/reviews?approved_only=false`);
-    
-    // Получаем рейтинги из таблицы ratings
-    let ratingStats = null;
-    try {
-      ratingStats = await apiCall('GET', `/movies/${mid}/rating-stats`);
-    } catch (e) {
-      console.error('Rating stats error:', e);
-      ratingStats = null;
-    }
+    // Фильм, первые рецензии и рейтинг одним запросом
+    const userParam = currentUser && !currentUser.is_guest ? `&user_id=${currentUser.id}` : '';
+    const full = await apiCall('GET', `/movies/${mid}/full?approved_only=false&reviews_limit=50${userParam}`);
+    const movie = full.movie;
+    const reviews = full.reviews;
+    const ratingStats = full.rating_stats;
 
     const modal = $('#movieModal');
     const canWrite = currentUser && !currentUser.is_guest;
@@ -345,31 +419,33 @@ async function openMovie(mid) {
               </div>
             ` : ''}
             <div class="kv-review-section">
-              <div class="kv-review-section-title">Рецензии (${reviews.length})</div>
+              <div class="kv-review-section-title">Рецензии (${full.reviews_total})</div>
               <div class="kv-review-list">
-                ${!reviews.length ? '<div class="kv-empty">Нет рецензий</div>' : reviews.map(r => {
-                  // Получаем username из API или показываем Гость если user_id = null
-                  const authorName = r.username || (r.user_id ? 'Unknown' : 'Гость');
-                  return `
-                    <div class="kv-review">
-                      <div class="kv-review-top">
-                        <div class="kv-review-header">
-                          <strong class="kv-review-author">✨ ${authorName}</strong>
-                          ${r.rating ? `<span class="kv-review-rating">${r.rating} ★</span>` : ''}
-                          ${isModerator ? `<button class="kv-review-delete-btn" onclick="deleteReview(${r.id}, ${mid})">x</button>` : ''}
-                        </div>
-                      </div>
-                      <p class="kv-review-text">${r.text}</p>
-                    </div>
-                  `;
-                }).join('')}
+                ${!reviews.length ? '<div class="kv-empty">Нет рецензий</div>' : reviews.map(r => renderReview(r, mid, isModerator)).join('')}
               </div>
+              ${full.reviews_next_cursor ? `<button class="kv-btn kv-review-more" style="width: 100%;">Показать ещё</button>` : ''}
             </div>
           </div>
         </div>
       </div>
     `;
 
+    // Следующие страницы рецензий по курсору
+    let reviewsCursor = full.reviews_next_cursor;
+    const moreBtn = modal.querySelector('.kv-review-more');
+    if (moreBtn) {
+      moreBtn.onclick = async () => {
+        try {
+          const page = await apiCall('GET', `/movies/${mid}/reviews?approved_only=false&limit=50&cursor=${encodeURIComponent(reviewsCursor)}`);
+          modal.querySelector('.kv-review-list').insertAdjacentHTML('beforeend', page.items.map(r => renderReview(r, mid, isModerator)).join(''));
+          reviewsCursor = page.next_cursor;
+          if (!reviewsCursor) moreBtn.remove();
+        } catch (e) {
+          alert('Ошибка: ' + e.message);
+        }
+      };
+    }
+
     modal.classList.add('kv-modal-open');
     modal.querySelector('.kv-modal-close').onclick = () => modal.classList.remove('kv-modal-open');
     modal.querySelector('.kv-modal-backdrop').onclick = () => modal.classList.remove('kv-modal-open');
@@ -393,6 +469,23 @@ async function openMovie(mid) {
   }
 }
 
+function renderReview(r, mid, isModerator) {
+  // Получаем username из API или показываем Гость если user_id = null
+  const authorName = r.username || (r.user_id ? 'Unknown' : 'Гость');
+  return `
+    <div class="kv-review">
+      <div class="kv-review-top">
+        <div class="kv-review-header">
+          <strong class="kv-review-author">✨ ${authorName}</strong>
+          ${r.rating ? `<span class="kv-review-rating">${r.rating} ★</span>` : ''}
+          ${isModerator ? `<button class="kv-review-delete-btn" onclick="deleteReview(${r.id}, ${mid})">x</button>` : ''}
+        </div>
+      </div>
+      <p class="kv-review-text">${r.text}</p>
+    </div>
+  `;
+}
+
 async function submitReview(mid) {
   const txt = $('#reviewText').value.trim();
   
@@ -440,6 +533,7 @@ async function removeFavorite(movieId) {
   
   try {
     await apiCall('DELETE', `/movies/${movieId}/favorites?user_id=${currentUser.id}`);
+    favoriteIds.delete(movieId);
     renderProfile();
     renderFilms(); // Обновим звёзды на карточках
   } catch (e) {
@@ -538,17 +632,22 @@ function setupButtons() {
   if (guestBtn) guestBtn.onclick = loginGuest;
   if (sortSel) sortSel.onchange = e => {
     currentSort = e.target.value;
-    renderFilms();
+    loadMovies();
   };
 }
 
 async function init() {
   currentUser = loadLS(LS_KEYS.CURRENT_USER, null);
+  // Сохранённый вход без токена (старая версия) — просим войти заново
+  if (currentUser && !currentUser.is_guest && !currentUser.token) {
+    currentUser = null;
+    localStorage.removeItem(LS_KEYS.CURRENT_USER);
+  }
   setupTabs();
   setupButtons();
   renderUserArea();
   renderProfile();
-  await loadMovies();
+  await Promise.all([loadMovies(), loadGenres(), loadFavoriteIds(), updateCounters()]);
 }
 
 if (document.readyState === 'loading') {
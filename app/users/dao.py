@@ -1,4 +1,44 @@
-from app.users.models import User
+from typing import Dict, Optional
+from app import db, passwords
+
 
 class UserDAO:
-    pass
+    @classmethod
+    async def find_one_or_none_by_id(cls, user_id: int) -> Optional[Dict]:
+        return await db.run(db.get_user_by_id, user_id)
+
+    @classmethod
+    async def find_one_or_none_by_email(cls, email: str) -> Optional[Dict]:
+        return await db.run(db.get_user_by_email, email)
+
+    @classmethod
+    async def find_one_or_none_by_username(cls, username: str) -> Optional[Dict]:
+        return await db.run(db.get_user_by_username, username)
+
+    @classmethod
+    async def add(cls, email: str, password: str, username: str) -> Optional[Dict]:
+        """Create a user with a hashed password; None if the email is already taken.
+
+        Raises passwords.Overloaded when the hashing pool is full.
+        """
+        password_hash = await passwords.run(passwords.hash_password, password)
+        return await db.run(db.create_user, email, password_hash, username)
+
+    @classmethod
+    async def authenticate(cls, username: str, password: str) -> Optional[Dict]:
+        """The user if the password matches, else None; legacy hashes are upgraded on success.
+
+        Raises passwords.Overloaded when the hashing pool is full.
+        """
+        user = await db.run(db.get_user_by_username, username)
+        if not user:
+            # Same KDF cost as a wrong password, so timing does not reveal which usernames exist
+            await passwords.run(passwords.verify_unknown, password)
+            return None
+        ok, new_hash = await passwords.run(passwords.verify_and_update, password, user["password"])
+        if not ok:
+            return None
+        if new_hash:
+            await db.run(db.update_user_password, user["id"], new_hash)
+            user["password"] = new_hash
+        return user
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, EmailStr
-from app import db
-import json
+from typing import Dict, Optional
+from app.auth import Principal, acting_user, current_principal, issue_token
+from app.passwords import Overloaded
+from app.users.dao import UserDAO
+import logging
+
+logger = logging.getLogger("kinovzor.users")
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -14,39 +19,54 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+def public_user(user: Dict) -> Dict:
+    """User row without the password hash"""
+    return {key: value for key, value in user.items() if key != "password"}
+
+def session(user: Dict) -> Dict:
+    """Login/register response: the user plus a signed token for the Authorization header"""
+    return {**public_user(user), "token": issue_token(user)}
+
+def hashing_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+
 @router.post("/register")
-def register(data: UserRegister):
+async def register(data: UserRegister):
     """Register a new user"""
-    # Check if user already exists
-    existing = db.get_user_by_email(data.email)
-    if existing:
+    # The insert itself detects a taken email (ON CONFLICT DO NOTHING)
+    try:
+        user = await UserDAO.add(data.email, data.password, data.username)
+    except Overloaded:
+        raise hashing_busy()
+    if user is None:
         raise HTTPException(status_code=400, detail="Email already exists")
-    
-    user = db.create_user(data.email, data.password, data.username)
-    return user
+    return session(user)
 
 @router.post("/login")
-def login(data: UserLogin):
+async def login(data: UserLogin):
     """Login user by username"""
-    print(f"Login attempt with: {json.dumps({'username': data.username, 'password': '***'})}")
-    
-    # Get user by username
-    user = db.get_user_by_username(data.username)
+    logger.info("Login attempt for %r", data.username)
+
+    # Hash verification runs on the bounded password pool, not the event loop
+    try:
+        user = await UserDAO.authenticate(data.username, data.password)
+    except Overloaded:
+        raise hashing_busy()
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if user['password'] != data.password:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    return user
+    return session(user)
 
 @router.get("/me")
-def get_current_user(user_id: int):
-    """Get current user info"""
-    user = db.get_user_by_id(user_id)
+async def get_current_user(
+    user_id: Optional[int] = Query(None),
+    principal: Principal = Depends(current_principal),
+):
+    """Get current user info (fresh record, not the token's roles)"""
+    user = await UserDAO.find_one_or_none_by_id(acting_user(principal, user_id))
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return user
+    return public_user(user)
@@ -0,0 +1,10 @@
+"""Latency and throughput benchmarks for KinoVzor.
+
+    python -m benchmarks --size medium --out before.json
+    python -m benchmarks --size medium --out after.json
+    python -m benchmarks.compare before.json after.json
+
+The app runs in-process (httpx ASGI transport) against a generated
+database, so results measure the application and SQLite, not the network.
+Requires httpx (pip install httpx).
+"""
@@ -0,0 +1,94 @@
+"""python -m benchmarks: run endpoint and db helper benchmarks, write JSON"""
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import SIZES, git_revision, use_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KinoVzor latency benchmarks")
+    parser.add_argument("--db", type=Path, help="benchmark database (generated if missing; default: benchmarks/bench-<size>.db)")
+    parser.add_argument("--size", choices=list(SIZES), default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=5000, help="endpoint requests to replay")
+    parser.add_argument("--concurrency", type=int, default=50, help="simulated concurrent clients")
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per db helper")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--skip-helpers", action="store_true")
+    parser.add_argument("--logins", type=int, default=0, help="also benchmark this many logins (password KDF cost)")
+    parser.add_argument("--login-concurrency", type=int, default=20)
+    parser.add_argument("--startup", type=int, default=0, help="also time this many cold starts (import + first request)")
+    parser.add_argument("--catalog", type=int, default=0, help="also render this many catalog pages as cards vs dicts")
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results.json"))
+    args = parser.parse_args(argv)
+
+    db_path = args.db or Path(__file__).parent / f"bench-{args.size}.db"
+    use_database(db_path, args.size, args.seed)
+
+    from benchmarks import catalog, db_helpers, endpoints, login, startup
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "db": str(db_path),
+            "size": args.size,
+            "seed": args.seed,
+        },
+    }
+    if not args.skip_helpers:
+        print("⏱️  db helpers...")
+        results["db_helpers"] = db_helpers.run(args.iterations, args.seed)
+    if not args.skip_endpoints:
+        print(f"⏱️  endpoints: {args.requests} requests, {args.concurrency} clients...")
+        results["endpoints"] = endpoints.run(args.requests, args.concurrency, args.seed)
+
+    if args.logins:
+        print(f"⏱️  login: {args.logins} logins, {args.login_concurrency} clients...")
+        results["login"] = login.run(args.logins, args.login_concurrency, args.seed)
+
+    if args.startup:
+        print(f"⏱️  startup: {args.startup} cold starts...")
+        results["startup"] = startup.run(args.startup, db_path)
+
+    if args.catalog:
+        print(f"⏱️  catalog: {args.catalog} pages per path...")
+        results["catalog"] = catalog.run(args.catalog, args.seed)
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    _print_report(results)
+    print(f"\n📁 {args.out}")
+
+
+def _print_report(results):
+    rows = []
+    for name, summary in results.get("db_helpers", {}).items():
+        rows.append((f"db.{name}", summary))
+    endpoints = results.get("endpoints")
+    if endpoints:
+        rows.extend(endpoints["routes"].items())
+        rows.append(("ALL ENDPOINTS", endpoints["overall"]))
+    login = results.get("login")
+    if login:
+        rows.append(("POST /api/users/login (200)", login["ok"]))
+        rows.append(("POST /api/users/login (all)", login["overall"]))
+    for phase, summary in results.get("startup", {}).items():
+        rows.append((f"startup: {phase}", summary))
+    for path, summary in results.get("catalog", {}).items():
+        rows.append((f"catalog: {path}", summary))
+    width = max((len(name) for name, _ in rows), default=10)
+    print(f"\n{'':{width}}  {'count':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in rows:
+        print(f"{name:{width}}  {s['count']:>7} {s.get('rps', 0):>9} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Catalog page rendering: pre-encoded movie cards vs rows -> dicts -> JSON"""
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from benchmarks.common import summarize
+from app import db
+from app.cache import cache
+from app.conditional import make_etag, validated_body, validated_json
+from app.movies.dao import MovieDAO
+
+GENRES = ["Драма", "Боевик", "Фантастика", "Комедия", "Триллер", "Мелодрама", "Приключения", "Ужасы"]
+
+
+async def _pages(count: int, rng: random.Random) -> List[Dict]:
+    """GET /api/movies/ arguments like the frontend sends: some filtered, some a few pages deep"""
+    pages = []
+    while len(pages) < count:
+        page = {"sort": rng.choice(list(db.MOVIE_SORTS)), "limit": 50,
+                "genre": rng.choice(GENRES) if rng.random() < 0.3 else None}
+        for _ in range(rng.randrange(4)):
+            cursor = (await MovieDAO.find_page(**page))["next_cursor"]
+            if not cursor:
+                break
+            page = {**page, "cursor": cursor}
+        pages.append(page)
+    return pages
+
+
+async def _dicts(page: Dict) -> bytes:
+    return validated_json(await MovieDAO.find_page(**page), make_etag("catalog", 0)).body
+
+
+async def _cards(page: Dict) -> bytes:
+    return validated_body(await MovieDAO.find_page_json(**page), make_etag("catalog", 0)).body
+
+
+async def _run(count: int, seed: int) -> Dict:
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        pages = await _pages(count, random.Random(seed))
+        results = {}
+        for cached in (False, True):
+            for name, render in (("dicts", _dicts), ("cards", _cards)):
+                cache.clear()
+                # Warm the pooled connections (and, for the cached rows, the read cache)
+                for page in pages:
+                    await render(page)
+                latencies = []
+                for page in pages:
+                    if not cached:
+                        cache.clear()
+                    started = time.perf_counter()
+                    await render(page)
+                    latencies.append(time.perf_counter() - started)
+                results[f"{name} (cached)" if cached else name] = summarize(latencies, sum(latencies))
+    return results
+
+
+def run(count: int = 2000, seed: int = 42) -> Dict:
+    """Render `count` catalog pages through both paths, with and without the read cache.
+
+    Requests run one at a time, so rps is the reciprocal of the mean latency.
+    """
+    return asyncio.run(_run(count, seed))
@@ -0,0 +1,79 @@
+"""Shared benchmark helpers: database setup and latency summaries"""
+import math
+import random
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+import init_db
+from app import db
+
+# Dataset presets for seed_db.generate_dataset()
+SIZES = {
+    "small": dict(users=1_000, movies=500, reviews=20_000, ratings=20_000, favorites=5_000),
+    "medium": dict(users=20_000, movies=10_000, reviews=300_000, ratings=300_000, favorites=60_000),
+    "large": dict(users=100_000, movies=50_000, reviews=2_000_000, ratings=1_000_000, favorites=300_000),
+}
+
+
+def use_database(path: Path, size: str = "medium", seed: int = 42) -> None:
+    """Point the app at `path`, generating the dataset first if the file does not exist.
+
+    Must run before app.main is imported.
+    """
+    init_db.DB_PATH = db.DB_PATH = path
+    db.close_all()
+    if not path.exists():
+        import seed_db
+        print(f"📁 Generating {size} dataset in {path}...")
+        init_db.init_db()
+        seed_db.seed_movies_and_reviews()
+        seed_db.generate_dataset(seed=seed, **SIZES[size])
+
+
+def zipf_picker(ids: List[int], rng: random.Random, skew: float = 1.1):
+    """Popularity-skewed chooser over ids, so hot movies get most of the traffic"""
+    ids = ids[:]
+    rng.shuffle(ids)
+    cum, total = [], 0.0
+    for rank in range(1, len(ids) + 1):
+        total += 1.0 / rank ** skew
+        cum.append(total)
+    return lambda: rng.choices(ids, cum_weights=cum)[0]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float = None) -> Dict[str, float]:
+    """count, throughput and latency percentiles in milliseconds"""
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+    if elapsed:
+        summary["rps"] = round(len(values) / elapsed, 1)
+    return summary
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
@@ -0,0 +1,45 @@
+"""python -m benchmarks.compare before.json after.json: per-route latency/throughput deltas"""
+import json
+import sys
+from pathlib import Path
+
+
+def _rows(results):
+    for name, summary in results.get("db_helpers", {}).items():
+        yield f"db.{name}", summary
+    endpoints = results.get("endpoints")
+    if endpoints:
+        yield from endpoints["routes"].items()
+        yield "ALL ENDPOINTS", endpoints["overall"]
+    for phase, summary in results.get("startup", {}).items():
+        yield f"startup: {phase}", summary
+    for path, summary in results.get("catalog", {}).items():
+        yield f"catalog: {path}", summary
+
+
+def _delta(before, after):
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def main(argv=None):
+    argv = argv if argv is not None else sys.argv[1:]
+    if len(argv) != 2:
+        print(__doc__)
+        return 2
+    before, after = (dict(_rows(json.loads(Path(p).read_text()))) for p in argv)
+    names = [name for name in after if name in before]
+    width = max((len(n) for n in names), default=10)
+    print(f"{'':{width}}  {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'rps':>17}")
+    for name in names:
+        b, a = before[name], after[name]
+        cells = [
+            f"{a[k]:>9} {_delta(b[k], a[k])}" for k in ("p50_ms", "p95_ms", "p99_ms")
+        ] + [f"{a.get('rps', 0):>9} {_delta(b.get('rps', 0), a.get('rps', 0))}"]
+        print(f"{name:{width}}  " + " ".join(cells))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Micro-benchmarks for the app/db.py helpers"""
+import random
+import time
+from typing import Callable, Dict
+
+from benchmarks.common import summarize, zipf_picker
+from app import db
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _measure(fn: Callable[[], object], iterations: int) -> Dict[str, float]:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run(iterations: int = 2000, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """Time each helper on random, popularity-skewed arguments.
+
+    Cached reads are timed on the SQL path; the "(cached)" rows go through
+    the read cache. Write helpers run inside one transaction that is rolled
+    back, so they measure statement cost (not fsync) and leave the database
+    unchanged.
+    """
+    rng = random.Random(seed)
+    conn = db.get_db()
+    movie_ids = [row[0] for row in conn.execute("SELECT id FROM movies")]
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    pick_movie = zipf_picker(movie_ids, rng)
+    pick_user = lambda: rng.choice(user_ids)
+    user = db.get_user_by_id(user_ids[0])
+    # Reviews listings on blockbusters are huge; fewer iterations keep runs short
+    heavy = max(1, iterations // 20)
+    uncached = lambda fn: getattr(fn, "__wrapped__", fn)
+
+    reads = {
+        "get_user_by_id": (lambda: db.get_user_by_id(pick_user()), iterations),
+        "get_user_by_email": (lambda: db.get_user_by_email(user["email"]), iterations),
+        "get_user_by_username": (lambda: db.get_user_by_username(user["username"]), iterations),
+        "get_movie_by_id": (lambda: uncached(db.get_movie_by_id)(pick_movie()), iterations),
+        "get_movie_by_id(cached)": (lambda: db.get_movie_by_id(pick_movie()), iterations),
+        "get_movies_page": (lambda: uncached(db.get_movies_page)(sort=rng.choice(list(db.MOVIE_SORTS)), limit=50), iterations),
+        "get_movies_page(cached)": (lambda: db.get_movies_page(sort=rng.choice(list(db.MOVIE_SORTS)), limit=50), iterations),
+        "get_movie_reviews": (lambda: uncached(db.get_movie_reviews)(pick_movie()), heavy),
+        "get_movie_reviews(cached)": (lambda: db.get_movie_reviews(pick_movie()), iterations),
+        "get_movie_reviews(all)": (lambda: uncached(db.get_movie_reviews)(pick_movie(), approved_only=False), heavy),
+        "get_rating_stats": (lambda: uncached(db.get_rating_stats)(pick_movie()), iterations),
+        "get_rating_stats(cached)": (lambda: db.get_rating_stats(pick_movie()), iterations),
+        "get_movie_ratings": (lambda: db.get_movie_ratings(pick_movie()), heavy),
+        "get_user_favorites": (lambda: db.get_user_favorites(pick_user()), iterations),
+        "is_favorite": (lambda: db.is_favorite(pick_movie(), pick_user()), iterations),
+        "get_site_counters": (db.get_site_counters, iterations),
+    }
+    writes = {
+        "create_review": lambda: db.create_review(pick_movie(), pick_user(), "bench", rng.randint(1, 5)),
+        "create_or_update_rating": lambda: db.create_or_update_rating(pick_movie(), pick_user(), float(rng.randint(1, 5))),
+        "add_favorite": lambda: db.add_favorite(pick_movie(), pick_user()),
+        "create_movie": lambda: db.create_movie("Bench", "bench", "Драма", 2000),
+    }
+
+    results = {name: _measure(fn, n) for name, (fn, n) in reads.items()}
+    for name, fn in writes.items():
+        try:
+            with db.transaction():
+                results[name] = _measure(fn, iterations)
+                raise _Rollback
+        except _Rollback:
+            pass
+    return results
@@ -0,0 +1,134 @@
+"""Endpoint benchmark replaying the traffic mix produced by app/static/script.js"""
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict
+
+import httpx
+
+from benchmarks.common import summarize, zipf_picker
+from app import db
+from app.auth import issue_token
+
+GENRES = ["Драма", "Боевик", "Фантастика", "Комедия", "Триллер", "Мелодрама", "Приключения", "Ужасы"]
+SORTS = ["popular", "title", "year", "rating"]
+
+# Scenario weights, roughly what the frontend issues per page view
+SCENARIOS = {
+    "browse": 25,
+    "open_movie": 50,
+    "post_review": 5,
+    "toggle_favorite": 10,
+    "stats": 10,
+}
+
+
+class TrafficMix:
+    def __init__(self, client: httpx.AsyncClient, seed: int):
+        self.client = client
+        self.rng = random.Random(seed)
+        conn = db.get_db()
+        movie_ids = [row[0] for row in conn.execute("SELECT id FROM movies")]
+        self.user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+        self.pick_movie = zipf_picker(movie_ids, self.rng)
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.sent = 0
+
+    def auth(self) -> Dict[str, str]:
+        """Authorization header for a random user; tokens are signed locally, no login round trip"""
+        user_id = self.rng.choice(self.user_ids)
+        return {"Authorization": f"Bearer {issue_token({'id': user_id, 'is_user': True})}"}
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.latencies[route].append(time.perf_counter() - started)
+        self.statuses[route][response.status_code] += 1
+        self.sent += 1
+        return response
+
+    async def browse(self):
+        params = {"limit": 50}
+        if self.rng.random() < 0.5:
+            params["sort"] = self.rng.choice(SORTS)
+        if self.rng.random() < 0.3:
+            params["genre"] = self.rng.choice(GENRES)
+        response = await self.request("GET /api/movies/", "GET", "/api/movies/", params=params)
+        next_cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+        if next_cursor and self.rng.random() < 0.3:
+            params["cursor"] = next_cursor
+            await self.request("GET /api/movies/", "GET", "/api/movies/", params=params)
+
+    async def open_movie(self):
+        # Same requests as openMovie in app/static/script.js: one /full call,
+        # sometimes followed by the next page of reviews
+        movie_id = self.pick_movie()
+        response = await self.request("GET /api/movies/{movie_id}/full", "GET", f"/api/movies/{movie_id}/full",
+                                      params={"approved_only": "false", "reviews_limit": 50})
+        next_cursor = response.json().get("reviews_next_cursor") if response.status_code == 200 else None
+        if next_cursor and self.rng.random() < 0.3:
+            await self.request("GET /api/movies/{movie_id}/reviews", "GET", f"/api/movies/{movie_id}/reviews",
+                               params={"approved_only": "false", "limit": 50, "cursor": next_cursor})
+
+    async def post_review(self):
+        movie_id = self.pick_movie()
+        await self.request("POST /api/movies/{movie_id}/reviews", "POST", f"/api/movies/{movie_id}/reviews",
+                           headers=self.auth(),
+                           json={"text": "Бенчмарк: отличный фильм", "rating": self.rng.randint(1, 5)})
+
+    async def toggle_favorite(self):
+        movie_id = self.pick_movie()
+        headers = self.auth()
+        response = await self.request("POST /api/movies/{movie_id}/favorites", "POST",
+                                      f"/api/movies/{movie_id}/favorites", headers=headers)
+        if response.status_code == 400:
+            await self.request("DELETE /api/movies/{movie_id}/favorites", "DELETE",
+                               f"/api/movies/{movie_id}/favorites", headers=headers)
+
+    async def stats(self):
+        await self.request("GET /api/movies/stats", "GET", "/api/movies/stats")
+
+    async def worker(self, total: int):
+        names = list(SCENARIOS)
+        weights = list(SCENARIOS.values())
+        while self.sent < total:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+async def _run(total: int, concurrency: int, seed: int) -> Dict:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport does not send lifespan events; run startup/shutdown like uvicorn would
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        mix = TrafficMix(client, seed)
+        # Warm up pooled connections and the page cache before measuring
+        await asyncio.gather(*(mix.stats() for _ in range(concurrency)))
+        mix.latencies.clear()
+        mix.statuses.clear()
+        mix.sent = 0
+
+        started = time.perf_counter()
+        await asyncio.gather(*(mix.worker(total) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in mix.latencies.values() for value in values]
+    routes = {}
+    for route, values in sorted(mix.latencies.items()):
+        routes[route] = summarize(values, elapsed)
+        routes[route]["status"] = {str(code): n for code, n in sorted(mix.statuses[route].items())}
+    return {
+        "requests": len(all_latencies),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, elapsed),
+        "routes": routes,
+    }
+
+
+def run(total: int = 5000, concurrency: int = 50, seed: int = 42) -> Dict:
+    """Replay `total` requests from `concurrency` simulated clients"""
+    return asyncio.run(_run(total, concurrency, seed))
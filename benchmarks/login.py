@@ -0,0 +1,81 @@
+"""Login throughput benchmark at the configured password work factor"""
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Dict
+
+import httpx
+
+from benchmarks.common import summarize
+from app import db, passwords
+from app.config import (
+    PASSWORD_HASH_QUEUE, PASSWORD_HASH_WORKERS, PASSWORD_PBKDF2_ITERATIONS,
+    PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_P, PASSWORD_SCRYPT_R,
+)
+from seed_db import GENERATED_PASSWORD
+
+
+def work_factor() -> Dict:
+    if passwords.SCHEME == "scrypt":
+        params = {"n": PASSWORD_SCRYPT_N, "r": PASSWORD_SCRYPT_R, "p": PASSWORD_SCRYPT_P}
+    else:
+        params = {"iterations": PASSWORD_PBKDF2_ITERATIONS}
+    return {"scheme": passwords.SCHEME, **params,
+            "workers": PASSWORD_HASH_WORKERS, "queue": PASSWORD_HASH_QUEUE}
+
+
+async def _run(total: int, concurrency: int, seed: int) -> Dict:
+    from app.main import app
+
+    rng = random.Random(seed)
+    usernames = [row[0] for row in db.get_db().execute("SELECT username FROM users WHERE username LIKE 'user%'")]
+    if not usernames:
+        raise SystemExit("No generated users (user<id>) in the benchmark database")
+    # Pre-upgrade every user we will log in as, so legacy SHA-256 rows do not
+    # add a rehash to the first login and all logins run at the same work factor
+    sample = rng.sample(usernames, min(len(usernames), concurrency * 4))
+    for username in sample:
+        user = db.get_user_by_username(username)
+        if passwords.needs_rehash(user["password"]):
+            db.update_user_password(user["id"], passwords.hash_password(GENERATED_PASSWORD))
+
+    latencies, accepted, statuses = [], [], Counter()
+    sent = 0
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport does not send lifespan events; run startup/shutdown like uvicorn would
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal sent
+            while sent < total:
+                sent += 1
+                started = time.perf_counter()
+                response = await client.post("/api/users/login", json={
+                    "username": rng.choice(sample), "password": GENERATED_PASSWORD,
+                })
+                latency = time.perf_counter() - started
+                latencies.append(latency)
+                if response.status_code == 200:
+                    accepted.append(latency)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "work_factor": work_factor(),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(latencies, elapsed),
+        # Successful logins only: rps here is the sustained login throughput
+        "ok": summarize(accepted, elapsed),
+        "status": {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+def run(total: int = 500, concurrency: int = 20, seed: int = 42) -> Dict:
+    """`total` logins from `concurrency` clients; 503s show where the pool started shedding"""
+    return asyncio.run(_run(total, concurrency, seed))
@@ -0,0 +1,52 @@
+"""Cold-start benchmark: fresh interpreter -> import app.main -> lifespan startup -> first request"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+from benchmarks.common import ROOT, summarize
+
+# Runs in a fresh interpreter per sample; prints one JSON line of phase timings
+_PROBE = r"""
+import time
+started = time.perf_counter()
+import asyncio, json, sys
+from pathlib import Path
+sys.path.insert(0, {root!r})
+import init_db
+from app import db
+init_db.DB_PATH = db.DB_PATH = Path({db!r})
+from app.main import app
+imported = time.perf_counter()
+# The client is not part of the app's cold start
+import httpx
+harness = time.perf_counter() - imported
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/api/movies/", params={{"limit": 50}})
+            response.raise_for_status()
+        return ready, time.perf_counter()
+
+ready, served = asyncio.run(first_request())
+print(json.dumps({{"import": imported - started, "startup": ready - imported - harness,
+                  "first_request": served - ready, "total": served - started - harness}}))
+"""
+
+
+def run(samples: int, db_path: Path) -> Dict:
+    """Phase timings over `samples` cold starts against `db_path`"""
+    probe = _PROBE.format(root=str(ROOT), db=str(db_path))
+    phases: Dict[str, list] = {}
+    for _ in range(samples):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True)
+        if output.returncode != 0:
+            raise RuntimeError(f"Cold-start probe failed:\n{output.stderr}")
+        timings = json.loads(output.stdout.strip().splitlines()[-1])
+        for phase, seconds in timings.items():
+            phases.setdefault(phase, []).append(seconds)
+    return {phase: summarize(values) for phase, values in phases.items()}
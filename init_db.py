@@ -6,18 +6,272 @@ from pathlib import Path
 DB_PATH = Path(__file__).parent / "kinovzor.db"
 
 def init_db():
-    """Create all tables"""
+    """Recreate the database from scratch (destroys existing data).
+
+    Only the CLI and the dataset tools reset a database this way; app startup
+    goes through upgrade_db(), which never drops anything.
+    """
     
-    # Remove old db if exists
-    if DB_PATH.exists():
-        os.remove(DB_PATH)
+    # Remove old db if exists, with its WAL sidecars: a stale -wal could be
+    # replayed into the new file
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal"), DB_PATH.with_name(DB_PATH.name + "-shm")):
+        if path.exists():
+            os.remove(path)
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    upgrade_db()
     
+    print(f"✅ Database initialized successfully!")
+    print(f"📁 File: {DB_PATH}")
+    print(f"🗓️ Tables: users, movies, reviews, ratings, favorites, site_counters, movies_fts, reviews_fts, movie_cards, app_state")
+
+# Per-movie review/rating aggregates, kept current by triggers on reviews so
+# every write path (API, bulk import, seeding) updates them in its own transaction
+MOVIE_STATS_COLUMNS = [
+    ("review_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("approved_review_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_sum", "INTEGER NOT NULL DEFAULT 0"),
+    ("rating_avg", "REAL GENERATED ALWAYS AS "
+                   "(CASE WHEN rating_count > 0 THEN rating_sum * 1.0 / rating_count ELSE 0 END) VIRTUAL"),
+]
+
+MOVIE_STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_stats_insert AFTER INSERT ON reviews
+    BEGIN
+        UPDATE movies SET
+            review_count = review_count + 1,
+            approved_review_count = approved_review_count + (NEW.approved != 0),
+            rating_count = rating_count + (NEW.rating IS NOT NULL),
+            rating_sum = rating_sum + COALESCE(NEW.rating, 0)
+        WHERE id = NEW.movie_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_stats_delete AFTER DELETE ON reviews
+    BEGIN
+        UPDATE movies SET
+            review_count = review_count - 1,
+            approved_review_count = approved_review_count - (OLD.approved != 0),
+            rating_count = rating_count - (OLD.rating IS NOT NULL),
+            rating_sum = rating_sum - COALESCE(OLD.rating, 0)
+        WHERE id = OLD.movie_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_stats_update AFTER UPDATE OF movie_id, approved, rating ON reviews
+    BEGIN
+        UPDATE movies SET
+            review_count = review_count - 1,
+            approved_review_count = approved_review_count - (OLD.approved != 0),
+            rating_count = rating_count - (OLD.rating IS NOT NULL),
+            rating_sum = rating_sum - COALESCE(OLD.rating, 0)
+        WHERE id = OLD.movie_id;
+        UPDATE movies SET
+            review_count = review_count + 1,
+            approved_review_count = approved_review_count + (NEW.approved != 0),
+            rating_count = rating_count + (NEW.rating IS NOT NULL),
+            rating_sum = rating_sum + COALESCE(NEW.rating, 0)
+        WHERE id = NEW.movie_id;
+    END
+    """,
+]
+
+# Site-wide row counters in a single-row table, kept current by triggers so
+# /api/movies/stats is one primary-key lookup
+SITE_COUNTER_TRIGGERS = [
+    ("movies", "INSERT", "movies = movies + 1"),
+    ("movies", "DELETE", "movies = movies - 1"),
+    ("reviews", "INSERT", "reviews = reviews + 1, approved_reviews = approved_reviews + (NEW.approved != 0)"),
+    ("reviews", "DELETE", "reviews = reviews - 1, approved_reviews = approved_reviews - (OLD.approved != 0)"),
+    ("ratings", "INSERT", "ratings = ratings + 1"),
+    ("ratings", "DELETE", "ratings = ratings - 1"),
+    ("users", "INSERT", "users = users + 1"),
+    ("users", "DELETE", "users = users - 1"),
+    ("favorites", "INSERT", "favorites = favorites + 1"),
+    ("favorites", "DELETE", "favorites = favorites - 1"),
+]
+
+# Change counters behind the ETag / Last-Modified validators of GET /api/movies/
+# and /api/movies/{id}: any write to a movie row (including the aggregate
+# updates above) bumps movies.version, and any change to the catalog bumps
+# site_counters.catalog_version
+MOVIE_VERSION_COLUMNS = [
+    ("version", "INTEGER NOT NULL DEFAULT 0"),
+]
+CATALOG_VERSION_COLUMNS = [
+    ("catalog_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("catalog_updated_at", "TIMESTAMP"),
+]
+
+BUMP_CATALOG_VERSION = "catalog_version = catalog_version + 1, catalog_updated_at = CURRENT_TIMESTAMP"
+
+VERSION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_version_update AFTER UPDATE ON movies
+    WHEN NEW.version = OLD.version
+    BEGIN
+        UPDATE movies SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        UPDATE site_counters SET {BUMP_CATALOG_VERSION} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_version_insert AFTER INSERT ON movies
+    BEGIN
+        UPDATE site_counters SET {BUMP_CATALOG_VERSION} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_version_delete AFTER DELETE ON movies
+    BEGIN
+        UPDATE site_counters SET {BUMP_CATALOG_VERSION} WHERE id = 1;
+    END
+    """,
+]
+
+# Full-text search (GET /api/movies/search): FTS5 indexes over movie
+# titles/descriptions and approved review texts, kept in sync by triggers.
+# Their content tables are views that fold ё/Ё to е/Е: unicode61 folds case
+# and diacritics for Cyrillic too, but treats ё as its own letter (queries are
+# folded the same way, see app/search.py). The reviews view holds approved
+# reviews only, so the index always matches its content.
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+
+def _fold_yo(expr: str) -> str:
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+SEARCH_TABLES = [
+    f"""
+    CREATE VIEW IF NOT EXISTS movies_search AS
+    SELECT id, {_fold_yo('title')} AS title, {_fold_yo('description')} AS description FROM movies
+    """,
+    f"""
+    CREATE VIEW IF NOT EXISTS reviews_search AS
+    SELECT id, {_fold_yo('text')} AS text, movie_id FROM reviews WHERE approved != 0
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+        title, description,
+        content = 'movies_search', content_rowid = 'id', tokenize = '{SEARCH_TOKENIZER}'
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+        text, movie_id UNINDEXED,
+        content = 'reviews_search', content_rowid = 'id', tokenize = '{SEARCH_TOKENIZER}'
+    )
+    """,
+]
+
+def _movies_fts_row(ref: str) -> str:
+    return f"{ref}.id, {_fold_yo(f'{ref}.title')}, {_fold_yo(f'{ref}.description')}"
+
+def _reviews_fts_row(ref: str) -> str:
+    return f"{ref}.id, {_fold_yo(f'{ref}.text')}, {ref}.movie_id"
+
+SEARCH_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_fts_insert AFTER INSERT ON movies
+    BEGIN
+        INSERT INTO movies_fts (rowid, title, description) VALUES ({_movies_fts_row('NEW')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_fts_delete AFTER DELETE ON movies
+    BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description) VALUES ('delete', {_movies_fts_row('OLD')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_fts_update AFTER UPDATE OF title, description ON movies
+    BEGIN
+        INSERT INTO movies_fts (movies_fts, rowid, title, description) VALUES ('delete', {_movies_fts_row('OLD')});
+        INSERT INTO movies_fts (rowid, title, description) VALUES ({_movies_fts_row('NEW')});
+    END
+    """,
+    # Only approved reviews are searchable
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_fts_insert AFTER INSERT ON reviews
+    WHEN NEW.approved != 0
+    BEGIN
+        INSERT INTO reviews_fts (rowid, text, movie_id) VALUES ({_reviews_fts_row('NEW')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_fts_delete AFTER DELETE ON reviews
+    WHEN OLD.approved != 0
+    BEGIN
+        INSERT INTO reviews_fts (reviews_fts, rowid, text, movie_id) VALUES ('delete', {_reviews_fts_row('OLD')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_fts_update AFTER UPDATE OF text, approved, movie_id ON reviews
+    BEGIN
+        INSERT INTO reviews_fts (reviews_fts, rowid, text, movie_id)
+            SELECT 'delete', {_reviews_fts_row('OLD')} WHERE OLD.approved != 0;
+        INSERT INTO reviews_fts (rowid, text, movie_id)
+            SELECT {_reviews_fts_row('NEW')} WHERE NEW.approved != 0;
+    END
+    """,
+]
+
+# Catalog cards (GET /api/movies/): each movie pre-encoded as the JSON object
+# the listing returns, so a page is its cards joined with commas instead of
+# rows -> dicts -> JSON on every request. Any change to a movie row, its
+# aggregates included, bumps movies.version (VERSION_TRIGGERS); the card is
+# rebuilt when the version moves, from the row as it ends up.
+MOVIE_CARD_FIELDS = (
+    "id", "title", "description", "genre", "year", "poster_url", "created_at", "updated_at",
+    "review_count", "approved_review_count", "rating_count", "rating_sum", "rating_avg", "version",
+)
+
+def _movie_card(ref: str) -> str:
+    return "json_object(" + ", ".join(f"'{field}', {ref}.{field}" for field in MOVIE_CARD_FIELDS) + ")"
+
+MOVIE_CARD_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_card_insert AFTER INSERT ON movies
+    BEGIN
+        INSERT OR REPLACE INTO movie_cards (movie_id, card) VALUES (NEW.id, {_movie_card('NEW')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_movies_card_update AFTER UPDATE ON movies
+    WHEN NEW.version != OLD.version
+    BEGIN
+        UPDATE movie_cards SET card = {_movie_card('NEW')} WHERE movie_id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_movies_card_delete AFTER DELETE ON movies
+    BEGIN
+        DELETE FROM movie_cards WHERE movie_id = OLD.id;
+    END
+    """,
+]
+
+def _add_missing_columns(cursor: sqlite3.Cursor, table: str, columns) -> bool:
+    """ALTER TABLE ADD COLUMN for each (name, ddl) not yet in `table`; True if any was added"""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})")}
+    added = False
+    for name, ddl in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+            added = True
+    return added
+
+# Schema steps, applied in order; step N is Alembic revision 00N
+# (app/alembic/versions), and PRAGMA user_version records the last one applied.
+# Every step is idempotent, so a database built before user_version was kept
+# (version 0 with some or all of the schema) upgrades through the same path.
+# Steps that add maintained data (aggregates, counters, search index) only
+# flag it in `backfill`; it is filled once after the last step, against the
+# final schema.
+
+def _create_tables(cursor: sqlite3.Cursor, backfill: set):
     # Users table
     cursor.execute("""
-    CREATE TABLE users (
+    CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         email TEXT UNIQUE NOT NULL,
         password TEXT NOT NULL,
@@ -32,7 +286,7 @@ def init_db():
     
     # Movies table
     cursor.execute("""
-    CREATE TABLE movies (
+    CREATE TABLE IF NOT EXISTS movies (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         title TEXT NOT NULL,
         description TEXT,
@@ -46,7 +300,7 @@ def init_db():
     
     # Reviews table - user_id is nullable now
     cursor.execute("""
-    CREATE TABLE reviews (
+    CREATE TABLE IF NOT EXISTS reviews (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         movie_id INTEGER NOT NULL,
         user_id INTEGER,
@@ -62,7 +316,7 @@ def init_db():
     
     # Ratings table
     cursor.execute("""
-    CREATE TABLE ratings (
+    CREATE TABLE IF NOT EXISTS ratings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         movie_id INTEGER NOT NULL,
         user_id INTEGER NOT NULL,
@@ -76,7 +330,7 @@ def init_db():
     
     # Favorites table
     cursor.execute("""
-    CREATE TABLE favorites (
+    CREATE TABLE IF NOT EXISTS favorites (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         movie_id INTEGER NOT NULL,
         user_id INTEGER NOT NULL,
@@ -86,13 +340,282 @@ def init_db():
         FOREIGN KEY (user_id) REFERENCES users(id)
     )
     """)
-    
+
+def _catalog_indexes(cursor: sqlite3.Cursor, backfill: set):
+    # Genre filter + sort order + keyset pagination for GET /api/movies/
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_genre_id ON movies (genre, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_title ON movies (title, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_genre_title ON movies (genre, title, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_year ON movies (year, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_genre_year ON movies (genre, year, id)")
+
+def _movie_stats(cursor: sqlite3.Cursor, backfill: set):
+    if _add_missing_columns(cursor, "movies", MOVIE_STATS_COLUMNS):
+        backfill.add("movie_stats")
+    for trigger in MOVIE_STATS_TRIGGERS:
+        cursor.execute(trigger)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies (rating_avg, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movies_genre_rating ON movies (genre, rating_avg, id)")
+
+def _site_counters(cursor: sqlite3.Cursor, backfill: set):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS site_counters (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        movies INTEGER NOT NULL DEFAULT 0,
+        reviews INTEGER NOT NULL DEFAULT 0,
+        approved_reviews INTEGER NOT NULL DEFAULT 0,
+        ratings INTEGER NOT NULL DEFAULT 0,
+        users INTEGER NOT NULL DEFAULT 0,
+        favorites INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    for table, event, assignments in SITE_COUNTER_TRIGGERS:
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_counters_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            UPDATE site_counters SET {assignments} WHERE id = 1;
+        END
+        """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_reviews_counters_update AFTER UPDATE OF approved ON reviews
+    BEGIN
+        UPDATE site_counters SET approved_reviews = approved_reviews - (OLD.approved != 0) + (NEW.approved != 0) WHERE id = 1;
+    END
+    """)
+    cursor.execute("INSERT OR IGNORE INTO site_counters (id) VALUES (1)")
+    if cursor.rowcount:
+        backfill.add("site_counters")
+
+def _hot_indexes(cursor: sqlite3.Cursor, backfill: set):
+    # Hot lookups in app/db.py (reviews per movie, favorites, ratings, login)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_movie_created ON reviews (movie_id, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_movie_approved_created ON reviews (movie_id, approved, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_favorites_user_movie ON favorites (user_id, movie_id)")
+    # One rating / favorite per (movie, user): drop duplicates before enforcing it
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_ratings_movie_user'")
+    if not cursor.fetchone():
+        cursor.execute("DELETE FROM ratings WHERE id NOT IN (SELECT MAX(id) FROM ratings GROUP BY movie_id, user_id)")
+        cursor.execute("CREATE UNIQUE INDEX uq_ratings_movie_user ON ratings (movie_id, user_id)")
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_favorites_movie_user'")
+    if not cursor.fetchone():
+        cursor.execute("DELETE FROM favorites WHERE id NOT IN (SELECT MIN(id) FROM favorites GROUP BY movie_id, user_id)")
+        cursor.execute("CREATE UNIQUE INDEX uq_favorites_movie_user ON favorites (movie_id, user_id)")
+
+def _change_versions(cursor: sqlite3.Cursor, backfill: set):
+    # Change counters for conditional GETs
+    _add_missing_columns(cursor, "movies", MOVIE_VERSION_COLUMNS)
+    _add_missing_columns(cursor, "site_counters", CATALOG_VERSION_COLUMNS)
+    for trigger in VERSION_TRIGGERS:
+        cursor.execute(trigger)
+
+def _search(cursor: sqlite3.Cursor, backfill: set):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'")
+    if cursor.fetchone() is None:
+        backfill.add("search")
+    for table in SEARCH_TABLES:
+        cursor.execute(table)
+    for trigger in SEARCH_TRIGGERS:
+        cursor.execute(trigger)
+
+def _pending_reviews_index(cursor: sqlite3.Cursor, backfill: set):
+    # Moderation queue (GET /api/movies/reviews/pending): only unapproved reviews, oldest first
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_reviews_pending ON reviews (created_at, id) WHERE approved = 0")
+
+def _movie_cards(cursor: sqlite3.Cursor, backfill: set):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movie_cards'")
+    if cursor.fetchone() is None:
+        backfill.add("movie_cards")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS movie_cards (
+        movie_id INTEGER PRIMARY KEY,
+        card TEXT NOT NULL
+    )
+    """)
+    for trigger in MOVIE_CARD_TRIGGERS:
+        cursor.execute(trigger)
+
+def _app_state(cursor: sqlite3.Cursor, backfill: set):
+    # Small key/value facts about the database itself (e.g. SEED_MARKER)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS app_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+MIGRATIONS = [
+    _create_tables,           # 001
+    _catalog_indexes,         # 002
+    _movie_stats,             # 003
+    _site_counters,           # 004
+    _hot_indexes,             # 005
+    _change_versions,         # 006
+    _search,                  # 007
+    _pending_reviews_index,   # 008
+    _movie_cards,             # 009
+    _app_state,               # 010
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def _stamp_alembic(cursor: sqlite3.Cursor):
+    """Record SCHEMA_VERSION as Alembic's head too, so `alembic upgrade` starts from here"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS alembic_version (
+        version_num VARCHAR(32) NOT NULL,
+        CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+    )
+    """)
+    cursor.execute("DELETE FROM alembic_version")
+    cursor.execute("INSERT INTO alembic_version (version_num) VALUES (?)", (f"{SCHEMA_VERSION:03d}",))
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"{DB_PATH} has schema version {version}, newer than this code ({SCHEMA_VERSION})")
+    return version
+
+def recompute_movie_stats(cursor: sqlite3.Cursor, min_movie_id: int = 0):
+    """Rebuild the review/rating aggregates of movies with ids >= min_movie_id from the reviews table"""
+    # Bumping version here also keeps trg_movies_version_update from firing per row
+    cursor.execute("""
+    UPDATE movies SET
+        version = version + 1,
+        updated_at = CURRENT_TIMESTAMP,
+        review_count = (SELECT COUNT(*) FROM reviews r WHERE r.movie_id = movies.id),
+        approved_review_count = (SELECT COUNT(*) FROM reviews r WHERE r.movie_id = movies.id AND r.approved != 0),
+        rating_count = (SELECT COUNT(r.rating) FROM reviews r WHERE r.movie_id = movies.id),
+        rating_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.movie_id = movies.id)
+    WHERE id >= ?
+    """, (min_movie_id,))
+
+def index_for_search(cursor: sqlite3.Cursor, min_movie_id: int = 0, min_review_id: int = 0):
+    """Add movies / approved reviews with ids >= the given ones to the search index"""
+    cursor.execute(
+        "INSERT INTO movies_fts (rowid, title, description) "
+        "SELECT id, title, description FROM movies_search WHERE id >= ?",
+        (min_movie_id,)
+    )
+    cursor.execute(
+        "INSERT INTO reviews_fts (rowid, text, movie_id) "
+        "SELECT id, text, movie_id FROM reviews_search WHERE id >= ?",
+        (min_review_id,)
+    )
+
+def rebuild_search_index(cursor: sqlite3.Cursor):
+    """Re-index everything from the source tables"""
+    cursor.execute("INSERT INTO movies_fts (movies_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO reviews_fts (reviews_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO movies_fts (movies_fts) VALUES ('optimize')")
+    cursor.execute("INSERT INTO reviews_fts (reviews_fts) VALUES ('optimize')")
+
+def build_movie_cards(cursor: sqlite3.Cursor, min_movie_id: int = 0):
+    """(Re)build the catalog cards of movies with ids >= min_movie_id"""
+    cursor.execute(
+        f"INSERT OR REPLACE INTO movie_cards (movie_id, card) SELECT id, {_movie_card('movies')} FROM movies WHERE id >= ?",
+        (min_movie_id,)
+    )
+
+def recompute_site_counters(cursor: sqlite3.Cursor):
+    """Rebuild the site_counters row from the source tables"""
+    cursor.execute(f"""
+    UPDATE site_counters SET
+        movies = (SELECT COUNT(*) FROM movies),
+        reviews = (SELECT COUNT(*) FROM reviews),
+        approved_reviews = (SELECT COUNT(*) FROM reviews WHERE approved != 0),
+        ratings = (SELECT COUNT(*) FROM ratings),
+        users = (SELECT COUNT(*) FROM users),
+        favorites = (SELECT COUNT(*) FROM favorites),
+        {BUMP_CATALOG_VERSION}
+    WHERE id = 1
+    """)
+
+def upgrade_db() -> int:
+    """Apply the schema steps the database has not had yet, creating it if needed.
+
+    An up-to-date database costs one header read (PRAGMA user_version). Otherwise
+    the missing steps, their backfills and the new user_version go in one
+    BEGIN IMMEDIATE transaction: a crash leaves the previous version in place,
+    and a concurrent upgrader waits for it, then finds nothing left to do.
+    Never drops data. Returns the version the database was at.
+    """
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        found = _schema_version(conn)
+        if found == SCHEMA_VERSION:
+            return found
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            found = _schema_version(conn)
+            cursor = conn.cursor()
+            backfill = set()
+            for step in MIGRATIONS[found:]:
+                step(cursor, backfill)
+            if "movie_stats" in backfill:
+                recompute_movie_stats(cursor)
+            if "site_counters" in backfill:
+                recompute_site_counters(cursor)
+            if "search" in backfill:
+                index_for_search(cursor)
+            if "movie_cards" in backfill:
+                build_movie_cards(cursor)
+            _stamp_alembic(cursor)
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return found
+
+# app_state key written by seed_db.seed_movies_and_reviews() in its own transaction
+SEED_MARKER = "seeded"
+
+def needs_seed() -> bool:
+    """Never seeded and holding no movies or users (two primary-key lookups).
+
+    The marker is committed together with the seed data, so an interrupted
+    seed leaves neither behind and the next start seeds again; a database
+    that was seeded and later emptied is left alone.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        row = conn.execute(
+            "SELECT (SELECT movies + users FROM site_counters WHERE id = 1), "
+            "EXISTS (SELECT 1 FROM app_state WHERE key = ?)",
+            (SEED_MARKER,)
+        ).fetchone()
+    finally:
+        conn.close()
+    rows, seeded = row
+    return not seeded and not rows
+
+def recompute_stats():
+    """Repair drift in the maintained aggregates"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    recompute_movie_stats(cursor)
+    recompute_site_counters(cursor)
+    rebuild_search_index(cursor)
+    cursor.execute("DELETE FROM movie_cards")
+    build_movie_cards(cursor)
     conn.commit()
     conn.close()
-    
-    print(f"✅ Database initialized successfully!")
-    print(f"📁 File: {DB_PATH}")
-    print(f"🗓️ Tables: users, movies, reviews, ratings, favorites")
+    print(f"✅ Aggregates, search index and catalog cards recomputed: {DB_PATH}")
 
 if __name__ == "__main__":
-    init_db()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Initialize or maintain the SQLite database")
+    parser.add_argument("--upgrade", action="store_true", help="apply missing schema updates to the existing database")
+    parser.add_argument("--recompute", action="store_true", help="rebuild maintained aggregates, the search index and catalog cards from source tables")
+    args = parser.parse_args()
+    
+    if args.upgrade:
+        found = upgrade_db()
+        print(f"✅ Database upgraded: {DB_PATH} (schema v{found} -> v{SCHEMA_VERSION})")
+    elif args.recompute:
+        recompute_stats()
+    else:
+        init_db()
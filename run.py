@@ -1,17 +1,19 @@
 #!/usr/bin/env python
-"""Run the FastAPI application"""
-import uvicorn
-import os
+"""Run the FastAPI application (production settings from app/config.py / .env)"""
+import argparse
 import sys
 from pathlib import Path
 
 # Add current directory to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from app.server import serve
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=True
-    )
+    parser = argparse.ArgumentParser(description="Run the KinoVzor server")
+    parser.add_argument("--host", help="bind address (default: SERVER_HOST)")
+    parser.add_argument("--port", type=int, help="bind port (default: SERVER_PORT)")
+    parser.add_argument("--workers", type=int, help="worker processes, 0 = one per CPU; more than one needs SESSION_SECRET (default: SERVER_WORKERS, 1)")
+    parser.add_argument("--reload", action="store_true", help="development mode: one worker, restart on code changes")
+    args = parser.parse_args()
+    serve(host=args.host, port=args.port, workers=args.workers, reload=args.reload)
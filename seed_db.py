@@ -1,11 +1,16 @@
 """Seed database with 50 real movies, reviews, ratings, and users"""
 import sys
 from pathlib import Path
-import hashlib
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app import db
+from app import db, passwords
+from app.config import SQLITE_CACHE_SIZE_KB
+import init_db
 
 # 10 viewer users
 viewers_data = [
@@ -446,81 +451,91 @@ reviews_templates = {
 }
 
 def hash_password(password: str) -> str:
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash password the way the app stores it (app/passwords.py)"""
+    return passwords.hash_password(password)
+
+def _next_id(conn, table: str) -> int:
+    return conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
 
 def seed_movies_and_reviews():
     """Load all 50 real movies with reviews, ratings, and users into database"""
     print("\n🍋 Loading 50 movies, reviews, ratings, and users...\n")
     
-    # Create users first
-    print("👥 Creating users...")
-    user_ids = []
-    
-    # Create 10 viewers
-    for viewer in viewers_data:
-        user = db.create_user(
-            email=viewer["email"],
-            username=viewer["username"],
-            password=hash_password(viewer["password"])
+    # Everything goes in with executemany inside one transaction
+    with db.transaction() as conn:
+        # Create users first: 10 viewers + moderator
+        print("👥 Creating users...")
+        first_user_id = _next_id(conn, "users")
+        user_ids = [first_user_id + i for i in range(len(viewers_data))]
+        users = [
+            (user_id, viewer["email"], hash_password(viewer["password"]), viewer["username"], False)
+            for user_id, viewer in zip(user_ids, viewers_data)
+        ]
+        users.append((
+            first_user_id + len(viewers_data),
+            admin_user["email"],
+            hash_password(admin_user["password"]),
+            admin_user["username"],
+            admin_user["is_moderator"],
+        ))
+        conn.executemany(
+            "INSERT INTO users (id, email, password, username, is_moderator) VALUES (?, ?, ?, ?, ?)",
+            users
         )
-        user_ids.append(user['id'])
-        print(f"   ✅ Created viewer: {viewer['username']}")
-    
-    # Create moderator
-    admin = db.create_user(
-        email=admin_user["email"],
-        username=admin_user["username"],
-        password=hash_password(admin_user["password"]),
-        is_moderator=admin_user["is_moderator"]
-    )
-    print(f"   ✅ Created moderator: {admin_user['username']}")
-    
-    print(f"\n🎬 Creating movies, reviews, and ratings...\n")
-    
-    total_reviews = 0
-    total_ratings = 0
-    
-    for i, movie_info in enumerate(movies_data):
-        # Create movie
-        movie = db.create_movie(
-            title=movie_info["title"],
-            description=movie_info["desc"],
-            genre=movie_info["genre"],
-            year=movie_info["year"],
-            poster_url=movie_info["poster"]
-        )
-        movie_id = movie['id']
+        for viewer in viewers_data:
+            print(f"   ✅ Created viewer: {viewer['username']}")
+        print(f"   ✅ Created moderator: {admin_user['username']}")
         
-        # Get reviews for this genre
-        genre_reviews = reviews_templates.get(movie_info["genre"], reviews_templates["Драма"])
+        print(f"\n🎬 Creating movies, reviews, and ratings...\n")
         
-        # Add 4-7 reviews per movie from different users
-        review_count = 4 + (i % 4)  # 4-7 reviews
-        for j in range(review_count):
-            review = genre_reviews[j % len(genre_reviews)]
-            # Assign to different user (cycle through user_ids)
-            user_id = user_ids[j % len(user_ids)]
+        first_movie_id = _next_id(conn, "movies")
+        movies = []
+        reviews = []
+        ratings = []
+        for i, movie_info in enumerate(movies_data):
+            movie_id = first_movie_id + i
+            movies.append((
+                movie_id,
+                movie_info["title"],
+                movie_info["desc"],
+                movie_info["genre"],
+                movie_info["year"],
+                movie_info["poster"],
+            ))
             
-            db.create_review(
-                movie_id=movie_id,
-                user_id=user_id,
-                text=review["text"],
-                rating=review["rating"]
-            )
-            total_reviews += 1
+            # Get reviews for this genre
+            genre_reviews = reviews_templates.get(movie_info["genre"], reviews_templates["Драма"])
             
-            # Create corresponding rating in ratings table
-            db.create_or_update_rating(
-                movie_id=movie_id,
-                user_id=user_id,
-                value=float(review["rating"])
-            )
-            total_ratings += 1
+            # Add 4-7 reviews per movie from different users
+            review_count = 4 + (i % 4)  # 4-7 reviews
+            for j in range(review_count):
+                review = genre_reviews[j % len(genre_reviews)]
+                # Assign to different user (cycle through user_ids)
+                user_id = user_ids[j % len(user_ids)]
+                reviews.append((movie_id, user_id, review["text"], review["rating"], False))
+                # Create corresponding rating in ratings table
+                ratings.append((movie_id, user_id, float(review["rating"])))
         
-        # Print progress
-        if (i + 1) % 10 == 0:
-            print(f"  ✅ {i + 1}/50 movies loaded")
+        conn.executemany(
+            "INSERT INTO movies (id, title, description, genre, year, poster_url) VALUES (?, ?, ?, ?, ?, ?)",
+            movies
+        )
+        conn.executemany(
+            "INSERT INTO reviews (movie_id, user_id, text, rating, approved) VALUES (?, ?, ?, ?, ?)",
+            reviews
+        )
+        conn.executemany(
+            "INSERT INTO ratings (movie_id, user_id, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (movie_id, user_id) DO UPDATE SET value = excluded.value",
+            ratings
+        )
+        # Committed with the data, so app startup knows the seed completed
+        conn.execute(
+            "INSERT OR REPLACE INTO app_state (key, value) VALUES (?, CURRENT_TIMESTAMP)",
+            (init_db.SEED_MARKER,)
+        )
+    total_reviews = len(reviews)
+    total_ratings = len(ratings)
     
     print("\n✅ All data loaded!")
     print(f"🎬 50 настоящих фильмов")
@@ -536,5 +551,172 @@ def seed_movies_and_reviews():
     print(f"   Password: {viewers_data[0]['password']}")
     print(f"\n📁 file: kinovzor.db\n")
 
+# ===== Synthetic dataset generator =====
+# Deterministic (seeded RNG) production-scale data for local performance work.
+# Movie and user activity follow a Zipf-like distribution: a few titles get
+# most of the reviews and favorites, most get almost none.
+
+GENERATED_PASSWORD = "viewer123"
+BATCH_SIZE = 50_000
+LOAD_CACHE_SIZE_KB = 512 * 1024
+
+def _zipf_cum_weights(n: int, skew: float) -> List[float]:
+    """Cumulative weights 1/rank^skew for ranks 1..n"""
+    total = 0.0
+    cum = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** skew
+        cum.append(total)
+    return cum
+
+def _skewed_picks(rng: random.Random, ids: List[int], cum_weights: List[float], k: int) -> Iterator[int]:
+    """k ids drawn by popularity, produced in batches to keep memory flat"""
+    while k > 0:
+        n = min(k, BATCH_SIZE)
+        yield from rng.choices(ids, cum_weights=cum_weights, k=n)
+        k -= n
+
+def generate_dataset(users: int = 10_000, movies: int = 5_000, reviews: int = 200_000,
+                     ratings: int = 200_000, favorites: int = 50_000,
+                     seed: int = 42, skew: float = 1.1) -> Dict[str, int]:
+    """Append a synthetic dataset to the database in one transaction.
+
+    The same arguments always produce the same rows.
+    """
+    rng = random.Random(seed)
+    genres = list(reviews_templates)
+    # One KDF call for all generated users: they share a salt, which is fine
+    # for synthetic data and keeps generation time independent of the work factor
+    password = hash_password(GENERATED_PASSWORD)
+    epoch = int(datetime(2020, 1, 1).timestamp())
+    span = int(timedelta(days=5 * 365).total_seconds())
+    
+    started = time.perf_counter()
+    with db.transaction() as conn:
+        # Per-row triggers and random-order index inserts dominate bulk-load time.
+        # Drop the triggers and the non-unique indexes for the load, then rebuild
+        # the indexes (sorted build) and the aggregates once at the end. All of it
+        # happens in this one transaction, so no reader ever sees them missing.
+        conn.execute(f"PRAGMA cache_size = -{LOAD_CACHE_SIZE_KB}")
+        deferred = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE type = 'trigger' OR (type = 'index' AND tbl_name IN ('reviews', 'favorites') "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%')"
+        ).fetchall()
+        for kind, name, _ in deferred:
+            conn.execute(f"DROP {kind.upper()} {name}")
+        
+        first_user_id = _next_id(conn, "users")
+        first_movie_id = _next_id(conn, "movies")
+        first_review_id = _next_id(conn, "reviews")
+        user_ids = list(range(first_user_id, first_user_id + users))
+        movie_ids = list(range(first_movie_id, first_movie_id + movies))
+        
+        conn.executemany(
+            "INSERT INTO users (id, email, password, username) VALUES (?, ?, ?, ?)",
+            ((uid, f"user{uid}@example.com", password, f"user{uid}") for uid in user_ids)
+        )
+        
+        movie_genres = {}
+        def movie_rows():
+            for mid in movie_ids:
+                base = movies_data[rng.randrange(len(movies_data))]
+                genre = genres[rng.randrange(len(genres))]
+                movie_genres[mid] = genre
+                yield (mid, f"{base['title']} #{mid}", base["desc"], genre, rng.randint(1950, 2025), base["poster"])
+        conn.executemany(
+            "INSERT INTO movies (id, title, description, genre, year, poster_url) VALUES (?, ?, ?, ?, ?, ?)",
+            movie_rows()
+        )
+        
+        # Popularity ranks are shuffled so popular titles are spread over the id range
+        popular_movies = movie_ids[:]
+        rng.shuffle(popular_movies)
+        active_users = user_ids[:]
+        rng.shuffle(active_users)
+        movie_cum = _zipf_cum_weights(len(popular_movies), skew)
+        user_cum = _zipf_cum_weights(len(active_users), skew / 2)
+        
+        def review_rows():
+            pick_users = _skewed_picks(rng, active_users, user_cum, reviews)
+            for mid in _skewed_picks(rng, popular_movies, movie_cum, reviews):
+                template = rng.choice(reviews_templates[movie_genres[mid]])
+                yield (
+                    mid,
+                    next(pick_users),
+                    template["text"],
+                    template["rating"],
+                    rng.random() < 0.8,
+                    epoch + rng.randrange(span),
+                )
+        # SQLite formats the timestamp; much cheaper than datetime.strftime per row
+        conn.executemany(
+            "INSERT INTO reviews (movie_id, user_id, text, rating, approved, created_at) "
+            "VALUES (?, ?, ?, ?, ?, datetime(?, 'unixepoch'))",
+            review_rows()
+        )
+        
+        def pair_rows(k: int, with_value: bool):
+            pick_users = _skewed_picks(rng, active_users, user_cum, k)
+            for mid in _skewed_picks(rng, popular_movies, movie_cum, k):
+                if with_value:
+                    yield (mid, next(pick_users), float(rng.randint(1, 5)))
+                else:
+                    yield (mid, next(pick_users))
+        # (movie, user) is unique: repeated pairs are skipped
+        conn.executemany(
+            "INSERT OR IGNORE INTO ratings (movie_id, user_id, value) VALUES (?, ?, ?)",
+            pair_rows(ratings, True)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO favorites (movie_id, user_id) VALUES (?, ?)",
+            pair_rows(favorites, False)
+        )
+        
+        for _, _, sql in deferred:
+            conn.execute(sql)
+        cursor = conn.cursor()
+        # Generated reviews only go to the generated movies; existing ones keep their version
+        init_db.recompute_movie_stats(cursor, first_movie_id)
+        init_db.recompute_site_counters(cursor)
+        init_db.index_for_search(cursor, first_movie_id, first_review_id)
+        init_db.build_movie_cards(cursor, first_movie_id)
+    
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    counts = db.get_site_counters()
+    print(f"✅ Generated dataset in {time.perf_counter() - started:.1f}s: {counts}")
+    return counts
+
 if __name__ == "__main__":
-    seed_movies_and_reviews()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Seed the database")
+    parser.add_argument("--generate", action="store_true", help="append a synthetic dataset instead of the 50 real movies")
+    parser.add_argument("--init", action="store_true", help="recreate the schema first (drops existing data)")
+    parser.add_argument("--db", type=Path, help="database file (default: kinovzor.db)")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--movies", type=int, default=5_000)
+    parser.add_argument("--reviews", type=int, default=200_000)
+    parser.add_argument("--ratings", type=int, default=200_000)
+    parser.add_argument("--favorites", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed; same seed, same data")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for movie popularity")
+    args = parser.parse_args()
+    
+    if args.db:
+        init_db.DB_PATH = db.DB_PATH = args.db
+    if args.init:
+        init_db.init_db()
+    
+    if args.generate:
+        generate_dataset(
+            users=args.users,
+            movies=args.movies,
+            reviews=args.reviews,
+            ratings=args.ratings,
+            favorites=args.favorites,
+            seed=args.seed,
+            skew=args.skew,
+        )
+    else:
+        seed_movies_and_reviews()
@@ -0,0 +1,28 @@
+"""Shared fixtures: a throwaway database built by the migrations"""
+import pytest
+
+import init_db
+from app import db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point init_db and the pooled connections at an empty database
+    upgraded to the latest schema; yields its path"""
+    path = tmp_path / "kinovzor.db"
+    monkeypatch.setattr(init_db, "DB_PATH", path)
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.close_all()
+    init_db.upgrade_db()
+    yield path
+    db.close_all()
+
+
+@pytest.fixture
+def client(temp_db):
+    """TestClient on the temp database; the lifespan (bootstrap and seeding) is not run"""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
@@ -0,0 +1,55 @@
+"""Fingerprinted static assets, including nested files that share a name"""
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+FILES = {
+    "script.js": "console.log('top');",
+    "css/main.css": "body { color: red; }",
+    "theme/main.css": "body { color: blue; }",
+    "index.html": '<link href="/static/css/main.css"><link href="/static/theme/main.css">'
+                  '<script src="/static/script.js"></script>',
+}
+
+
+@pytest.fixture
+def assets(tmp_path):
+    for name, text in FILES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return StaticAssets(tmp_path)
+
+
+@pytest.fixture
+def client(assets):
+    return TestClient(Starlette(routes=[Mount("/static", assets)]))
+
+
+def test_nested_files_with_the_same_name(assets, client):
+    assert set(assets.urls) == {"script.js", "css/main.css", "theme/main.css"}
+    css, theme = assets.url_for("css/main.css"), assets.url_for("theme/main.css")
+    assert css.startswith("/static/css/main.") and theme.startswith("/static/theme/main.") and css != theme
+
+    for name in ("css/main.css", "theme/main.css", "script.js"):
+        fingerprinted = client.get(assets.url_for(name))
+        assert fingerprinted.text == FILES[name]
+        assert fingerprinted.headers["cache-control"] == IMMUTABLE
+        plain = client.get(f"/static/{name}")
+        assert plain.text == FILES[name]
+        assert plain.headers["cache-control"] == REVALIDATE
+
+
+def test_index_points_at_fingerprinted_urls(assets, client):
+    index = client.get("/static/index.html").text
+    for name in ("css/main.css", "theme/main.css", "script.js"):
+        assert f'"{assets.url_for(name)}"' in index
+        assert f'"/static/{name}"' not in index
+
+
+@pytest.mark.parametrize("path", ["/static/main.css", "/static/css/other.css", "/static/css", "/static/"])
+def test_unknown_paths_are_404(client, path):
+    assert client.get(path).status_code == 404
@@ -0,0 +1,65 @@
+"""Signed session tokens and the role checks built on them"""
+import pytest
+
+from app.auth import Principal, _b64encode, _sign, issue_token, verify_token
+
+USER = {"id": 7, "is_user": True}
+ADMIN = {"id": 1, "is_user": True, "is_admin": True}
+
+
+def _signed(payload: bytes) -> str:
+    encoded = _b64encode(payload)
+    return f"{encoded}.{_sign(encoded)}"
+
+
+def test_valid_token():
+    principal = verify_token(issue_token(ADMIN))
+    assert isinstance(principal, Principal)
+    assert principal.user_id == 1
+    assert principal.roles == ("user", "admin")
+    assert principal.is_admin and principal.is_moderator
+
+
+def test_expired_token():
+    assert verify_token(issue_token(USER, ttl=-1)) is None
+
+
+def test_tampered_token():
+    payload, _, signature = issue_token(USER).partition(".")
+    forged = _b64encode(b'{"sub":7,"roles":["admin"],"exp":9999999999}')
+    assert verify_token(f"{forged}.{signature}") is None
+    assert verify_token(f"{payload}.{signature[:-1]}A") is None
+    assert verify_token(payload) is None
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    ".",
+    "abc",
+    "a.b.c",
+    _signed(b"not json"),
+    _signed(b"\xff\xfe"),
+    _signed(b"[1, 2]"),
+    _signed(b'{"sub": 1}'),
+    _signed(b'{"sub": "x", "roles": [], "exp": 9999999999}'),
+])
+def test_malformed_token(token):
+    assert verify_token(token) is None
+
+
+@pytest.mark.parametrize("token", ["ф.x", "é", issue_token(USER) + "ф"])
+def test_non_ascii_token(token):
+    assert verify_token(token) is None
+
+
+@pytest.mark.parametrize("header", [b"Bearer \xd1\x84.x", b"Bearer \xc3\xa9"])
+def test_non_ascii_header_is_401(client, header):
+    response = client.get("/api/users/me", headers={"Authorization": header})
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("user, status", [(None, 401), (USER, 403), ({**USER, "is_moderator": True}, 403),
+                                          (ADMIN, 200)])
+def test_admin_only_route(client, user, status):
+    headers = {"Authorization": f"Bearer {issue_token(user)}"} if user else {}
+    assert client.get("/api/cache/stats", headers=headers).status_code == status
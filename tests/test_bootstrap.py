@@ -0,0 +1,111 @@
+"""Versioned schema bootstrap (PRAGMA user_version) and the seed decision"""
+import json
+import sqlite3
+
+import pytest
+
+import init_db
+import seed_db
+from app import bootstrap, db, passwords
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    """A database path with nothing at it yet"""
+    path = tmp_path / "kinovzor.db"
+    monkeypatch.setattr(init_db, "DB_PATH", path)
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.close_all()
+    yield path
+    db.close_all()
+
+
+def _version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("empty_file", [False, True])
+def test_upgrade_creates_then_does_nothing(path, empty_file):
+    if empty_file:
+        path.touch()
+    assert init_db.upgrade_db() == 0
+    assert _version(path) == init_db.SCHEMA_VERSION
+    assert init_db.upgrade_db() == init_db.SCHEMA_VERSION
+    assert init_db.needs_seed()
+
+
+def test_upgrade_backfills_an_unversioned_database(path):
+    """A database from before the schema steps: tables and rows, no aggregates"""
+    conn = sqlite3.connect(path)
+    init_db._create_tables(conn.cursor(), set())
+    conn.execute("INSERT INTO users (email, password, username) VALUES ('user@example.com', 'hash', 'user')")
+    conn.execute("INSERT INTO movies (title, description, genre, year) VALUES ('Фильм', 'Описание', 'Драма', 2000)")
+    conn.executemany("INSERT INTO reviews (movie_id, user_id, text, rating, approved) VALUES (1, 1, ?, ?, ?)",
+                     [("Хорошо", 5, 1), ("Плохо", 2, 0)])
+    conn.commit()
+    conn.close()
+
+    assert init_db.upgrade_db() == 0
+    assert _version(path) == init_db.SCHEMA_VERSION
+    movie = db.get_movie_by_id(1)
+    assert (movie["review_count"], movie["approved_review_count"], movie["rating_count"], movie["rating_sum"]) \
+        == (2, 1, 2, 7)
+    counters = db.get_site_counters()
+    assert (counters["movies"], counters["users"], counters["reviews"], counters["approved_reviews"]) == (1, 1, 2, 1)
+    assert [json.loads(card)["id"] for card, _ in db.get_movie_cards_page()] == [1]
+    # Existing data means it is not seeded over
+    assert not init_db.needs_seed()
+
+
+def test_newer_schema_is_refused(path):
+    init_db.upgrade_db()
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA user_version = {init_db.SCHEMA_VERSION + 1}")
+    conn.close()
+    with pytest.raises(RuntimeError):
+        init_db.upgrade_db()
+
+
+def test_emptied_database_is_not_seeded_again(path):
+    init_db.upgrade_db()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("INSERT INTO app_state (key, value) VALUES (?, CURRENT_TIMESTAMP)", (init_db.SEED_MARKER,))
+    conn.close()
+    assert not init_db.needs_seed()
+
+
+@pytest.fixture
+def cheap_kdf(monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_SCRYPT_N", 1024)
+    monkeypatch.setattr(passwords, "PASSWORD_PBKDF2_ITERATIONS", 1000)
+
+
+def test_bootstrap_seeds_once(path, cheap_kdf):
+    bootstrap.bootstrap_db()
+    counters = db.get_site_counters()
+    assert counters["movies"] == 50
+    bootstrap.bootstrap_db()
+    assert db.get_site_counters() == counters
+
+
+def test_interrupted_seed_is_retried(path, cheap_kdf, monkeypatch):
+    def interrupted():
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO movies (title, description, genre, year) VALUES ('Фильм', '', 'Драма', 2000)")
+            raise RuntimeError("interrupted")
+
+    with monkeypatch.context() as m:
+        m.setattr(seed_db, "seed_movies_and_reviews", interrupted)
+        with pytest.raises(RuntimeError):
+            bootstrap.bootstrap_db()
+    # The schema is committed; the seed and its marker are not
+    assert _version(path) == init_db.SCHEMA_VERSION
+    assert init_db.needs_seed()
+    bootstrap.bootstrap_db()
+    assert db.get_site_counters()["movies"] == 50
+    assert not init_db.needs_seed()
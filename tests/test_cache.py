@@ -0,0 +1,102 @@
+"""Cached reads and conditional GETs: a write gives a new body and a new ETag.
+
+Each case reads a resource through the app, revalidates it, writes through
+the app and reads it again. The last case writes behind the cache's back,
+as another worker would, and relies on the version in the cache key alone.
+"""
+import sqlite3
+
+import pytest
+
+from app import db
+from app.auth import issue_token
+
+RESOURCES = ["/api/movies/{id}", "/api/movies/{id}/reviews", "/api/movies/{id}/rating-stats"]
+
+
+@pytest.fixture
+def movie(temp_db):
+    return db.create_movie("Фильм", "Описание", "Драма", 2000)
+
+
+@pytest.fixture
+def user():
+    return {"Authorization": f"Bearer {issue_token(db.create_user('user@example.com', 'hash', 'user'))}"}
+
+
+@pytest.fixture
+def moderator():
+    user = db.create_user("moderator@example.com", "hash", "moderator", is_moderator=True)
+    return {"Authorization": f"Bearer {issue_token(user)}"}
+
+
+def _read(client, path, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(path, headers=headers)
+
+
+def _review(client, movie, user, moderator):
+    """Post a review and approve it; both writes change all three resources"""
+    review = client.post(f"/api/movies/{movie['id']}/reviews", json={"text": "Рецензия", "rating": 4},
+                         headers=user)
+    assert review.status_code == 200
+    assert client.put(f"/api/movies/reviews/{review.json()['id']}/approve", headers=moderator).status_code == 200
+
+
+@pytest.mark.parametrize("resource", RESOURCES)
+def test_write_changes_body_and_etag(client, movie, user, moderator, resource):
+    path = resource.format(id=movie["id"])
+    first = _read(client, path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    # Served from the cache, with the same validators
+    hits = db.cache.hits
+    again = _read(client, path)
+    assert again.json() == first.json() and again.headers["etag"] == etag
+    assert db.cache.hits > hits
+
+    assert _read(client, path, etag).status_code == 304
+    assert _read(client, path, f'W/"other", {etag[2:]}').status_code == 304  # weak comparison, lists
+
+    _review(client, movie, user, moderator)
+
+    second = _read(client, path, etag)
+    assert second.status_code == 200
+    assert second.headers["etag"] != etag
+    assert second.json() != first.json()
+    assert _read(client, path, second.headers["etag"]).status_code == 304
+
+
+def test_catalog_write_changes_body_and_etag(client, movie):
+    first = _read(client, "/api/movies/")
+    etag = first.headers["etag"]
+    assert _read(client, "/api/movies/", etag).status_code == 304
+
+    db.create_movie("Другой фильм", "Описание", "Комедия", 2001)
+
+    second = _read(client, "/api/movies/", etag)
+    assert second.status_code == 200 and second.headers["etag"] != etag
+    assert second.json() != first.json()
+
+
+@pytest.mark.parametrize("resource", RESOURCES)
+def test_write_by_another_process(client, temp_db, movie, resource):
+    """The write does not invalidate this process's cache; the bumped
+    version keys a fresh read, so the body matches its new ETag"""
+    path = resource.format(id=movie["id"])
+    first = _read(client, path)
+    user = db.create_user("user@example.com", "hash", "user")
+    conn = sqlite3.connect(temp_db)
+    try:
+        with conn:
+            conn.execute("INSERT INTO reviews (movie_id, user_id, text, rating, approved) VALUES (?, ?, ?, ?, 1)",
+                         (movie["id"], user["id"], "Рецензия", 4))
+    finally:
+        conn.close()
+
+    second = _read(client, path, first.headers["etag"])
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json() != first.json()
@@ -0,0 +1,61 @@
+"""Catalog pages served from the pre-encoded movie cards"""
+import asyncio
+import json
+
+import pytest
+
+from app import db
+from app.movies.dao import MovieDAO
+from init_db import MOVIE_CARD_FIELDS
+
+
+@pytest.fixture
+def catalog(temp_db):
+    """Movies with repeated titles, years and average ratings; unrated ones average 0"""
+    user = db.create_user("user@example.com", "hash", "user")
+    db.create_movies_bulk([(f"Фильм {i % 3}", "Описание", ("Драма", "Комедия")[i % 2], 2000 + i % 4, None)
+                           for i in range(9)])
+    db.create_reviews_bulk([(movie_id, user["id"], "Рецензия", rating, 1)
+                            for movie_id, rating in [(1, 5), (2, 3), (3, 5), (3, 1), (4, 3), (6, 4), (7, 2)]])
+
+
+def _card_fields(movie):
+    return {field: movie[field] for field in MOVIE_CARD_FIELDS}
+
+
+def _walk(client, **params):
+    """Every catalog item, page by page through next_cursor"""
+    items, cursor = [], None
+    while True:
+        page = client.get("/api/movies/", params={**params, "limit": 2, "cursor": cursor}).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return items
+
+
+@pytest.mark.parametrize("genre", [None, "Драма"])
+@pytest.mark.parametrize("sort", list(db.MOVIE_SORTS))
+def test_cards_match_the_rows(client, catalog, sort, genre):
+    params = {"sort": sort, **({"genre": genre} if genre else {})}
+    cards = _walk(client, **params)
+    rows = asyncio.run(MovieDAO.find_page(genre=genre, sort=sort, limit=100))["items"]
+    assert cards == [_card_fields(movie) for movie in rows]
+    assert len(cards) == (5 if genre else 9)
+    assert len({card["id"] for card in cards}) == len(cards)
+
+
+def test_cards_follow_writes(client, catalog):
+    user = db.get_user_by_id(1)
+    review = db.create_review(9, user["id"], "Рецензия", 4)
+    db.approve_review(review["id"])
+    db.create_or_update_rating(8, user["id"], 2)
+
+    cards = {card["id"]: card for card in _walk(client)}
+    assert cards == {movie_id: _card_fields(db.get_movie_by_id(movie_id)) for movie_id in range(1, 10)}
+    assert (cards[9]["approved_review_count"], cards[9]["rating_avg"]) == (1, 4.0)
+
+    db.delete_review(review["id"])
+    cards = {card["id"]: card for card in _walk(client)}
+    assert (cards[9]["review_count"], cards[9]["rating_count"], cards[9]["rating_avg"]) == (0, 0, 0)
+    assert cards[9] == _card_fields(db.get_movie_by_id(9))
@@ -0,0 +1,76 @@
+"""Parallel rating/favorite/review requests for one (movie, user) through the app.
+
+The upserts rely on the (movie_id, user_id) unique indexes instead of a
+read-then-write, so any interleaving must leave one row per pair, and the
+trigger-maintained counters must match what a recompute would set.
+"""
+import asyncio
+import sqlite3
+
+import httpx
+
+import init_db
+from app import db
+from app.auth import issue_token
+from app.main import app
+
+PARALLEL = 16
+AGGREGATES = "review_count, approved_review_count, rating_count, rating_sum"
+COUNTERS = "movies, reviews, approved_reviews, ratings, users, favorites"
+
+
+async def _fire(movie_id, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    # The lifespan would bootstrap (and seed) the database; the fixture built it
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        requests = []
+        for i in range(PARALLEL):
+            requests.append(client.post(f"/api/movies/{movie_id}/ratings", json={"value": i % 5 + 1},
+                                        headers=headers))
+            requests.append(client.post(f"/api/movies/{movie_id}/favorites", headers=headers))
+            requests.append(client.post(f"/api/movies/{movie_id}/reviews", json={"text": f"Рецензия {i}",
+                                                                                "rating": i % 5 + 1},
+                                        headers=headers))
+        return await asyncio.gather(*requests)
+
+
+def _recomputed(conn):
+    """(counters, aggregates) as maintained, and as init_db's repair would set them"""
+    def read():
+        return (conn.execute(f"SELECT {COUNTERS} FROM site_counters WHERE id = 1").fetchone(),
+                conn.execute(f"SELECT id, {AGGREGATES} FROM movies ORDER BY id").fetchall())
+
+    maintained = read()
+    conn.execute("BEGIN")
+    cursor = conn.cursor()
+    init_db.recompute_movie_stats(cursor)
+    init_db.recompute_site_counters(cursor)
+    recomputed = read()
+    conn.rollback()
+    return maintained, recomputed
+
+
+def test_parallel_writes_leave_one_row_per_pair(temp_db):
+    user = db.create_user("user@example.com", "hash", "user")
+    movie = db.create_movie("Фильм", "Описание", "Драма", 2000)
+
+    responses = asyncio.run(_fire(movie["id"], issue_token(user)))
+
+    ratings, favorites, reviews = responses[0::3], responses[1::3], responses[2::3]
+    assert all(r.status_code == 200 for r in ratings + reviews)
+    # Exactly one request added the favorite; the others saw the unique index
+    assert sorted(r.status_code for r in favorites) == [200] + [400] * (PARALLEL - 1)
+
+    conn = sqlite3.connect(temp_db)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM ratings").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM favorites").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == PARALLEL
+        assert len({r.json()["id"] for r in ratings}) == 1
+
+        maintained, recomputed = _recomputed(conn)
+        assert maintained == recomputed
+        assert maintained[0] == (1, PARALLEL, 0, 1, 1, 1)
+        assert maintained[1] == [(movie["id"], PARALLEL, 0, PARALLEL, sum(i % 5 + 1 for i in range(PARALLEL)))]
+    finally:
+        conn.close()
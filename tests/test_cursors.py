@@ -0,0 +1,160 @@
+"""Malformed pagination cursors are a 400, never a 500"""
+import base64
+
+import pytest
+
+from app import db
+from app.auth import issue_token
+from app.pagination import INT64_MAX, encode_cursor
+
+NOT_BASE64 = ["!!!", "%%%", "a", "ф"]
+
+
+def _raw(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+# Well-formed tokens whose payload is not a cursor at all
+NOT_A_CURSOR = [_raw(b"not json"), _raw(b"\xff\xfe"), _raw(b"[1, 2]"), _raw(b"null"), encode_cursor({})]
+
+
+@pytest.fixture
+def catalog(temp_db):
+    db.create_movies_bulk([(f"Фильм {i}", "Описание", "Драма", 1990 + i, None) for i in range(5)])
+
+
+# ========== CATALOG ==========
+
+CATALOG_KEYS = {"popular": [3], "title": ["Фильм 2", 3], "year": [1992, 3], "rating": [0, 3]}
+
+
+@pytest.mark.parametrize("sort, key", CATALOG_KEYS.items())
+def test_catalog_valid_cursor(client, catalog, sort, key):
+    response = client.get("/api/movies/", params={"sort": sort, "cursor": encode_cursor({"sort": sort, "key": key})})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("cursor", NOT_BASE64 + NOT_A_CURSOR + [
+    # wrong key shape
+    encode_cursor({"sort": "popular", "key": 3}),
+    encode_cursor({"sort": "popular", "key": []}),
+    encode_cursor({"sort": "popular", "key": [3, 4]}),
+    encode_cursor({"sort": "popular", "key": [{"a": 1}]}),
+    encode_cursor({"sort": "popular", "key": [[1]]}),
+    encode_cursor({"sort": "title", "key": [{"a": 1}, 3]}),
+    # non-int id
+    encode_cursor({"sort": "popular", "key": ["x"]}),
+    encode_cursor({"sort": "popular", "key": [1.5]}),
+    encode_cursor({"sort": "popular", "key": [True]}),
+    encode_cursor({"sort": "year", "key": [1992, "3"]}),
+    encode_cursor({"sort": "title", "key": ["Фильм 2", None]}),
+    # out of SQLite's integer range
+    encode_cursor({"sort": "popular", "key": [INT64_MAX + 1]}),
+    encode_cursor({"sort": "year", "key": [-(10 ** 20), 3]}),
+    # cursor of another sort order
+    encode_cursor({"sort": "title", "key": [3]}),
+])
+def test_catalog_bad_cursor(client, catalog, cursor):
+    assert client.get("/api/movies/", params={"cursor": cursor}).status_code == 400
+
+
+@pytest.mark.parametrize("offset, status", [(10 ** 20, 422), (-1, 422), (10_001, 422), (10_000, 200), (2, 200)])
+def test_catalog_offset_bounds(client, catalog, offset, status):
+    assert client.get("/api/movies/", params={"offset": offset}).status_code == status
+
+
+# ========== SEARCH ==========
+
+@pytest.mark.parametrize("offset", [0, 3, INT64_MAX])
+def test_search_valid_cursor(client, catalog, offset):
+    cursor = encode_cursor({"q": "фильм", "offset": offset})
+    assert client.get("/api/movies/search", params={"q": "фильм", "cursor": cursor}).status_code == 200
+
+
+@pytest.mark.parametrize("cursor", NOT_BASE64 + NOT_A_CURSOR + [
+    # wrong offset shape
+    encode_cursor({"q": "фильм", "offset": [3]}),
+    encode_cursor({"q": "фильм", "offset": {"a": 1}}),
+    encode_cursor({"q": "фильм"}),
+    # non-int offset
+    encode_cursor({"q": "фильм", "offset": "3"}),
+    encode_cursor({"q": "фильм", "offset": 1.5}),
+    encode_cursor({"q": "фильм", "offset": True}),
+    # out of range
+    encode_cursor({"q": "фильм", "offset": -1}),
+    encode_cursor({"q": "фильм", "offset": 10 ** 20}),
+    encode_cursor({"q": "фильм", "offset": INT64_MAX + 1}),
+    # cursor of another query
+    encode_cursor({"q": "другой", "offset": 3}),
+])
+def test_search_bad_cursor(client, catalog, cursor):
+    assert client.get("/api/movies/search", params={"q": "фильм", "cursor": cursor}).status_code == 400
+
+
+# ========== REVIEWS ==========
+
+REVIEW_KEY = ["2024-01-01 00:00:00", 2]
+
+BAD_REVIEW_KEYS = [
+    # wrong key shape
+    "2024-01-01 00:00:00",
+    [],
+    ["2024-01-01 00:00:00"],
+    ["2024-01-01 00:00:00", 2, 3],
+    [{"x": 1}, 2],
+    [["2024-01-01"], 2],
+    # non-int id
+    ["2024-01-01 00:00:00", "2"],
+    ["2024-01-01 00:00:00", 2.5],
+    ["2024-01-01 00:00:00", None],
+    ["2024-01-01 00:00:00", True],
+    [20240101, 2],
+    # out of SQLite's integer range
+    ["2024-01-01 00:00:00", INT64_MAX + 1],
+    ["2024-01-01 00:00:00", -(10 ** 20)],
+]
+
+
+@pytest.fixture
+def reviews(catalog):
+    user = db.create_user("user@example.com", "hash", "user")
+    db.create_reviews_bulk([(1, user["id"], f"Рецензия {i}", 4, 1) for i in range(3)])
+
+
+def test_reviews_valid_cursor(client, reviews):
+    cursor = encode_cursor({"movie": 1, "approved_only": True, "key": REVIEW_KEY})
+    assert client.get("/api/movies/1/reviews", params={"cursor": cursor}).status_code == 200
+
+
+@pytest.mark.parametrize("cursor", NOT_BASE64 + NOT_A_CURSOR + [
+    *[encode_cursor({"movie": 1, "approved_only": True, "key": key}) for key in BAD_REVIEW_KEYS],
+    # cursor of another movie or filter
+    encode_cursor({"movie": 2, "approved_only": True, "key": REVIEW_KEY}),
+    encode_cursor({"movie": 1, "approved_only": False, "key": REVIEW_KEY}),
+])
+def test_reviews_bad_cursor(client, reviews, cursor):
+    assert client.get("/api/movies/1/reviews", params={"cursor": cursor}).status_code == 400
+
+
+# ========== MODERATION QUEUE ==========
+
+@pytest.fixture
+def moderator(reviews):
+    user = db.create_user("moderator@example.com", "hash", "moderator", is_moderator=True)
+    return {"Authorization": f"Bearer {issue_token(user)}"}
+
+
+def test_pending_valid_cursor(client, moderator):
+    cursor = encode_cursor({"pending": True, "key": REVIEW_KEY})
+    assert client.get("/api/movies/reviews/pending", params={"cursor": cursor}, headers=moderator).status_code == 200
+
+
+@pytest.mark.parametrize("cursor", NOT_BASE64 + NOT_A_CURSOR + [
+    *[encode_cursor({"pending": True, "key": key}) for key in BAD_REVIEW_KEYS],
+    # cursor of a movie's review list
+    encode_cursor({"movie": 1, "approved_only": False, "key": REVIEW_KEY}),
+    encode_cursor({"pending": 1, "key": REVIEW_KEY}),
+])
+def test_pending_bad_cursor(client, moderator, cursor):
+    response = client.get("/api/movies/reviews/pending", params={"cursor": cursor}, headers=moderator)
+    assert response.status_code == 400
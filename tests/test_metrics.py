@@ -0,0 +1,111 @@
+"""Statement counting for the request metrics and the SQL profiler; the Prometheus registry"""
+import asyncio
+
+import pytest
+
+from app import db, metrics, profiler
+from app.config import METRICS_ENABLED
+
+
+def _measure(stats, job):
+    async def run():
+        token = metrics._current.set(stats)
+        try:
+            return await db.run(job)
+        finally:
+            metrics._current.reset(token)
+
+    asyncio.run(run())
+    return stats
+
+
+@pytest.fixture
+def movie(temp_db):
+    user = db.create_user("user@example.com", "hash", "user")
+    movie = db.create_movie("Фильм", "Описание", "Драма", 2000)
+    return movie["id"], user["id"]
+
+
+@pytest.mark.parametrize("stats_class", [metrics.QueryStats, profiler.Profile])
+def test_repeated_statements_all_count(movie, stats_class):
+    movie_id, user_id = movie
+
+    def n_plus_one():
+        for _ in range(12):
+            db.is_favorite(movie_id, user_id)
+
+    stats = _measure(stats_class(), n_plus_one)
+    assert stats.queries == 12
+    if isinstance(stats, profiler.Profile):
+        assert len(stats.statements) == 12
+
+
+def test_repeated_statements_reach_the_threshold(movie, caplog):
+    movie_id, user_id = movie
+    stats = _measure(profiler.Profile(), lambda: [db.is_favorite(movie_id, user_id) for _ in range(12)])
+    profiler.analyze(stats, "GET", "/test")
+    assert any('"sql_repeated"' in record.getMessage() for record in caplog.records)
+
+
+def test_trigger_programs_count_once(movie):
+    movie_id, user_id = movie
+    # The INSERT fires the aggregate, counter, search and card triggers
+    stats = _measure(profiler.Profile(), lambda: db.create_review(movie_id, user_id, "Текст", 5))
+    inserts = [sql for sql, _ in stats.statements if sql.startswith("INSERT INTO reviews")]
+    assert len(inserts) == 1
+    assert stats.queries == len(stats.statements)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    fresh = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", fresh)
+    return fresh
+
+
+@pytest.fixture
+def metered(movie, registry):
+    """A small app behind MetricsMiddleware"""
+    from fastapi import FastAPI, HTTPException
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+
+    @app.get("/movies/{movie_id}")
+    async def get_movie(movie_id: int):
+        if not await db.run(db.get_movie_version, movie_id):
+            raise HTTPException(status_code=404)
+        return await db.run(lambda: [db.is_favorite(movie_id, user_id) for user_id in (1, 2, 3)])
+
+    app.add_middleware(metrics.MetricsMiddleware)
+    return TestClient(app)
+
+
+def test_requests_are_recorded_per_route(metered, registry, movie):
+    movie_id, _ = movie
+    for path in (f"/movies/{movie_id}", f"/movies/{movie_id}", "/movies/999", "/nowhere"):
+        metered.get(path)
+    text = registry.render()
+    route = 'method="GET",route="/movies/{movie_id}"'
+    assert f'kinovzor_http_requests_total{{{route},status="200"}} 2' in text
+    assert f'kinovzor_http_requests_total{{{route},status="404"}} 1' in text
+    assert 'kinovzor_http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert f'kinovzor_http_request_duration_seconds_bucket{{{route},le="+Inf"}} 3' in text
+    assert f"kinovzor_http_request_duration_seconds_count{{{route}}} 3" in text
+    # Two found movies at 1 + 3 statements, one missing at 1
+    assert f"kinovzor_db_queries_total{{{route}}} 9" in text
+    assert "kinovzor_http_requests_in_progress 0" in text
+    assert "# TYPE kinovzor_cache_hits_total counter" in text
+
+
+def test_label_values_are_escaped(registry):
+    registry.observe("GET", 'a"b\\c', 200, 0.01, metrics.QueryStats())
+    assert 'route="a\\"b\\\\c"' in registry.render()
+
+
+@pytest.mark.skipif(not METRICS_ENABLED, reason="METRICS_ENABLED is off")
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    assert "# TYPE kinovzor_http_requests_total counter" in response.text
@@ -0,0 +1,76 @@
+"""The moderation queue and bulk approve/delete in one transaction"""
+import pytest
+
+from app import db
+from app.auth import issue_token
+from app.movies import router
+
+
+@pytest.fixture
+def queue(temp_db):
+    """Two movies with five unapproved reviews and one approved; yields the review ids"""
+    user = db.create_user("user@example.com", "hash", "user")
+    db.create_movies_bulk([("Фильм", "Описание", "Драма", 2000, None), ("Другой", "Описание", "Драма", 2001, None)])
+    db.create_reviews_bulk([(i % 2 + 1, user["id"], f"Рецензия {i}", 4, 0) for i in range(5)]
+                           + [(1, user["id"], "Одобрена", 5, 1)])
+    return [1, 2, 3, 4, 5]
+
+
+@pytest.fixture
+def moderator():
+    user = db.create_user("moderator@example.com", "hash", "moderator", is_moderator=True)
+    return {"Authorization": f"Bearer {issue_token(user)}"}
+
+
+def _pending(client, moderator, limit):
+    ids, cursor = [], None
+    while True:
+        page = client.get("/api/movies/reviews/pending", params={"limit": limit, "cursor": cursor},
+                          headers=moderator).json()
+        ids += [review["id"] for review in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 50])
+def test_pending_pages_cover_the_queue_once(client, queue, moderator, limit):
+    assert _pending(client, moderator, limit) == queue
+
+
+def test_moderate(client, queue, moderator):
+    # Cached before the batch, so the batch has to invalidate it
+    assert len(client.get("/api/movies/1/reviews").json()["items"]) == 1
+
+    response = client.post("/api/movies/reviews/moderate", json={"approve": [1, 2, 6, 99], "delete": [3, 98]},
+                           headers=moderator)
+    assert response.status_code == 200
+    assert response.json() == {"approved": [1, 2], "deleted": [3], "skipped": [6, 98, 99]}
+
+    assert _pending(client, moderator, 50) == [4, 5]
+    assert {r["id"] for r in client.get("/api/movies/1/reviews").json()["items"]} == {1, 6}
+    assert db.get_movie_by_id(1)["approved_review_count"] == 2 and db.get_movie_by_id(1)["review_count"] == 3
+    assert db.get_movie_by_id(2)["approved_review_count"] == 1 and db.get_movie_by_id(2)["review_count"] == 2
+    counters = db.get_site_counters()
+    assert (counters["reviews"], counters["approved_reviews"]) == (5, 3)
+
+
+def test_moderate_rejects_a_review_in_both_lists(client, queue, moderator):
+    response = client.post("/api/movies/reviews/moderate", json={"approve": [1, 2], "delete": [2]},
+                           headers=moderator)
+    assert response.status_code == 400
+    assert _pending(client, moderator, 50) == queue
+
+
+def test_moderate_rejects_oversized_batches(client, queue, moderator, monkeypatch):
+    monkeypatch.setattr(router, "MAX_BULK_ROWS", 2)
+    response = client.post("/api/movies/reviews/moderate", json={"approve": [1, 2], "delete": [3]},
+                           headers=moderator)
+    assert response.status_code == 413
+
+
+def test_moderation_needs_a_moderator(client, queue):
+    headers = {"Authorization": f"Bearer {issue_token(db.get_user_by_id(1))}"}
+    assert client.get("/api/movies/reviews/pending", headers=headers).status_code == 403
+    assert client.post("/api/movies/reviews/moderate", json={"approve": [1]}, headers=headers).status_code == 403
+    assert client.post("/api/movies/reviews/moderate", json={"approve": [1]}).status_code == 401
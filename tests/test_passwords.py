@@ -0,0 +1,109 @@
+"""Password hashing, login/registration and load shedding on the hashing pool"""
+import hashlib
+import threading
+
+import pytest
+
+from app import db, passwords
+
+
+@pytest.fixture(autouse=True)
+def cheap_kdf(monkeypatch):
+    """Low work factors; the formats and code paths are the same"""
+    monkeypatch.setattr(passwords, "PASSWORD_SCRYPT_N", 1024)
+    monkeypatch.setattr(passwords, "PASSWORD_PBKDF2_ITERATIONS", 1000)
+
+
+@pytest.fixture(params=["scrypt", "pbkdf2_sha256"])
+def scheme(request, monkeypatch):
+    if request.param == "scrypt" and not hasattr(hashlib, "scrypt"):
+        pytest.skip("hashlib.scrypt is not available")
+    monkeypatch.setattr(passwords, "SCHEME", request.param)
+    return request.param
+
+
+def test_hash_and_verify(scheme):
+    stored = passwords.hash_password("секрет")
+    assert stored.startswith(f"{scheme}$")
+    assert stored != passwords.hash_password("секрет")  # salted
+    assert passwords.verify_password("секрет", stored)
+    assert not passwords.verify_password("секрет!", stored)
+    assert not passwords.needs_rehash(stored)
+
+
+def test_raised_work_factor_rehashes(scheme, monkeypatch):
+    stored = passwords.hash_password("секрет")
+    monkeypatch.setattr(passwords, "PASSWORD_SCRYPT_N", 2048)
+    monkeypatch.setattr(passwords, "PASSWORD_PBKDF2_ITERATIONS", 2000)
+    ok, new_hash = passwords.verify_and_update("секрет", stored)
+    assert ok and new_hash and not passwords.needs_rehash(new_hash)
+
+
+@pytest.mark.parametrize("stored", [hashlib.sha256(b"secret").hexdigest(), "secret"])
+def test_legacy_hashes_verify_and_rehash(stored):
+    ok, new_hash = passwords.verify_and_update("secret", stored)
+    assert ok and new_hash.startswith(f"{passwords.SCHEME}$")
+    assert passwords.verify_password("secret", new_hash)
+    assert passwords.verify_and_update("wrong", stored) == (False, None)
+
+
+@pytest.mark.parametrize("stored", ["scrypt$x$8$1$AA==$AA==", "pbkdf2_sha256$1000$not base64$AA==", "scrypt$1"])
+def test_malformed_hash_does_not_verify(stored):
+    assert not passwords.verify_password("secret", stored)
+
+
+@pytest.fixture
+def legacy_user(temp_db):
+    return db.create_user("user@example.com", hashlib.sha256(b"secret").hexdigest(), "user")
+
+
+def test_login_rehashes_legacy_hash(client, legacy_user):
+    response = client.post("/api/users/login", json={"username": "user", "password": "secret"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["token"] and "password" not in body
+    stored = db.get_user_by_username("user")["password"]
+    assert stored.startswith(f"{passwords.SCHEME}$") and passwords.verify_password("secret", stored)
+    # The new hash works for the next login
+    assert client.post("/api/users/login", json={"username": "user", "password": "secret"}).status_code == 200
+
+
+def test_login_wrong_password(client, legacy_user):
+    response = client.post("/api/users/login", json={"username": "user", "password": "wrong"})
+    assert response.status_code == 401
+    assert db.get_user_by_username("user")["password"] == legacy_user["password"]
+
+
+def test_login_unknown_user_still_runs_the_kdf(client, temp_db, monkeypatch):
+    calls = []
+    verify_unknown = passwords.verify_unknown
+
+    def spy(password):
+        calls.append(password)
+        return verify_unknown(password)
+
+    monkeypatch.setattr(passwords, "verify_unknown", spy)
+    response = client.post("/api/users/login", json={"username": "nobody", "password": "secret"})
+    assert response.status_code == 401
+    assert calls == ["secret"]
+
+
+def test_register_stores_a_hash(client, temp_db):
+    data = {"email": "new@example.com", "password": "secret", "username": "new"}
+    response = client.post("/api/users/register", json=data)
+    assert response.status_code == 200 and response.json()["token"]
+    stored = db.get_user_by_email("new@example.com")["password"]
+    assert stored != "secret" and passwords.verify_password("secret", stored)
+    assert client.post("/api/users/register", json=data).status_code == 400
+
+
+@pytest.mark.parametrize("path, data", [
+    ("/api/users/login", {"username": "user", "password": "secret"}),
+    ("/api/users/register", {"email": "new@example.com", "password": "secret", "username": "new"}),
+])
+def test_full_pool_sheds_with_503(client, legacy_user, monkeypatch, path, data):
+    monkeypatch.setattr(passwords, "_slots", threading.BoundedSemaphore(1))
+    passwords._slots.acquire()
+    response = client.post(path, json=data)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
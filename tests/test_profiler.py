@@ -0,0 +1,49 @@
+"""Who gets a per-request SQL profile"""
+import pytest
+
+from app import profiler
+from app.auth import issue_token
+
+ADMIN = issue_token({"id": 1, "is_user": True, "is_admin": True})
+USER = issue_token({"id": 2, "is_user": True})
+
+
+@pytest.fixture
+def opt_in(monkeypatch):
+    monkeypatch.setattr(profiler, "SQL_PROFILE_OPT_IN", True)
+    monkeypatch.setattr(profiler, "SQL_PROFILE_SAMPLE_RATE", 0.0)
+
+
+def _scope(token=None, header=None, query=b""):
+    headers = []
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    if header is not None:
+        headers.append((b"x-sql-profile", header))
+    return {"type": "http", "headers": headers, "query_string": query}
+
+
+@pytest.mark.parametrize("scope, expected", [
+    (_scope(ADMIN, header=b"1"), True),
+    (_scope(ADMIN, query=b"sql_profile=1"), True),
+    (_scope(ADMIN, query=b"q=x&sql_profile=1"), True),
+    (_scope(ADMIN, header=b"0", query=b"sql_profile=1"), False),
+    (_scope(ADMIN, query=b"xsql_profile=10"), False),
+    (_scope(ADMIN, query=b"sql_profile=10"), False),
+    (_scope(ADMIN), False),
+    (_scope(header=b"1"), False),
+    (_scope(USER, header=b"1"), False),
+    (_scope("not-a-token", query=b"sql_profile=1"), False),
+])
+def test_opt_in_needs_an_admin(opt_in, scope, expected):
+    assert profiler.wanted(scope) is expected
+
+
+@pytest.mark.parametrize("token, profiled", [(None, False), (USER, False), (ADMIN, True)])
+def test_profile_headers_through_the_app(opt_in, client, token, profiled):
+    headers = {"X-SQL-Profile": "1"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    response = client.get("/api/movies/stats", headers=headers)
+    assert response.status_code == 200
+    assert ("x-query-count" in response.headers) is profiled
@@ -0,0 +1,220 @@
+"""EXPLAIN QUERY PLAN for every statement the SQL helpers and the movie DAOs run.
+
+Each case runs one call against a fresh migrated database with statement
+tracing on, then asks SQLite for the plan of every traced statement. A
+``SCAN <table>`` line, a pass over the whole table or over a non-covering
+index of it, fails the case; scans of a covering index are fine.
+
+The first page of an unfiltered listing has nothing to search for: it walks
+the ordering index and stops at LIMIT. Those cases are marked
+``first_page`` and only have to avoid sorting, i.e. the walk must already
+produce rows in the requested order.
+"""
+import asyncio
+import inspect
+import re
+import sqlite3
+
+import pytest
+
+from app import db
+from app.movies.dao import FavoriteDAO, MovieDAO, RatingDAO, ReviewDAO
+from app.pagination import encode_cursor
+from app.search import match_expression, query_terms
+
+DAOS = (MovieDAO, ReviewDAO, RatingDAO, FavoriteDAO)
+
+# Sort keys of some row, for keyset-continued pages
+SORT_KEYS = {"popular": [2], "title": ["Б", 2], "year": [2000, 2], "rating": [4.0, 2]}
+REVIEW_KEY = ["2024-01-01 00:00:00", 2]
+MATCH = match_expression(query_terms("фильм"))
+
+
+def _case(name, *args, first_page=False, **kwargs):
+    return pytest.param(name, args, kwargs, first_page, id=f"{name}{list(args) or ''}{kwargs or ''}")
+
+
+HELPER_CALLS = [
+    _case("get_site_counters"),
+    _case("get_catalog_version"),
+    _case("get_user_by_email", "user@example.com"),
+    _case("get_user_by_username", "user"),
+    _case("get_user_by_id", 1),
+    _case("create_user", "other@example.com", "hash", "other"),
+    _case("update_user_password", 1, "hash"),
+    *[_case("get_movies_page", sort=sort, first_page=True) for sort in db.MOVIE_SORTS],
+    *[_case("get_movies_page", genre="Драма", sort=sort) for sort in db.MOVIE_SORTS],
+    *[_case("get_movies_page", sort=sort, after=key) for sort, key in SORT_KEYS.items()],
+    *[_case("get_movie_cards_page", sort=sort, first_page=True) for sort in db.MOVIE_SORTS],
+    *[_case("get_movie_cards_page", genre="Драма", sort=sort, after=key) for sort, key in SORT_KEYS.items()],
+    _case("get_genres"),
+    _case("get_movie_by_id", 1),
+    _case("get_movie_version", 1),
+    _case("create_movie", "Фильм", "Описание", "Драма", 2001),
+    _case("create_movies_bulk", [("Фильм", "Описание", "Драма", 2001, None)]),
+    _case("search_movies", MATCH),
+    _case("search_movies", MATCH, offset=20),
+    _case("existing_ids", "movies", [1, 2]),
+    _case("existing_ids", "users", [1, 2]),
+    _case("create_review", 1, 1, "Текст", 5),
+    _case("create_reviews_bulk", [(1, 1, "Текст", 4, 1)]),
+    _case("get_review_by_id", 1),
+    _case("get_movie_reviews", 1),
+    _case("get_movie_reviews", 1, approved_only=False, limit=5),
+    _case("get_movie_reviews", 1, limit=5, after=REVIEW_KEY),
+    _case("get_movie_reviews", 1, approved_only=False, limit=5, after=REVIEW_KEY),
+    _case("approve_review", 1),
+    _case("delete_review", 1),
+    _case("get_pending_reviews", first_page=True),
+    _case("get_pending_reviews", after=REVIEW_KEY),
+    _case("moderate_reviews", [1], [2]),
+    _case("get_rating_stats", 1),
+    _case("create_or_update_rating", 1, 1, 4),
+    _case("upsert_ratings_bulk", [(1, 1, 3)]),
+    _case("get_user_rating", 1, 1),
+    _case("get_rating_by_id", 1),
+    _case("get_movie_ratings", 1),
+    _case("add_favorite", 1, 2),
+    _case("remove_favorite", 1, 1),
+    _case("get_user_favorites", 1),
+    _case("get_user_favorite_ids", 1),
+    _case("is_favorite", 1, 1),
+]
+
+DAO_CALLS = [
+    *[_case("MovieDAO.find_page", sort=sort, limit=1, first_page=True) for sort in db.MOVIE_SORTS],
+    *[_case("MovieDAO.find_page", genre="Драма", sort=sort, limit=1) for sort in db.MOVIE_SORTS],
+    *[_case("MovieDAO.find_page", sort=sort, cursor=encode_cursor({"sort": sort, "key": key}))
+      for sort, key in SORT_KEYS.items()],
+    *[_case("MovieDAO.find_page_json", sort=sort, limit=1, first_page=True) for sort in db.MOVIE_SORTS],
+    *[_case("MovieDAO.find_page_json", genre="Драма", sort=sort, cursor=encode_cursor({"sort": sort, "key": key}))
+      for sort, key in SORT_KEYS.items()],
+    _case("MovieDAO.search", "фильм"),
+    _case("MovieDAO.search", "фильм", cursor=encode_cursor({"q": "фильм", "offset": 20})),
+    _case("MovieDAO.find_one_or_none_by_id", 1),
+    _case("MovieDAO.version", 1),
+    _case("MovieDAO.catalog_version"),
+    _case("MovieDAO.find_full", 1),
+    _case("MovieDAO.find_full", 1, user_id=1, approved_only=False),
+    _case("MovieDAO.add", title="Фильм", description="Описание", genre="Драма", year=2001, poster_url=None),
+    _case("MovieDAO.add_many", [{"title": "Фильм", "description": "Описание", "genre": "Драма", "year": 2001,
+                                 "poster_url": None}]),
+    _case("MovieDAO.genres"),
+    _case("MovieDAO.site_stats"),
+    _case("ReviewDAO.add", 1, 1, "Текст", 5),
+    _case("ReviewDAO.add_many", [(0, {"movie_id": 1, "user_id": 1, "text": "Текст", "rating": 4, "approved": True})]),
+    _case("ReviewDAO.find_page", 1, include_total=True),
+    _case("ReviewDAO.find_page", 1, approved_only=False,
+          cursor=encode_cursor({"movie": 1, "approved_only": False, "key": REVIEW_KEY})),
+    _case("ReviewDAO.find_pending", first_page=True),
+    _case("ReviewDAO.find_pending", cursor=encode_cursor({"pending": True, "key": REVIEW_KEY})),
+    _case("ReviewDAO.moderate", [1], [2]),
+    _case("ReviewDAO.approve", 1),
+    _case("ReviewDAO.delete", 1),
+    _case("RatingDAO.upsert", 1, 1, 4),
+    _case("RatingDAO.upsert_many", [(0, {"movie_id": 1, "user_id": 1, "value": 3})]),
+    _case("RatingDAO.stats", 1),
+    _case("FavoriteDAO.add", 1, 2),
+    _case("FavoriteDAO.remove", 1, 1),
+    _case("FavoriteDAO.find_by_user", 1),
+    _case("FavoriteDAO.ids_by_user", 1),
+]
+
+_CONTROL = {"BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA"}
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (COVERING )?INDEX \w+)?")
+
+
+@pytest.fixture
+def traced(temp_db, monkeypatch):
+    """A database with a few rows of everything; yields the list that collects
+    every statement run on a pooled connection from then on"""
+    statements = []
+    connect = db._connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(db, "_connect", traced_connect)
+    db.close_all()
+
+    user = db.create_user("user@example.com", "hash", "user")
+    db.create_user("moderator@example.com", "hash", "moderator", is_moderator=True)
+    db.create_movies_bulk([
+        ("Фильм", "Описание", "Драма", 1999, None),
+        ("Другой фильм", "Описание", "Комедия", 2000, None),
+        ("Ещё фильм", "Описание", "Драма", 2001, None),
+    ])
+    db.create_reviews_bulk([(1, user["id"], "Хороший фильм", 5, 1), (1, user["id"], "Плохой фильм", 2, 0)])
+    db.create_or_update_rating(1, user["id"], 4)
+    db.add_favorite(1, user["id"])
+    db.cache.clear()
+    statements.clear()
+    yield statements
+
+
+def table_scans(path, statements):
+    """(statement, plan line) for every plan line that scans a table, and
+    whether any plan sorts its result in a temp b-tree"""
+    conn = sqlite3.connect(path)
+    try:
+        tables = {name for name, sql in conn.execute("SELECT name, sql FROM sqlite_schema WHERE type = 'table'")
+                  if not sql.upper().startswith("CREATE VIRTUAL")}
+        scans, sorts = [], False
+        for sql in statements:
+            if sql.startswith("--") or sql.split(None, 1)[0].upper() in _CONTROL:
+                continue  # trigger bodies and transaction control
+            names = set()
+            for table, alias in _TABLE_REF.findall(sql):
+                if table in tables:
+                    names.update((table, alias))
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+                detail = row[3]
+                sorts = sorts or "TEMP B-TREE FOR ORDER BY" in detail
+                scan = _SCAN.match(detail)
+                if scan and scan.group(1) in names and not scan.group(2):
+                    scans.append((sql, detail))
+        return scans, sorts
+    finally:
+        conn.close()
+
+
+def check_plans(path, statements, first_page):
+    assert statements, "nothing was traced"
+    scans, sorts = table_scans(path, statements)
+    if first_page:
+        assert not sorts, "the first page should be read in index order"
+    else:
+        assert not scans, "\n".join(f"{detail}\n    {sql}" for sql, detail in scans)
+
+
+@pytest.mark.parametrize("name, args, kwargs, first_page", HELPER_CALLS)
+def test_helper_plans(traced, temp_db, name, args, kwargs, first_page):
+    getattr(db, name)(*args, **kwargs)
+    check_plans(temp_db, traced, first_page)
+
+
+@pytest.mark.parametrize("name, args, kwargs, first_page", DAO_CALLS)
+def test_dao_plans(traced, temp_db, name, args, kwargs, first_page):
+    cls, method = name.split(".")
+    asyncio.run(getattr(globals()[cls], method)(*args, **kwargs))
+    check_plans(temp_db, traced, first_page)
+
+
+def test_every_helper_is_planned():
+    """A new SQL helper in app/db.py has to be added to HELPER_CALLS"""
+    queries = {
+        name for name, fn in vars(db).items()
+        if inspect.isfunction(fn) and fn.__module__ == db.__name__ and not name.startswith("_")
+        and re.search(r"\.execute(many)?\(", inspect.getsource(inspect.unwrap(fn)))
+    }
+    queries.discard("transaction")  # BEGIN IMMEDIATE only
+    assert queries <= {param.values[0] for param in HELPER_CALLS}
+
+
+def test_every_dao_method_is_planned():
+    """A new DAO method in app/movies/dao.py has to be added to DAO_CALLS"""
+    methods = {f"{cls.__name__}.{name}" for cls in DAOS for name in vars(cls) if not name.startswith("_")}
+    assert methods <= {param.values[0] for param in DAO_CALLS}
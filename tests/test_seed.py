@@ -0,0 +1,33 @@
+"""The synthetic dataset generator appends to an existing database"""
+import sqlite3
+
+import init_db
+import seed_db
+from app import db, passwords
+
+AGGREGATES = "version, review_count, approved_review_count, rating_count, rating_sum"
+
+
+def test_generate_dataset_leaves_existing_movies_alone(temp_db, monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_SCRYPT_N", 1024)
+    monkeypatch.setattr(passwords, "PASSWORD_PBKDF2_ITERATIONS", 1000)
+    user = db.create_user("user@example.com", "hash", "user")
+    movie = db.create_movie("Фильм", "Описание", "Драма", 2000)
+    db.create_review(movie["id"], user["id"], "Рецензия", 4)
+    conn = sqlite3.connect(temp_db)
+    try:
+        before = conn.execute(f"SELECT {AGGREGATES} FROM movies WHERE id = ?", (movie["id"],)).fetchone()
+
+        counts = seed_db.generate_dataset(users=20, movies=10, reviews=200, ratings=100, favorites=50, seed=1)
+
+        assert counts["movies"] == 11 and counts["reviews"] == 201
+        assert conn.execute(f"SELECT {AGGREGATES} FROM movies WHERE id = ?", (movie["id"],)).fetchone() == before
+        # The generated movies' aggregates are what a full recompute would set
+        stats = "SELECT id, review_count, approved_review_count, rating_count, rating_sum FROM movies ORDER BY id"
+        maintained = conn.execute(stats).fetchall()
+        conn.execute("BEGIN")
+        init_db.recompute_movie_stats(conn.cursor())
+        assert conn.execute(stats).fetchall() == maintained
+        conn.rollback()
+    finally:
+        conn.close()
@@ -0,0 +1,42 @@
+"""uvicorn options and the shared-secret check for several workers"""
+import importlib
+
+import pytest
+
+from app import config, server
+
+
+@pytest.fixture
+def no_secret(monkeypatch):
+    monkeypatch.setattr(server, "SESSION_SECRET", "")
+
+
+def test_default_launch_is_one_worker(no_secret, monkeypatch):
+    """A plain `python run.py` starts without SESSION_SECRET"""
+    monkeypatch.delenv("SERVER_WORKERS", raising=False)
+    monkeypatch.setattr(server, "SERVER_WORKERS", importlib.reload(config).SERVER_WORKERS)
+    monkeypatch.setattr(server.os, "cpu_count", lambda: 8)
+    assert server.server_options()["workers"] == 1
+
+
+@pytest.mark.parametrize("workers", [2, 8])
+def test_several_workers_need_a_secret(no_secret, workers):
+    with pytest.raises(SystemExit):
+        server.server_options(workers=workers)
+
+
+def test_one_worker_per_cpu_needs_a_secret(no_secret, monkeypatch):
+    monkeypatch.setattr(server.os, "cpu_count", lambda: 4)
+    with pytest.raises(SystemExit):
+        server.server_options(workers=0)
+    monkeypatch.setattr(server.os, "cpu_count", lambda: 1)
+    assert server.server_options(workers=0)["workers"] == 1
+
+
+def test_several_workers_with_a_secret(monkeypatch):
+    monkeypatch.setattr(server, "SESSION_SECRET", "secret")
+    assert server.server_options(workers=4)["workers"] == 4
+
+
+def test_reload_runs_one_worker(no_secret):
+    assert server.server_options(workers=4, reload=True)["workers"] == 1